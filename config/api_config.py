@@ -15,6 +15,10 @@ class APIConfig:
     api_key: Optional[str] = None
     rate_limit: int = 100  # requests por minuto
     requires_auth: bool = True
+    burst: Optional[int] = None  # ráfaga máxima (por defecto = rate_limit)
+    quota: Optional[int] = None  # requests por periodo de facturación
+    quota_period: str = 'month'  # 'day' o 'month'
+    quota_reset_day: int = 1  # día del mes en que se reinicia la cuota mensual
 
 # APIs de Aviación
 AVIATION_APIS = {
@@ -22,7 +26,13 @@ AVIATION_APIS = {
         name='AviationStack',
         base_url='http://api.aviationstack.com/v1',
         api_key=os.getenv('AVIATIONSTACK_API_KEY'),
-        rate_limit=1000
+        rate_limit=1000,
+        burst=10,
+        # Única fuente del límite: la usan el cliente async (services) y el
+        # libro de cuotas de los conectores síncronos (services/quota_ledger.py)
+        quota=int(os.getenv('AVIATIONSTACK_MONTHLY_QUOTA', '100')),
+        quota_period='month',
+        quota_reset_day=int(os.getenv('AVIATIONSTACK_BILLING_DAY', '1'))
     ),
     
     'flightaware': APIConfig(
@@ -125,7 +135,83 @@ CACHE_CONFIG = {
         'flight_data': 300,      # 5 minutos
         'pricing': 1800,         # 30 minutos
         'economic_data': 3600,   # 1 hora
-        'predictions': 86400     # 24 horas
+        'predictions': 86400,    # 24 horas
+        'weather_data': 600      # 10 minutos
+    },
+    'default_ttl': 300,
+    # Límites del caché en memoria por proceso
+    'max_entries': int(os.getenv('CACHE_MAX_ENTRIES', '1024')),
+    'max_bytes': int(os.getenv('CACHE_MAX_BYTES', str(32 * 1024 * 1024))),
+    'sweep_interval': 60,        # segundos entre barridos de expirados
+    # Stale-while-revalidate: segundos tras expirar en que se sirve el dato
+    # viejo mientras se refresca en segundo plano (0 = desactivado)
+    'stale_grace': int(os.getenv('CACHE_STALE_GRACE', '0')),
+    # Caché compartido entre procesos (L2): 'redis', 'sqlite' o 'none'
+    'shared_backend': os.getenv('CACHE_BACKEND', 'redis' if os.getenv('REDIS_URL') else 'none'),
+    'sqlite_path': os.getenv('CACHE_SQLITE_PATH', os.path.join('data', 'api_cache.sqlite'))
+}
+
+# Categoría de caché de cada API (llave de CACHE_CONFIG['cache_ttl'])
+API_CACHE_CATEGORY = {
+    'aviationstack': 'flight_data',
+    'flightaware': 'flight_data',
+    'amadeus': 'pricing',
+    'google_trends': 'economic_data',
+    'world_bank': 'economic_data',
+    'fred': 'economic_data',
+    'openweather': 'weather_data',
+    'openai': 'predictions',
+    'claude': 'predictions'
+}
+
+# TTL específicos por endpoint (segundos); tienen prioridad sobre la categoría
+ENDPOINT_CACHE_TTL = {
+    'aviationstack': {
+        '/airports': 86400,      # catálogo de aeropuertos casi estático
+        '/routes': 21600         # rutas cambian con la temporada
+    },
+    'flightaware': {
+        '/airports': 86400
+    },
+    'amadeus': {
+        '/analytics/itinerary-price-metrics': 21600
+    }
+}
+
+# Pool de conexiones HTTP compartido (aiohttp.TCPConnector)
+HTTP_POOL_CONFIG = {
+    'limit': 100,                # conexiones totales abiertas
+    'limit_per_host': 10,        # conexiones simultáneas por host
+    'ttl_dns_cache': 300,        # segundos de caché DNS
+    'keepalive_timeout': 30,     # segundos que se conserva una conexión ociosa
+    'connect_timeout': 5,
+    'total_timeout': 30
+}
+
+# Reintentos (429/5xx/timeouts) y circuit breaker por API
+RESILIENCE_CONFIG = {
+    'default': {
+        'max_retries': 2,
+        'base_delay': 0.5,           # segundos, se duplica en cada reintento
+        'max_delay': 8.0,            # tope del backoff y del Retry-After aceptado
+        'failure_threshold': 5,      # fallos consecutivos para abrir el circuito
+        'recovery_timeout': 60.0     # segundos antes de volver a probar
+    },
+    # Cuota mensual escasa: un solo reintento
+    'aviationstack': {'max_retries': 1},
+    'amadeus': {'max_retries': 1},
+    # Respuestas de IA lentas: no encadenar timeouts largos
+    'openai': {'max_retries': 1, 'failure_threshold': 3},
+    'claude': {'max_retries': 1, 'failure_threshold': 3}
+}
+
+# Sub-límites por endpoint (requests por minuto), además del límite de la API
+ENDPOINT_RATE_LIMITS = {
+    'aviationstack': {
+        '/flights': 30
+    },
+    'amadeus': {
+        '/shopping/flight-offers': 5
     }
 }
 
@@ -136,6 +222,10 @@ AUTH_CONFIG = {
     'refresh_token_expiry': 86400 * 7  # 7 días
 }
 
+def get_all_api_configs() -> Dict[str, APIConfig]:
+    """Configuración de todas las APIs (aviación, económicas e IA)"""
+    return {**AVIATION_APIS, **ECONOMIC_APIS, **AI_APIS}
+
 def get_api_config(api_name: str, category: str = None) -> Optional[APIConfig]:
     """
     Obtiene configuración de API específica
@@ -147,8 +237,31 @@ def get_api_config(api_name: str, category: str = None) -> Optional[APIConfig]:
     Returns:
         APIConfig object o None si no existe
     """
+    return get_all_api_configs().get(api_name)
+
+def build_cache_ttl_table() -> Dict[str, Dict]:
+    """
+    Resuelve la política de TTL de caché de todas las APIs configuradas
+    
+    Orden de resolución: endpoint específico → categoría de la API → default
+    
+    Returns:
+        Dict api_name -> {'category', 'default_ttl', 'endpoints'}
+    """
     all_apis = {**AVIATION_APIS, **ECONOMIC_APIS, **AI_APIS}
-    return all_apis.get(api_name)
+    category_ttls = CACHE_CONFIG['cache_ttl']
+    default_ttl = CACHE_CONFIG.get('default_ttl', 300)
+    
+    table = {}
+    for api_name in all_apis:
+        category = API_CACHE_CATEGORY.get(api_name)
+        table[api_name] = {
+            'category': category,
+            'default_ttl': category_ttls.get(category, default_ttl),
+            'endpoints': dict(ENDPOINT_CACHE_TTL.get(api_name, {}))
+        }
+    
+    return table
 
 def validate_api_keys() -> Dict[str, bool]:
     """
@@ -15,6 +15,7 @@ from airport_diagram import AIFAAirportDiagram
 from aifa_geo_map import AIFAGeoMap
 from real_data_connector import GobMXRealDataConnector, AviationStackConnector, FlightAwareConnector
 from kpi_calculator import AIFAKPICalculator
+from kpi_records import ExecutiveDashboardRecord
 from weather_manager import WeatherManager
 
 # Configuración de la página
@@ -41,6 +42,24 @@ def cargar_datos():
     
     return rutas, pasajeros, tarifas, resumen
 
+# Calculadora de KPIs única del proceso: el grafo memoizado (y el último
+# valor de cada KPI en vivo) sobrevive a los reruns de Streamlit
+@st.cache_resource
+def cargar_calculadora_kpis(aviationstack_key, flightaware_key, openweather_key):
+    return AIFAKPICalculator(
+        GobMXRealDataConnector(),
+        AviationStackConnector(aviationstack_key) if aviationstack_key else None,
+        FlightAwareConnector(flightaware_key) if flightaware_key else None,
+        WeatherManager(openweather_key) if openweather_key else None
+    )
+
+# Dashboard ejecutivo serializado (bytes compactos): los reruns dentro del TTL
+# solo decodifican el registro en vez de volver a consultar y calcular
+@st.cache_data(ttl=60, show_spinner=False)
+def cargar_dashboard_ejecutivo(aviationstack_key, flightaware_key, openweather_key):
+    kpi_calc = cargar_calculadora_kpis(aviationstack_key, flightaware_key, openweather_key)
+    return kpi_calc.generate_executive_dashboard_record().dumps()
+
 # Cargar datos
 rutas_df, pasajeros_df, tarifas_df, resumen_df = cargar_datos()
 
@@ -802,26 +821,23 @@ with tab8:
     # Inicializar conectores de datos reales
     with st.spinner('Cargando datos gubernamentales verificados...'):
         try:
-            # Conector de datos gubernamentales
-            gov_connector = GobMXRealDataConnector()
-            
             # Conector AviationStack (opcional, con fallback)
             aviationstack_key = st.secrets.get("AVIATIONSTACK_KEY", "59f5d7300a3c8236dc29e095fa6ab923")
-            aviation_connector = AviationStackConnector(aviationstack_key) if aviationstack_key else None
             
             # Conector FlightAware (opcional, con fallback)
             flightaware_key = st.secrets.get("FLIGHTAWARE_API_KEY", "gbSpYb4XG8AXJzyC6Gx3WevjWfPR7NKc")
-            flightaware_connector = FlightAwareConnector(flightaware_key) if flightaware_key else None
             
             # Weather Manager (OpenWeatherMap)
             openweather_key = st.secrets.get("OPENWEATHER_API_KEY", "6a6e94ae482a1c310fe583b6a35eb72b")
-            weather_manager = WeatherManager(openweather_key) if openweather_key else None
             
-            # Calculadora de KPIs
-            kpi_calc = AIFAKPICalculator(gov_connector, aviation_connector, flightaware_connector, weather_manager)
+            # Calculadora de KPIs (compartida entre reruns)
+            kpi_calc = cargar_calculadora_kpis(aviationstack_key, flightaware_key, openweather_key)
+            gov_connector = kpi_calc.data_connector
             
-            # Generar dashboard ejecutivo completo
-            dashboard_data = kpi_calc.generate_executive_dashboard()
+            # Dashboard ejecutivo completo (cacheado como bytes por 60 s)
+            dashboard_data = ExecutiveDashboardRecord.loads(
+                cargar_dashboard_ejecutivo(aviationstack_key, flightaware_key, openweather_key)
+            )
             
             # ✅ SECCIÓN 1: SCORECARD GENERAL
             st.subheader("🎯 Scorecard General de Desempeño")
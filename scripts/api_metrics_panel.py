@@ -0,0 +1,103 @@
+"""
+Panel de Streamlit con la instrumentación del cliente de APIs
+Muestra latencia, tamaño, status, caché y rate limiting por upstream
+"""
+
+import streamlit as st
+import plotly.express as px
+import pandas as pd
+from typing import Dict, Any
+
+
+def metrics_dataframe(metrics: Dict[str, Any]) -> pd.DataFrame:
+    """
+    Convierte el snapshot de `APIClient.metrics()` en una tabla por endpoint
+
+    Incluye los requests de los conectores síncronos (HTTPTransport), que
+    registran en el mismo registro del proceso.
+    """
+    rows = []
+    for key, endpoint in metrics.get('endpoints', {}).items():
+        cache = endpoint['cache']
+        lookups = cache['hit'] + cache['stale'] + cache['l2_hit'] + cache['miss']
+        rows.append({
+            'api': endpoint['api_name'],
+            'endpoint': endpoint['endpoint'],
+            'requests': endpoint['requests'],
+            'errores': endpoint['errors'],
+            'reintentos': endpoint['retries'],
+            'latencia_avg_ms': endpoint['latency_ms']['avg'],
+            'latencia_p95_ms': endpoint['latency_ms']['p95'],
+            'latencia_max_ms': endpoint['latency_ms']['max'],
+            'kb_promedio': round(endpoint['size_bytes']['avg'] / 1024, 1),
+            'cache_hit_%': round((cache['hit'] + cache['stale'] + cache['l2_hit']) / lookups * 100, 1) if lookups else 0.0,
+            'stale': cache['stale'],
+            'espera_rate_limit_s': endpoint['rate_limit_wait_s'],
+            'status': ', '.join(f"{code}×{n}" for code, n in sorted(endpoint['status_codes'].items()))
+        })
+    return pd.DataFrame(rows)
+
+
+def render_api_metrics_panel(metrics: Dict[str, Any], prometheus_text: str = None):
+    """
+    Renderiza el panel de telemetría de APIs
+
+    Args:
+        metrics: Snapshot de `APIClient.metrics()`
+        prometheus_text: Export opcional de `APIClient.prometheus_metrics()`
+    """
+    st.subheader("📡 Telemetría de APIs")
+
+    df = metrics_dataframe(metrics)
+    if df.empty:
+        st.info("Sin requests registrados todavía en este proceso")
+        return
+
+    cache = metrics.get('cache', {})
+    coalescing = metrics.get('coalescing', {})
+    circuits = metrics.get('circuits', {})
+    open_circuits = [api for api, state in circuits.items() if state['state'] != 'CLOSED']
+
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        st.metric("📨 Requests", int(df['requests'].sum()), delta=f"{int(df['errores'].sum())} errores", delta_color="inverse")
+
+    with col2:
+        st.metric("🗄️ Hit rate caché L1", f"{cache.get('hit_rate', 0) * 100:.1f}%", delta=f"{cache.get('entries', 0)} entradas")
+
+    with col3:
+        st.metric("🔗 Requests deduplicados", coalescing.get('coalesced', 0))
+
+    with col4:
+        st.metric(
+            "⚡ Circuitos abiertos",
+            len(open_circuits),
+            delta=', '.join(open_circuits) if open_circuits else "Todos cerrados",
+            delta_color="off"
+        )
+
+    # Latencia por upstream (la etiqueta se arma antes de ordenar para que
+    # cada barra conserve su endpoint)
+    chart = df.assign(upstream=df['api'] + ' ' + df['endpoint']).sort_values('latencia_p95_ms', ascending=False)
+    fig = px.bar(
+        chart,
+        x='latencia_p95_ms',
+        y='upstream',
+        orientation='h',
+        labels={'latencia_p95_ms': 'Latencia p95 (ms)', 'upstream': ''},
+        title='Latencia p95 por endpoint'
+    )
+    fig.update_layout(height=max(250, 40 * len(df)), margin=dict(l=10, r=10, t=40, b=10))
+    st.plotly_chart(fig, use_container_width=True)
+
+    st.dataframe(df, use_container_width=True, hide_index=True)
+
+    rate_limiter = metrics.get('rate_limiter', {})
+    if rate_limiter:
+        with st.expander("🚦 Rate limiting y cuotas"):
+            st.dataframe(pd.DataFrame.from_dict(rate_limiter, orient='index'), use_container_width=True)
+
+    if prometheus_text:
+        with st.expander("📤 Export Prometheus"):
+            st.code(prometheus_text, language='text')
@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+Benchmark del calculador de KPIs de AIFA
+Conectores stub deterministas (latencia y fallas configurables) para medir
+latencia de generate_executive_dashboard, asignaciones de memoria y llamadas
+a upstream; el resultado es un JSON comparable entre revisiones
+
+Uso:
+    python scripts/benchmark_kpi_calculator.py --profile typical --iterations 50 --output bench.json
+    python scripts/benchmark_kpi_calculator.py --profile outage --budget-ms 500 --compare bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from flight_records import from_fr24_zone
+from kpi_calculator import AIFAKPICalculator
+from kpi_history import KPIHistoryStore
+from connection_health import ConnectionHealthRegistry
+from flightaware_connector import MIN_POLL_INTERVAL_S, DELAYS_ENDPOINT_RETRY_S
+
+
+@dataclass(frozen=True)
+class UpstreamProfile:
+    """Comportamiento de un upstream: latencia en ms, tasa de fallas y de cuelgues"""
+    latency_ms: float = 50.0
+    jitter_ms: float = 10.0
+    failure_rate: float = 0.0    # respuesta de error (HTTP no-200 / datos simulados)
+    exception_rate: float = 0.0  # excepción de red
+    hang_rate: float = 0.0       # tarda `hang_ms` en responder
+    hang_ms: float = 5000.0
+
+
+# Perfiles por API: (AviationStack, FlightAware, OpenWeatherMap, FlightRadar24)
+PROFILES: Dict[str, Dict[str, UpstreamProfile]] = {
+    'fast': {
+        'aviation': UpstreamProfile(5, 1),
+        'flightaware': UpstreamProfile(5, 1),
+        'weather': UpstreamProfile(5, 1),
+        'flightradar': UpstreamProfile(5, 1)
+    },
+    'typical': {
+        'aviation': UpstreamProfile(180, 60),
+        'flightaware': UpstreamProfile(250, 80),
+        'weather': UpstreamProfile(120, 40),
+        'flightradar': UpstreamProfile(300, 120)
+    },
+    'degraded': {
+        'aviation': UpstreamProfile(400, 200, failure_rate=0.2),
+        'flightaware': UpstreamProfile(600, 300, failure_rate=0.3, exception_rate=0.05),
+        'weather': UpstreamProfile(300, 150, failure_rate=0.1),
+        'flightradar': UpstreamProfile(800, 400, exception_rate=0.1)
+    },
+    'outage': {
+        'aviation': UpstreamProfile(180, 60),
+        'flightaware': UpstreamProfile(250, 80, failure_rate=0.5),
+        'weather': UpstreamProfile(120, 40, hang_rate=1.0, hang_ms=3000),
+        'flightradar': UpstreamProfile(300, 120, hang_rate=1.0, hang_ms=3000)
+    }
+}
+
+
+class StubUpstream:
+    """Simula un upstream con latencia y fallas deterministas (RNG con semilla)"""
+
+    def __init__(self, name: str, profile: UpstreamProfile, seed: int, calls: Counter):
+        self.name = name
+        self.profile = profile
+        self._random = random.Random(f"{seed}:{name}")
+        self._calls = calls
+        self._lock = threading.Lock()
+
+    def call(self, method: str) -> bool:
+        """Registra la llamada, espera la latencia y regresa False si la respuesta es de error"""
+        with self._lock:
+            self._calls[f"{self.name}.{method}"] += 1
+            roll = self._random.random()
+            latency = max(self.profile.latency_ms + self._random.uniform(-1, 1) * self.profile.jitter_ms, 0)
+        if roll < self.profile.hang_rate:
+            latency = self.profile.hang_ms
+        time.sleep(latency / 1000)
+
+        roll -= self.profile.hang_rate
+        if 0 <= roll < self.profile.exception_rate:
+            raise ConnectionError(f"{self.name}: conexión reiniciada (stub)")
+        roll -= self.profile.exception_rate
+        return not (0 <= roll < self.profile.failure_rate)
+
+
+class StubAviationStackConnector:
+    """Misma interfaz y forma de respuesta que AviationStackConnector"""
+
+    def __init__(self, upstream: StubUpstream):
+        self.upstream = upstream
+
+    def test_connection(self) -> Dict[str, Any]:
+        if self.upstream.call('test_connection'):
+            return {'status': 'CONECTADO', 'api_activa': True, 'timestamp': datetime.now().isoformat()}
+        return {'status': 'ERROR', 'api_activa': False, 'error_code': 503, 'error_msg': 'Service Unavailable'}
+
+    def get_flights_summary(self, iata_code: str = "NLU") -> Dict[str, Any]:
+        # El conector real hace dos requests (salidas y llegadas)
+        departures_ok = self.upstream.call('flights')
+        arrivals_ok = self.upstream.call('flights')
+        if departures_ok and arrivals_ok:
+            return {
+                'total_operaciones_dia': 40,
+                'salidas_reales': 20,
+                'llegadas_reales': 20,
+                'principales_destinos': ['CUN', 'GDL', 'TIJ', 'MTY', 'MID'],
+                'aerolineas_activas': ['VivaAerobus', 'Volaris', 'Aeromexico'],
+                'fuente': 'AviationStack API - Datos Reales',
+                'precision': 'REAL',
+                'timestamp': datetime.now().isoformat()
+            }
+        return {
+            'total_operaciones_estimadas_dia': 45,
+            'principales_destinos': ['CUN', 'GDL', 'TIJ', 'MTY', 'VER'],
+            'aerolineas_principales': ['VivaAerobus', 'Volaris', 'Aeromexico'],
+            'nota': 'Datos simulados - API no disponible',
+            'fuente': 'Simulación basada en estadísticas oficiales',
+            'precision': 'ESTIMADA'
+        }
+
+
+class StubFlightAwareConnector:
+    """
+    Misma interfaz y forma de respuesta que FlightAwareConnector
+
+    Sin /delays en el plan (`delays_in_plan=False`) modela el fallback real:
+    el 404 se recuerda DELAYS_ENDPOINT_RETRY_S y el índice de vuelos pide
+    salidas y llegadas a lo más una vez por MIN_POLL_INTERVAL_S.
+    """
+
+    def __init__(self, upstream: StubUpstream, delays_in_plan: bool = False):
+        self.upstream = upstream
+        self.delays_in_plan = delays_in_plan
+        self._delays_missing_at: Optional[float] = None
+        self._polled_at: Optional[float] = None
+        self._index_ok = False
+
+    def test_connection(self) -> Dict[str, Any]:
+        if self.upstream.call('test_connection'):
+            return {
+                'status': 'CONECTADO',
+                'api_activa': True,
+                'funciones_disponibles': ['info_aeropuertos', 'delay_stats'],
+                'limitaciones': ['vuelos_tiempo_real_no_disponible'],
+                'timestamp': datetime.now().isoformat()
+            }
+        return {'status': 'ERROR', 'api_activa': False, 'error_code': 503, 'error_msg': 'Service Unavailable'}
+
+    def _delays_from_flight_index(self) -> Optional[Dict[str, Any]]:
+        now = time.monotonic()
+        if self._polled_at is None or now - self._polled_at >= MIN_POLL_INTERVAL_S:
+            self._polled_at = now
+            departures_ok = self.upstream.call('flights_departures')
+            self._index_ok = (departures_ok and self.upstream.call('flights_arrivals')) or self._index_ok
+        if not self._index_ok:
+            return None
+        return {
+            'success': True,
+            'delay_seconds': 540,
+            'delay_minutes': 9.0,
+            'status_color': 'yellow',
+            'on_time_percentage': 84.0,
+            'category': 'calculada',
+            'reasons': [],
+            'total_flights_analyzed': 38,
+            'stale': False,
+            'fuente': 'FlightAware AeroAPI - vuelos del aeropuerto',
+            'timestamp': datetime.now().isoformat()
+        }
+
+    def get_delay_statistics(self, airport_code: str = "NLU") -> Dict[str, Any]:
+        not_in_plan = {'success': False, 'error_code': 404, 'error_msg': 'Not in plan'}
+        if not self.delays_in_plan:
+            missing_at = self._delays_missing_at
+            if missing_at is None or time.monotonic() - missing_at >= DELAYS_ENDPOINT_RETRY_S:
+                self.upstream.call('delays')
+                self._delays_missing_at = time.monotonic()
+            return self._delays_from_flight_index() or not_in_plan
+        if self.upstream.call('delays'):
+            return {
+                'success': True,
+                'delay_seconds': 480,
+                'delay_minutes': 8.0,
+                'status_color': 'yellow',
+                'on_time_percentage': 85.0,
+                'category': 'weather',
+                'reasons': [],
+                'fuente': 'FlightAware AeroAPI',
+                'timestamp': datetime.now().isoformat()
+            }
+        return {'success': False, 'error_code': 503, 'error_msg': 'Service Unavailable'}
+
+
+class StubWeatherManager:
+    """Misma interfaz y forma de respuesta que WeatherManager"""
+
+    def __init__(self, upstream: StubUpstream):
+        self.upstream = upstream
+
+    def get_current_weather(self, airport_code: str = 'NLU') -> Dict[str, Any]:
+        if self.upstream.call('current_weather'):
+            return {
+                'data_source': 'openweathermap_v3',
+                'api_version': '3.0_onecall',
+                'current': {
+                    'temperature': 21.5, 'feels_like': 21.0, 'humidity': 45, 'pressure': 1018,
+                    'wind': {'speed': 4.2}, 'visibility': 10, 'uv_index': 6, 'clouds': 20,
+                    'weather': {'description': 'nubes dispersas'}
+                },
+                'conditions': {'overall_status': 'good', 'flight_impact': 'minimal', 'recommendations': []},
+                'forecast': {'alerts': 0, 'hourly_available': 48},
+                'timestamp': datetime.now().isoformat()
+            }
+        return {
+            'data_source': 'simulated',
+            'conditions': {'overall_status': 'good', 'flight_impact': 'minimal'}
+        }
+
+
+class StubFlightRadarConnector:
+    """Misma interfaz y forma de respuesta que FlightRadar24ZoneConnector"""
+
+    def __init__(self, upstream: StubUpstream):
+        self.upstream = upstream
+
+    def get_aifa_summary(self, columnar: bool = False) -> Dict[str, Any]:
+        if self.upstream.call('zone_feed'):
+            flights = {'aifa_flights': from_fr24_zone({})} if columnar else {
+                'departure_flights': [], 'arrival_flights': [], 'overflight_aircraft': []
+            }
+            return {
+                'success': True,
+                'summary': {
+                    'total_area_aircraft': 18, 'aifa_related_aircraft': 4,
+                    'departures': 2, 'arrivals': 2, 'overflights': 14
+                },
+                'airlines_operating': {'VIV': 2, 'VOI': 1, 'AMX': 1},
+                **flights,
+                'zone_coverage': 'Área AIFA',
+                'source': 'FlightRadar24 Zone Feed',
+                'data_freshness': datetime.now().isoformat()
+            }
+        return {'success': False, 'error': 'Sin datos en el momento'}
+
+
+def build_calculator(profile_name: str, seed: int, parallel: bool, calls: Counter,
+                     delays_in_plan: bool = False) -> AIFAKPICalculator:
+    """Calculador con conectores stub y estado (salud, historial) aislado del proceso"""
+    profile = PROFILES[profile_name]
+    upstreams = {name: StubUpstream(name, profile[name], seed, calls) for name in profile}
+    return AIFAKPICalculator(
+        aviation_connector=StubAviationStackConnector(upstreams['aviation']),
+        flightaware_connector=StubFlightAwareConnector(upstreams['flightaware'], delays_in_plan),
+        weather_manager=StubWeatherManager(upstreams['weather']),
+        flightradar_connector=StubFlightRadarConnector(upstreams['flightradar']),
+        parallel_live=parallel,
+        health_registry=ConnectionHealthRegistry(),
+        history_store=KPIHistoryStore(None, min_interval=0)
+    )
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    return {
+        'min': round(ordered[0], 2),
+        'p50': round(pick(0.50), 2),
+        'p90': round(pick(0.90), 2),
+        'p99': round(pick(0.99), 2),
+        'max': round(ordered[-1], 2),
+        'mean': round(statistics.fmean(ordered), 2)
+    }
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_benchmark(profile: str = 'typical', iterations: int = 30, warmup: int = 2, seed: int = 42,
+                  parallel: bool = True, budget_ms: Optional[float] = None,
+                  delays_in_plan: bool = False) -> Dict[str, Any]:
+    """
+    Ejecuta el benchmark y regresa el resultado como dict serializable
+
+    La latencia se mide sin tracemalloc; las asignaciones en una segunda
+    pasada con tracemalloc activo (que agrega overhead).
+    """
+    calls: Counter = Counter()
+    calculator = build_calculator(profile, seed, parallel, calls, delays_in_plan)
+
+    for _ in range(warmup):
+        calculator.generate_executive_dashboard(budget_ms=budget_ms)
+    calls.clear()
+
+    latencies, recomputed, pending, origins = [], [], [], Counter()
+    for _ in range(iterations):
+        started = time.perf_counter()
+        dashboard = calculator.generate_executive_dashboard(budget_ms=budget_ms)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+        recomputed.append(len(calculator.last_recomputed()['recomputed']))
+        status = dashboard['estado_calculo']
+        pending.append(len(status['pendientes']))
+        origins.update(kpi['origen'] for kpi in status['kpis'].values())
+
+    upstream_calls = dict(sorted(calls.items()))
+
+    # Asignaciones: pasada aparte con tracemalloc
+    allocation_calculator = build_calculator(profile, seed, parallel, Counter(), delays_in_plan)
+    allocation_calculator.generate_executive_dashboard(budget_ms=budget_ms)
+    tracemalloc.start()
+    peaks, net = [], []
+    for _ in range(max(iterations // 3, 3)):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        allocation_calculator.generate_executive_dashboard(budget_ms=budget_ms)
+        current, peak = tracemalloc.get_traced_memory()
+        peaks.append((peak - before) / 1024)
+        net.append((current - before) / 1024)
+    tracemalloc.stop()
+
+    return {
+        'benchmark': 'kpi_calculator.generate_executive_dashboard',
+        'timestamp': datetime.now().isoformat(),
+        'revision': _git_revision(),
+        'python': platform.python_version(),
+        'config': {
+            'profile': profile,
+            'upstreams': {name: asdict(p) for name, p in PROFILES[profile].items()},
+            'iterations': iterations,
+            'warmup': warmup,
+            'seed': seed,
+            'parallel': parallel,
+            'budget_ms': budget_ms,
+            'delays_in_plan': delays_in_plan
+        },
+        'latency_ms': _percentiles(latencies),
+        'allocations_kib': {
+            'peak_per_render': _percentiles(peaks),
+            'retained_per_render': _percentiles(net)
+        },
+        'upstream_calls': {
+            'total': sum(upstream_calls.values()),
+            'per_render': round(sum(upstream_calls.values()) / iterations, 2),
+            'by_method': upstream_calls
+        },
+        'graph': {
+            'recomputed_nodes_per_render': round(statistics.fmean(recomputed), 2),
+            'pending_kpis_per_render': round(statistics.fmean(pending), 2),
+            'kpi_origins': dict(origins)
+        }
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Any]:
+    """Diferencia porcentual de las métricas principales contra un resultado previo"""
+    def change(new: float, old: float) -> Optional[float]:
+        return round((new - old) / old * 100, 1) if old else None
+
+    return {
+        'baseline_revision': baseline.get('revision'),
+        'latency_ms': {
+            key: change(current['latency_ms'][key], baseline['latency_ms'][key])
+            for key in ('p50', 'p90', 'p99', 'mean')
+        },
+        'peak_alloc_kib_p50': change(
+            current['allocations_kib']['peak_per_render']['p50'],
+            baseline['allocations_kib']['peak_per_render']['p50']
+        ),
+        'upstream_calls_per_render': change(
+            current['upstream_calls']['per_render'], baseline['upstream_calls']['per_render']
+        )
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de AIFAKPICalculator con conectores stub")
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='typical')
+    parser.add_argument('--iterations', type=int, default=30)
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--sequential', action='store_true', help='Consultar las APIs en serie')
+    parser.add_argument('--budget-ms', type=float, default=None, help='Presupuesto de latencia por render')
+    parser.add_argument('--delays-in-plan', action='store_true', help='El plan de FlightAware incluye /delays')
+    parser.add_argument('--output', help='Archivo JSON de salida (default: stdout)')
+    parser.add_argument('--compare', help='JSON de una corrida previa para comparar')
+    args = parser.parse_args(argv)
+
+    result = run_benchmark(
+        profile=args.profile,
+        iterations=args.iterations,
+        warmup=args.warmup,
+        seed=args.seed,
+        parallel=not args.sequential,
+        budget_ms=args.budget_ms,
+        delays_in_plan=args.delays_in_plan
+    )
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            result['comparison'] = compare(result, json.load(f))
+
+    output = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+        print(f"✅ Resultados guardados en {args.output}", file=sys.stderr)
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Registro de salud de las conexiones a APIs externas
+Reemplaza los test_connection() por cálculo con un estado en caché (TTL),
+alimentado por el resultado de las llamadas reales y refrescado en segundo plano
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, Optional, Callable
+
+# Segundos que un estado se considera vigente
+DEFAULT_HEALTH_TTL = 300.0
+
+# Llaves de error que se descartan cuando la API vuelve a responder
+_ERROR_KEYS = ('error', 'error_code', 'error_msg')
+
+
+class ConnectionHealthRegistry:
+    """
+    Estado de conexión por API, compartido entre cálculos de KPIs
+
+    - `status()` nunca bloquea: regresa el último estado conocido. Si ya
+      venció su TTL (o no existe) programa un test_connection() en segundo
+      plano y, mientras tanto, regresa lo que haya.
+    - `record_success()` / `record_failure()` actualizan el estado a partir
+      de las llamadas de datos reales (monitoreo pasivo).
+    """
+
+    def __init__(self, ttl: float = DEFAULT_HEALTH_TTL):
+        self.ttl = ttl
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._updated: Dict[str, float] = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='health-refresh')
+        self._stats = {'reads': 0, 'stale_reads': 0, 'probes': 0, 'passive_updates': 0}
+
+    def status(self, name: str, probe: Optional[Callable[[], Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """
+        Último estado conocido de la API
+
+        Args:
+            name: Nombre de la API ('aviationstack', 'flightaware', ...)
+            probe: Función de prueba (p.ej. `connector.test_connection`) que
+                se ejecuta en segundo plano si el estado venció
+
+        Returns:
+            Copia del estado. Sin información previa se asume la API activa
+            ('DESCONOCIDO') para que la llamada real decida.
+        """
+        with self._lock:
+            self._stats['reads'] += 1
+            entry = self._entries.get(name)
+            fresh = entry is not None and time.monotonic() - self._updated[name] < self.ttl
+            if not fresh:
+                self._stats['stale_reads'] += 1
+                if probe is not None and name not in self._refreshing:
+                    self._refreshing.add(name)
+                    self._executor.submit(self._refresh, name, probe)
+
+        if entry is None:
+            return {'status': 'DESCONOCIDO', 'api_activa': True}
+        return dict(entry)
+
+    def is_fresh(self, name: str) -> bool:
+        with self._lock:
+            return name in self._entries and time.monotonic() - self._updated[name] < self.ttl
+
+    def report(self, name: str, status: Dict[str, Any]):
+        """Reemplaza el estado con el resultado completo de un test_connection()"""
+        with self._lock:
+            self._entries[name] = dict(status)
+            self._updated[name] = time.monotonic()
+
+    def record_success(self, name: str, **details):
+        """La API respondió bien a una llamada real"""
+        with self._lock:
+            entry = {k: v for k, v in self._entries.get(name, {}).items() if k not in _ERROR_KEYS}
+            entry.update(details)
+            entry.update({'status': 'CONECTADO', 'api_activa': True, 'timestamp': datetime.now().isoformat()})
+            self._entries[name] = entry
+            self._updated[name] = time.monotonic()
+            self._stats['passive_updates'] += 1
+
+    def record_failure(self, name: str, error_msg: str, status: str = 'ERROR', api_activa: bool = False, **details):
+        """
+        La API falló en una llamada real
+
+        Args:
+            status: 'ERROR', 'ERROR_AUTH', 'RATE_LIMIT', ...
+            api_activa: True cuando la API está viva pero limitada (p.ej. 429)
+        """
+        with self._lock:
+            entry = dict(self._entries.get(name, {}))
+            entry.update(details)
+            entry.update({
+                'status': status,
+                'api_activa': api_activa,
+                'error_msg': error_msg,
+                'timestamp': datetime.now().isoformat()
+            })
+            self._entries[name] = entry
+            self._updated[name] = time.monotonic()
+            self._stats['passive_updates'] += 1
+
+    def _refresh(self, name: str, probe: Callable[[], Dict[str, Any]]):
+        """Prueba activa, siempre fuera del hilo del render"""
+        try:
+            self.report(name, probe())
+        except Exception as e:
+            self.record_failure(name, str(e), status='ERROR_CONEXION')
+        finally:
+            with self._lock:
+                self._refreshing.discard(name)
+                self._stats['probes'] += 1
+
+    def invalidate(self, name: str = None):
+        """Descarta el estado de una API (o de todas)"""
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+                self._updated.clear()
+            else:
+                self._entries.pop(name, None)
+                self._updated.pop(name, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            return {
+                **self._stats,
+                'apis': {
+                    name: {
+                        'status': entry.get('status'),
+                        'api_activa': entry.get('api_activa'),
+                        'age_s': round(now - self._updated[name], 1),
+                        'fresh': now - self._updated[name] < self.ttl
+                    }
+                    for name, entry in self._entries.items()
+                }
+            }
+
+
+_default_registry: Optional[ConnectionHealthRegistry] = None
+_default_registry_lock = threading.Lock()
+
+
+def get_health_registry() -> ConnectionHealthRegistry:
+    """Registro de salud único del proceso"""
+    global _default_registry
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = ConnectionHealthRegistry()
+        return _default_registry
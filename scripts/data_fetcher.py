@@ -10,7 +10,7 @@ from typing import Dict, List, Optional
 import logging
 from pathlib import Path
 
-from services.api_client import APIServiceFactory, APIClient, AviationDataService, PricingService
+from services.api_client import APIServiceFactory, AviationDataService, PricingService, RequestSpec
 from config.api_config import validate_api_keys
 
 # Configurar logging
@@ -38,20 +38,17 @@ class AIFADataFetcher:
             available_apis = [api for api, status in self.api_status.items() if status]
             logger.info(f"APIs disponibles: {len(available_apis)}")
             
-            # 1. Datos de rutas actuales
-            results['rutas'] = await self._fetch_current_routes()
-            
-            # 2. Datos de pasajeros (si hay API de AIFA)
-            results['pasajeros'] = await self._fetch_passenger_data()
-            
-            # 3. Precios reales
-            results['precios'] = await self._fetch_pricing_data()
-            
-            # 4. Análisis de mercado
-            results['mercado'] = await self._fetch_market_analysis()
-            
-            # 5. Predicciones con ML
-            results['predicciones'] = await self._generate_predictions()
+            # Las fuentes son independientes: se actualizan en paralelo y el
+            # refresco tarda lo que la más lenta
+            tasks = {
+                'rutas': self._fetch_current_routes(),          # 1. Rutas actuales
+                'pasajeros': self._fetch_passenger_data(),      # 2. Pasajeros
+                'precios': self._fetch_pricing_data(),          # 3. Precios reales
+                'mercado': self._fetch_market_analysis(),       # 4. Análisis de mercado
+                'predicciones': self._generate_predictions()    # 5. Predicciones con ML
+            }
+            outcomes = await asyncio.gather(*tasks.values())
+            results.update(zip(tasks.keys(), outcomes))
             
             logger.info(f"Actualización completada: {results}")
             return results
@@ -67,31 +64,33 @@ class AIFADataFetcher:
                 logger.warning("AviationStack API no disponible, usando datos simulados")
                 return await self._simulate_routes_data()
             
-            async with APIClient() as client:
-                aviation_service = AviationDataService(client)
+            # Cliente compartido del proceso: su caché, pool y métricas son
+            # los que muestra el panel de métricas del dashboard
+            client = APIServiceFactory.get_shared_client()
+            aviation_service = AviationDataService(client)
+            
+            # Obtener rutas de AIFA (NLU)
+            aifa_routes = await aviation_service.get_airline_routes('NLU')
+            
+            if aifa_routes.success:
+                # Procesar datos reales
+                routes_data = []
+                for route in aifa_routes.data.get('data', []):
+                    routes_data.append({
+                        'airline': route.get('airline', {}).get('name', 'Unknown'),
+                        'source': route.get('departure', {}).get('iata', 'NLU'),
+                        'destination': route.get('arrival', {}).get('iata', 'Unknown')
+                    })
                 
-                # Obtener rutas de AIFA (NLU)
-                aifa_routes = await aviation_service.get_airline_routes('NLU')
+                # Guardar a CSV
+                df = pd.DataFrame(routes_data)
+                df.to_csv(self.data_path / 'rutas_aifa.csv', index=False)
                 
-                if aifa_routes.success:
-                    # Procesar datos reales
-                    routes_data = []
-                    for route in aifa_routes.data.get('data', []):
-                        routes_data.append({
-                            'airline': route.get('airline', {}).get('name', 'Unknown'),
-                            'source': route.get('departure', {}).get('iata', 'NLU'),
-                            'destination': route.get('arrival', {}).get('iata', 'Unknown')
-                        })
-                    
-                    # Guardar a CSV
-                    df = pd.DataFrame(routes_data)
-                    df.to_csv(self.data_path / 'rutas_aifa.csv', index=False)
-                    
-                    logger.info(f"Rutas actualizadas: {len(routes_data)} rutas")
-                    return True
-                else:
-                    logger.error(f"Error obteniendo rutas: {aifa_routes.error}")
-                    return False
+                logger.info(f"Rutas actualizadas: {len(routes_data)} rutas")
+                return True
+            else:
+                logger.error(f"Error obteniendo rutas: {aifa_routes.error}")
+                return False
         
         except Exception as e:
             logger.error(f"Error en _fetch_current_routes: {e}")
@@ -152,59 +151,72 @@ class AIFADataFetcher:
                 logger.warning("Amadeus API no disponible, usando precios simulados")
                 return await self._simulate_pricing_data()
             
-            async with APIClient() as client:
-                pricing_service = PricingService(client)
-                
-                # Rutas principales de AIFA
-                routes = [
-                    ('NLU', 'CUN'),  # Cancún
-                    ('NLU', 'GDL'),  # Guadalajara
-                    ('NLU', 'TIJ'),  # Tijuana
-                    ('NLU', 'LAX'),  # Los Angeles
-                    ('NLU', 'MIA'),  # Miami
-                ]
-                
-                pricing_data = []
-                
-                for origin, destination in routes:
-                    # Obtener ofertas actuales
-                    tomorrow = (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
-                    offers = await pricing_service.get_flight_offers(
-                        origin, destination, tomorrow
+            # Cliente compartido del proceso: su caché, pool y métricas son
+            # los que muestra el panel de métricas del dashboard
+            client = APIServiceFactory.get_shared_client()
+            # Rutas principales de AIFA
+            routes = [
+                ('NLU', 'CUN'),  # Cancún
+                ('NLU', 'GDL'),  # Guadalajara
+                ('NLU', 'TIJ'),  # Tijuana
+                ('NLU', 'LAX'),  # Los Angeles
+                ('NLU', 'MIA'),  # Miami
+            ]
+            
+            pricing_data = []
+            
+            # Obtener ofertas actuales de todas las rutas concurrentemente
+            tomorrow = (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
+            all_offers = await client.request_many(
+                [
+                    RequestSpec(
+                        api_name='amadeus',
+                        endpoint='/shopping/flight-offers',
+                        params={
+                            'originLocationCode': origin,
+                            'destinationLocationCode': destination,
+                            'departureDate': tomorrow,
+                            'adults': 1
+                        }
                     )
+                    for origin, destination in routes
+                ],
+                concurrency=len(routes)
+            )
+            
+            for (origin, destination), offers in zip(routes, all_offers):
+                if offers.success and offers.data.get('data'):
+                    # Calcular precio promedio
+                    prices = []
+                    for offer in offers.data['data']:
+                        price = float(offer['price']['total'])
+                        prices.append(price)
                     
-                    if offers.success and offers.data.get('data'):
-                        # Calcular precio promedio
-                        prices = []
-                        for offer in offers.data['data']:
-                            price = float(offer['price']['total'])
-                            prices.append(price)
-                        
-                        avg_price = sum(prices) / len(prices) if prices else 2000
-                        
-                        pricing_data.append({
-                            'source': origin,
-                            'destination': destination,
-                            'tarifa_promedio_mxn': int(avg_price)
-                        })
-                    else:
-                        # Fallback con precios estimados
-                        estimated_prices = {
-                            'CUN': 1800, 'GDL': 1200, 'TIJ': 2200,
-                            'LAX': 4200, 'MIA': 3800
-                        }
-                        pricing_data.append({
-                            'source': origin,
-                            'destination': destination,
-                            'tarifa_promedio_mxn': estimated_prices.get(destination, 2000)
-                        })
-                
-                # Guardar datos
-                df = pd.DataFrame(pricing_data)
-                df.to_csv(self.data_path / 'tarifas_promedio.csv', index=False)
-                
-                logger.info(f"Precios actualizados: {len(pricing_data)} rutas")
-                return True
+                    avg_price = sum(prices) / len(prices) if prices else 2000
+                    
+                    pricing_data.append({
+                        'source': origin,
+                        'destination': destination,
+                        'tarifa_promedio_mxn': int(avg_price)
+                    })
+                else:
+                    # Fallback con precios estimados
+                    estimated_prices = {
+                        'CUN': 1800, 'GDL': 1200, 'TIJ': 2200,
+                        'LAX': 4200, 'MIA': 3800
+                    }
+                    pricing_data.append({
+                        'source': origin,
+                        'destination': destination,
+                        'tarifa_promedio_mxn': estimated_prices.get(destination, 2000)
+                    })
+            
+            # Guardar datos
+            df = pd.DataFrame(pricing_data)
+            df.to_csv(self.data_path / 'tarifas_promedio.csv', index=False)
+            
+            logger.info(f"Precios actualizados: {len(pricing_data)} rutas")
+            return True
                 
         except Exception as e:
             logger.error(f"Error en _fetch_pricing_data: {e}")
@@ -327,7 +339,11 @@ async def update_all_data():
     fetcher = AIFADataFetcher()
     
     logger.info("Iniciando actualización de datos...")
-    results = await fetcher.fetch_all_data()
+    try:
+        results = await fetcher.fetch_all_data()
+    finally:
+        # Cierra la sesión aiohttp de este loop antes de que asyncio.run lo cierre
+        await APIServiceFactory.shutdown()
     
     success_count = sum(1 for v in results.values() if v is True)
     total_count = len(results)
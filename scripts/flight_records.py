@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Modelo columnar de vuelos para AIFA
+Un solo esquema (DataFrame con columnas tipadas) para OpenSky, FlightRadar24,
+AviationStack y FlightAware; los normalizadores construyen las columnas
+directamente de los arreglos crudos de cada API, sin un dict por vuelo
+"""
+
+from typing import Dict, Any, Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+# Esquema: columna → dtype. Unidades: metros, m/s, grados, minutos, UTC
+FLIGHT_SCHEMA: Dict[str, str] = {
+    'source': 'category',
+    'flight_id': 'object',
+    'icao24': 'object',
+    'callsign': 'object',
+    'airline': 'object',
+    'origin': 'object',
+    'destination': 'object',
+    'origin_country': 'object',
+    'aircraft_type': 'object',
+    'status': 'object',
+    'cancelled': 'boolean',
+    'latitude': 'float64',
+    'longitude': 'float64',
+    'altitude': 'float64',
+    'velocity': 'float64',
+    'heading': 'float64',
+    'distance_to_aifa_km': 'float64',
+    'delay_minutes': 'float64',
+    'timestamp': 'datetime64[ns, UTC]',
+    'scheduled_time': 'datetime64[ns, UTC]'
+}
+FLIGHT_COLUMNS = tuple(FLIGHT_SCHEMA)
+
+# Columnas de los CSV de posiciones (vuelos_*.csv). La distancia antes se
+# llamaba 'distance_to_aifa' en vuelos_mexico_tiempo_real.csv y vuelos_cerca_aifa.csv
+POSITION_CSV_COLUMNS = (
+    'icao24', 'callsign', 'origin_country', 'longitude', 'latitude', 'altitude',
+    'velocity', 'heading', 'timestamp', 'distance_to_aifa_km'
+)
+
+# Coordenadas AIFA para distancias (las mismas de los fetchers de OpenSky)
+AIFA_LAT, AIFA_LON = 19.7365, -99.0149
+EARTH_RADIUS_KM = 6371
+
+# Criterio de "relacionado con AIFA" del zone feed de FlightRadar24
+AIFA_INDICATORS = ('NLU', 'MMSM', 'AIFA', 'FELIPE ANGELES', 'SANTA LUCIA')
+AIFA_PROXIMITY_CENTER = (19.7425, -99.0157)
+AIFA_PROXIMITY_DEGREES = 0.2  # ~20 km
+
+FEET_TO_METERS = 0.3048
+KNOTS_TO_MPS = 0.514444
+KMH_TO_MPS = 1 / 3.6
+
+# Posiciones en los state vectors de OpenSky
+OPENSKY_STATE_FIELDS = {
+    'icao24': 0, 'callsign': 1, 'origin_country': 2, 'longitude': 5,
+    'latitude': 6, 'altitude': 7, 'velocity': 9, 'heading': 10
+}
+
+# Posiciones en las filas del zone feed de FlightRadar24 (altitud en ft, velocidad en kt)
+FR24_ZONE_FIELDS = {
+    'callsign': 1, 'latitude': 2, 'longitude': 3, 'heading': 4, 'altitude': 5,
+    'velocity': 6, 'aircraft_type': 8, 'origin': 11, 'destination': 12, 'airline': 13
+}
+FR24_MIN_FIELDS = 8
+
+# Hora del evento en FlightAware por dirección (la primera disponible)
+FLIGHTAWARE_EVENT_FIELDS = {
+    'departures': ('actual_off', 'actual_out', 'estimated_out', 'scheduled_out'),
+    'arrivals': ('actual_on', 'actual_in', 'estimated_in', 'scheduled_in')
+}
+FLIGHTAWARE_DELAY_FIELDS = {'departures': 'departure_delay', 'arrivals': 'arrival_delay'}
+
+
+def flights_frame(columns: Dict[str, Any], length: int, source: str) -> pd.DataFrame:
+    """
+    DataFrame con el esquema completo a partir de las columnas disponibles
+
+    Las columnas que la fuente no trae quedan vacías (NaN/None/NaT).
+    """
+    data = {}
+    for name, dtype in FLIGHT_SCHEMA.items():
+        if name == 'source':
+            data[name] = pd.Categorical([source] * length)
+            continue
+        # Sin índice: las columnas se alinean por posición
+        values = pd.Series(np.asarray(columns[name], dtype=object) if name in columns else [None] * length, dtype=object)
+        if dtype.startswith('datetime64'):
+            data[name] = pd.to_datetime(values, utc=True, errors='coerce').to_numpy()
+        elif dtype == 'float64':
+            data[name] = pd.to_numeric(values, errors='coerce').to_numpy(dtype=float)
+        elif dtype == 'boolean':
+            data[name] = pd.array(values.where(values.notna(), None), dtype='boolean')
+        else:
+            data[name] = values.where(values.notna(), None).to_numpy()
+    frame = pd.DataFrame(data, index=pd.RangeIndex(length))
+    for name in ('timestamp', 'scheduled_time'):
+        frame[name] = pd.to_datetime(frame[name], utc=True).astype(FLIGHT_SCHEMA[name])
+    return frame
+
+
+def empty_flights() -> pd.DataFrame:
+    return flights_frame({}, 0, 'none')
+
+
+def distance_to_aifa_km(latitude: np.ndarray, longitude: np.ndarray) -> np.ndarray:
+    """Haversine vectorizado a AIFA; NaN si falta (o es 0) alguna coordenada"""
+    lat = np.asarray(latitude, dtype=float)
+    lon = np.asarray(longitude, dtype=float)
+    valid = np.isfinite(lat) & np.isfinite(lon) & (lat != 0) & (lon != 0)
+
+    lat1, lon1 = np.radians(AIFA_LAT), np.radians(AIFA_LON)
+    lat2, lon2 = np.radians(lat), np.radians(lon)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    with np.errstate(invalid='ignore'):
+        distance = 2 * np.arcsin(np.sqrt(a)) * EARTH_RADIUS_KM
+    return np.where(valid, distance, np.nan)
+
+
+def _positional(rows: pd.DataFrame, fields: Dict[str, int]) -> Dict[str, pd.Series]:
+    """Columnas por posición de un DataFrame de listas crudas (faltantes = None)"""
+    return {
+        name: rows[position] if position in rows.columns else pd.Series([None] * len(rows), dtype=object)
+        for name, position in fields.items()
+    }
+
+
+def from_opensky_states(states: Optional[List[list]], time: Optional[float] = None) -> pd.DataFrame:
+    """
+    State vectors de OpenSky (`/states/all`) → esquema
+
+    Igual que los fetchers anteriores, solo se conservan los vectores con
+    callsign. `time` es el campo 'time' de la respuesta (epoch).
+    """
+    if not states:
+        return empty_flights()
+    rows = pd.DataFrame(states)
+    rows = rows[rows[OPENSKY_STATE_FIELDS['callsign']].fillna('').astype(bool)].reset_index(drop=True)
+
+    columns = _positional(rows, OPENSKY_STATE_FIELDS)
+    columns['callsign'] = columns['callsign'].str.strip()
+    columns['flight_id'] = columns['icao24']
+    columns['distance_to_aifa_km'] = distance_to_aifa_km(
+        pd.to_numeric(columns['latitude'], errors='coerce'), pd.to_numeric(columns['longitude'], errors='coerce')
+    )
+    if time is not None:
+        columns['timestamp'] = pd.to_datetime([time] * len(rows), unit='s', utc=True)
+    return flights_frame(columns, len(rows), 'opensky')
+
+
+def from_fr24_zone(aircraft: Union[Dict[str, list], List[list], None], time: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+    """
+    Aeronaves del zone feed de FlightRadar24 → esquema
+
+    Acepta {flight_id: fila} o una lista de filas; ignora filas con menos
+    de FR24_MIN_FIELDS campos. Convierte altitud (ft) y velocidad (kt).
+    """
+    if isinstance(aircraft, dict):
+        ids = [key for key, row in aircraft.items() if isinstance(row, list) and len(row) >= FR24_MIN_FIELDS]
+        raw = [aircraft[key] for key in ids]
+    elif isinstance(aircraft, list):
+        ids = [i for i, row in enumerate(aircraft) if isinstance(row, list) and len(row) >= FR24_MIN_FIELDS]
+        raw = [aircraft[i] for i in ids]
+    else:
+        ids, raw = [], []
+    if not raw:
+        return empty_flights()
+
+    rows = pd.DataFrame(raw)
+    columns = _positional(rows, FR24_ZONE_FIELDS)
+    columns['flight_id'] = pd.Series(ids, dtype=object).astype(str)
+    columns['altitude'] = pd.to_numeric(columns['altitude'], errors='coerce') * FEET_TO_METERS
+    columns['velocity'] = pd.to_numeric(columns['velocity'], errors='coerce') * KNOTS_TO_MPS
+    columns['distance_to_aifa_km'] = distance_to_aifa_km(
+        pd.to_numeric(columns['latitude'], errors='coerce'), pd.to_numeric(columns['longitude'], errors='coerce')
+    )
+    columns['timestamp'] = [time or pd.Timestamp.now(tz='UTC')] * len(rows)
+    return flights_frame(columns, len(rows), 'flightradar24')
+
+
+def _nested(flat: pd.DataFrame, name: str) -> pd.Series:
+    """Columna de `pd.json_normalize` (None si la respuesta no la trae)"""
+    return flat[name] if name in flat.columns else pd.Series([None] * len(flat), dtype=object)
+
+
+def from_aviationstack(flights: Optional[List[Dict[str, Any]]]) -> pd.DataFrame:
+    """Vuelos de AviationStack (`/flights` → 'data') → esquema"""
+    if not flights:
+        return empty_flights()
+    flat = pd.json_normalize(flights)
+    col = lambda name: _nested(flat, name)
+
+    timestamp = col('departure.actual').fillna(col('departure.estimated')).fillna(col('departure.scheduled'))
+    latitude = pd.to_numeric(col('live.latitude'), errors='coerce')
+    longitude = pd.to_numeric(col('live.longitude'), errors='coerce')
+    columns = {
+        'flight_id': col('flight.iata').fillna(col('flight.icao')),
+        'icao24': col('aircraft.icao24'),
+        'callsign': col('flight.icao'),
+        'airline': col('airline.name'),
+        'origin': col('departure.iata'),
+        'destination': col('arrival.iata'),
+        'aircraft_type': col('aircraft.iata'),
+        'status': col('flight_status'),
+        'cancelled': col('flight_status') == 'cancelled',
+        'latitude': latitude,
+        'longitude': longitude,
+        'altitude': col('live.altitude'),
+        'velocity': pd.to_numeric(col('live.speed_horizontal'), errors='coerce') * KMH_TO_MPS,
+        'heading': col('live.direction'),
+        'distance_to_aifa_km': distance_to_aifa_km(latitude, longitude),
+        'delay_minutes': col('departure.delay'),
+        'timestamp': timestamp,
+        'scheduled_time': col('departure.scheduled')
+    }
+    return flights_frame(columns, len(flat), 'aviationstack')
+
+
+def from_flightaware(flights: Optional[List[Dict[str, Any]]], direction: str = 'departures') -> pd.DataFrame:
+    """
+    Vuelos de FlightAware AeroAPI (`/airports/{id}/departures|arrivals`) → esquema
+
+    `timestamp` es la hora del evento de la dirección (despegue o aterrizaje)
+    y `delay_minutes` el retraso de esa dirección.
+    """
+    if not flights:
+        return empty_flights()
+    flat = pd.json_normalize(flights)
+    col = lambda name: _nested(flat, name)
+
+    event_fields = FLIGHTAWARE_EVENT_FIELDS[direction]
+    timestamp = col(event_fields[0])
+    for name in event_fields[1:]:
+        timestamp = timestamp.fillna(col(name))
+    scheduled = 'scheduled_out' if direction == 'departures' else 'scheduled_in'
+
+    columns = {
+        'flight_id': col('fa_flight_id'),
+        'callsign': col('ident'),
+        'airline': col('operator'),
+        'origin': col('origin.code_iata').fillna(col('origin.code')),
+        'destination': col('destination.code_iata').fillna(col('destination.code')),
+        'aircraft_type': col('aircraft_type'),
+        'status': col('status'),
+        'cancelled': col('cancelled').fillna(False).astype(bool),
+        'delay_minutes': pd.to_numeric(col(FLIGHTAWARE_DELAY_FIELDS[direction]), errors='coerce') / 60,
+        'timestamp': timestamp,
+        'scheduled_time': col(scheduled)
+    }
+    return flights_frame(columns, len(flat), 'flightaware')
+
+
+def aifa_related_mask(flights: pd.DataFrame) -> np.ndarray:
+    """Vuelos con AIFA en origen/destino/callsign o a ~20 km de AIFA"""
+    pattern = '|'.join(AIFA_INDICATORS)
+    by_text = np.zeros(len(flights), dtype=bool)
+    for name in ('origin', 'destination', 'callsign'):
+        by_text |= flights[name].fillna('').astype(str).str.upper().str.contains(pattern, regex=True).to_numpy()
+
+    lat = flights['latitude'].to_numpy(dtype=float)
+    lon = flights['longitude'].to_numpy(dtype=float)
+    with np.errstate(invalid='ignore'):
+        near = (
+            (lat != 0) & (lon != 0) &
+            (np.abs(lat - AIFA_PROXIMITY_CENTER[0]) < AIFA_PROXIMITY_DEGREES) &
+            (np.abs(lon - AIFA_PROXIMITY_CENTER[1]) < AIFA_PROXIMITY_DEGREES)
+        )
+    return by_text | near
+
+
+def to_records(flights: pd.DataFrame, columns: Iterable[str] = None) -> List[Dict[str, Any]]:
+    """
+    Filas como dicts serializables a JSON (NaN → None, fechas ISO)
+
+    Solo para subconjuntos pequeños que se muestran o se guardan en JSON.
+    """
+    frame = flights[list(columns)] if columns is not None else flights
+    frame = frame.astype(object).where(frame.notna(), None)
+    records = frame.to_dict('records')
+    for record in records:
+        for name, value in record.items():
+            if isinstance(value, pd.Timestamp):
+                record[name] = value.isoformat()
+    return records
+
+
+def to_fr24_records(flights: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    Registros JSON del zone feed con las llaves y unidades anteriores
+
+    'altitude' sigue en ft y 'speed' en kt, como en la respuesta original
+    del zone feed; las unidades del esquema van en 'altitude_m' y
+    'velocity' (m/s).
+    """
+    records = to_records(flights)
+    for record in records:
+        altitude, velocity = record['altitude'], record['velocity']
+        record['altitude_m'] = altitude
+        record['altitude'] = round(altitude / FEET_TO_METERS) if altitude is not None else None
+        record['speed'] = round(velocity / KNOTS_TO_MPS) if velocity is not None else None
+    return records
+
+
+def write_flights_csv(flights: pd.DataFrame, path, columns: Iterable[str] = POSITION_CSV_COLUMNS):
+    """
+    Escribe las columnas del esquema indicadas (por defecto las de posiciones)
+
+    'timestamp' se escribe en UTC con offset ('2025-08-06 16:00:00+00:00');
+    los CSV anteriores al esquema común tenían hora local sin zona.
+    """
+    flights[list(columns)].to_csv(path, index=False)
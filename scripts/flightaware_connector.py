@@ -5,11 +5,167 @@ API Key: gbSpYb4XG8AXJzyC6Gx3WevjWfPR7NKc
 Documentación: https://www.flightaware.com/commercial/aeroapi/documentation
 """
 
-import requests
+import heapq
 import json
-from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional, Tuple
 import logging
+import numpy as np
+import pandas as pd
+from flight_records import FLIGHTAWARE_DELAY_FIELDS, from_flightaware
+from http_transport import PROBE_TIMEOUT, get_http_transport
+
+# Un vuelo con más de 15 minutos de retraso cuenta como demorado (criterio OTP)
+ON_TIME_THRESHOLD_MINUTES = 15
+
+# Ventana de vuelos que se conserva en el índice de delays
+DELAY_WINDOW_HOURS = 24
+
+# Traslape al pedir vuelos desde el último cursor (actualizaciones tardías)
+POLL_OVERLAP_MINUTES = 10
+
+# Intervalo mínimo entre polls de vuelos por aeropuerto: cada poll cuesta dos
+# llamadas de AeroAPI (salidas y llegadas); dentro del intervalo se regresan
+# los agregados del índice sin requests
+MIN_POLL_INTERVAL_S = 300
+
+# Un 4xx de /delays (endpoint fuera del plan) no se vuelve a probar en este lapso
+DELAYS_ENDPOINT_RETRY_S = 6 * 3600
+
+# Índice de delays, cursor (último poll exitoso) y último intento de poll por
+# aeropuerto, compartidos por todos los conectores del proceso; el lock
+# serializa los polls
+_delay_indexes: Dict[str, 'FlightDelayIndex'] = {}
+_delay_cursors: Dict[str, datetime] = {}
+_delay_polled_at: Dict[str, float] = {}
+_delay_lock = threading.Lock()
+
+# Último 4xx de /delays por aeropuerto: (monotonic, status_code, mensaje)
+_delays_endpoint_errors: Dict[str, Tuple[float, int, str]] = {}
+
+
+def delays_endpoint_error(airport_code: str) -> Optional[Dict[str, Any]]:
+    """Error recordado de /delays si el endpoint no debe probarse todavía"""
+    entry = _delays_endpoint_errors.get(airport_code)
+    if entry is None or time.monotonic() - entry[0] >= DELAYS_ENDPOINT_RETRY_S:
+        return None
+    return {'success': False, 'error_code': entry[1], 'error_msg': entry[2], 'endpoint_omitido': True}
+
+
+def remember_delays_endpoint_error(airport_code: str, status_code: int, message: str) -> Dict[str, Any]:
+    """
+    Registra una respuesta no-200 de /delays
+
+    Solo los 4xx distintos de 429 se recuerdan (endpoint fuera del plan o
+    aeropuerto sin datos); los 5xx y 429 se reintentan en el siguiente render.
+
+    Returns:
+        Error en el formato de get_delay_statistics
+    """
+    message = message[:200]
+    if 400 <= status_code < 500 and status_code != 429:
+        _delays_endpoint_errors[airport_code] = (time.monotonic(), status_code, message)
+    return {'success': False, 'error_code': status_code, 'error_msg': message}
+
+
+class FlightDelayIndex:
+    """
+    Índice local de vuelos por `fa_flight_id` con agregados de delay
+
+    Recibe los vuelos ya normalizados con `flight_records.from_flightaware`.
+    Cada vuelo aporta (vuelos, demorados, minutos de delay, cancelados) a los
+    totales de su dirección. Al recibir de nuevo un vuelo se resta su aporte
+    anterior y se suma el nuevo, así que actualizar cuesta O(vuelos
+    cambiados) y no se recalcula la lista completa. Los vuelos fuera de la
+    ventana se descartan restando su aporte.
+    """
+
+    def __init__(self, window_hours: float = DELAY_WINDOW_HOURS):
+        self.window = timedelta(hours=window_hours)
+        self._flights: Dict[str, Tuple[str, datetime, Tuple[int, int, float, int]]] = {}
+        self._expiry: List[Tuple[datetime, str]] = []
+        self._totals: Dict[str, List[float]] = {direction: [0, 0, 0.0, 0] for direction in FLIGHTAWARE_DELAY_FIELDS}
+        self._lock = threading.Lock()
+
+    def _apply(self, direction: str, contribution: Tuple[int, int, float, int], sign: int):
+        totals = self._totals[direction]
+        for i, value in enumerate(contribution):
+            totals[i] += sign * value
+
+    def upsert(self, flights: pd.DataFrame, direction: str) -> int:
+        """
+        Agrega o actualiza vuelos de una dirección
+
+        Args:
+            flights: DataFrame de `from_flightaware(..., direction)`
+
+        Returns:
+            Vuelos nuevos o con datos distintos a los del índice
+        """
+        flights = flights[flights['flight_id'].notna() & flights['timestamp'].notna()]
+
+        # Aporte (vuelos, demorados, minutos, cancelados) de todos los vuelos a la vez
+        cancelled = flights['cancelled'].fillna(False).to_numpy(dtype=bool)
+        delay_minutes = np.where(cancelled, 0.0, flights['delay_minutes'].fillna(0).clip(lower=0).to_numpy(dtype=float))
+        counted = (~cancelled).astype(int)
+        delayed = (counted.astype(bool) & (delay_minutes > ON_TIME_THRESHOLD_MINUTES)).astype(int)
+        contributions = zip(counted.tolist(), delayed.tolist(), delay_minutes.tolist(), cancelled.astype(int).tolist())
+
+        changed = 0
+        with self._lock:
+            for flight_id, event_time, contribution in zip(flights['flight_id'], flights['timestamp'], contributions):
+                previous = self._flights.get(flight_id)
+                if previous is not None:
+                    if previous[2] == contribution:
+                        continue
+                    self._apply(previous[0], previous[2], -1)
+                self._apply(direction, contribution, 1)
+                self._flights[flight_id] = (direction, event_time, contribution)
+                heapq.heappush(self._expiry, (event_time, flight_id))
+                changed += 1
+        return changed
+
+    def prune(self, now: datetime) -> int:
+        """Descarta los vuelos cuyo evento quedó fuera de la ventana"""
+        cutoff = now - self.window
+        removed = 0
+        with self._lock:
+            while self._expiry and self._expiry[0][0] < cutoff:
+                event_time, flight_id = heapq.heappop(self._expiry)
+                entry = self._flights.get(flight_id)
+                # Entradas viejas del heap (el vuelo se actualizó con otra hora) se ignoran
+                if entry is not None and entry[1] == event_time:
+                    self._apply(entry[0], entry[2], -1)
+                    del self._flights[flight_id]
+                    removed += 1
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            per_direction = {direction: list(totals) for direction, totals in self._totals.items()}
+            indexed = len(self._flights)
+
+        flights = sum(totals[0] for totals in per_direction.values())
+        delayed = sum(totals[1] for totals in per_direction.values())
+        delay_minutes = sum(totals[2] for totals in per_direction.values())
+
+        def average(direction: str) -> float:
+            count = per_direction[direction][0]
+            return round(per_direction[direction][2] / count, 1) if count else 0.0
+
+        return {
+            'total_flights': flights,
+            'delayed_flights': delayed,
+            'cancelled_flights': sum(totals[3] for totals in per_direction.values()),
+            'average_delay_minutes': round(delay_minutes / flights, 1) if flights else 0.0,
+            'average_departure_delay': average('departures'),
+            'average_arrival_delay': average('arrivals'),
+            'on_time_percentage': round((flights - delayed) / flights * 100, 1) if flights else None,
+            'indexed_flights': indexed
+        }
+
 
 class FlightAwareConnector:
     """
@@ -23,7 +179,7 @@ class FlightAwareConnector:
             "x-apikey": self.api_key,
             "Accept": "application/json; charset=UTF-8"
         }
-        self.timeout = 15
+        self.http = get_http_transport()
         
     def test_connection(self) -> Dict[str, Any]:
         """
@@ -34,7 +190,7 @@ class FlightAwareConnector:
             url = f"{self.base_url}/airports"
             params = {'max_pages': 1}
             
-            response = requests.get(url, headers=self.headers, params=params, timeout=5)
+            response = self.http.get(url, headers=self.headers, params=params, timeout=PROBE_TIMEOUT)
             
             if response.status_code == 200:
                 data = response.json()
@@ -82,7 +238,7 @@ class FlightAwareConnector:
         try:
             url = f"{self.base_url}/airports/{airport_code}"
             
-            response = requests.get(url, headers=self.headers, timeout=self.timeout)
+            response = self.http.get(url, headers=self.headers)
             
             if response.status_code == 200:
                 data = response.json()
@@ -106,10 +262,12 @@ class FlightAwareConnector:
                 'error': str(e)
             }
     
-    def get_airport_flights(self, airport_code: str = "NLU", flight_type: str = "departures") -> Dict[str, Any]:
+    def get_airport_flights(self, airport_code: str = "NLU", flight_type: str = "departures",
+                            start: Optional[datetime] = None) -> Dict[str, Any]:
         """
         Obtiene vuelos del aeropuerto
         flight_type: 'departures', 'arrivals', 'scheduled_departures', 'scheduled_arrivals'
+        start: Solo vuelos cuyo evento ocurrió a partir de este momento
         """
         try:
             url = f"{self.base_url}/airports/{airport_code}/{flight_type}"
@@ -117,8 +275,10 @@ class FlightAwareConnector:
                 'max_pages': 2,  # Limitar para plan gratuito
                 'cursor': None
             }
+            if start is not None:
+                params['start'] = start.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
             
-            response = requests.get(url, headers=self.headers, params=params, timeout=self.timeout)
+            response = self.http.get(url, headers=self.headers, params=params)
             
             if response.status_code == 200:
                 data = response.json()
@@ -152,10 +312,14 @@ class FlightAwareConnector:
         Obtiene estadísticas de delays del aeropuerto
         """
         try:
+            # /delays fuera del plan: directo al cálculo con el índice de vuelos
+            if delays_endpoint_error(airport_code):
+                return self.calculate_delays_from_flights(airport_code)
+            
             # Intentar endpoint de estadísticas
             url = f"{self.base_url}/airports/{airport_code}/delays"
             
-            response = requests.get(url, headers=self.headers, timeout=self.timeout)
+            response = self.http.get(url, headers=self.headers)
             
             if response.status_code == 200:
                 data = response.json()
@@ -167,7 +331,8 @@ class FlightAwareConnector:
                 }
             else:
                 # Fallback: calcular delays de vuelos actuales
-                return self._calculate_delays_from_flights(airport_code)
+                remember_delays_endpoint_error(airport_code, response.status_code, response.text)
+                return self.calculate_delays_from_flights(airport_code)
                 
         except Exception as e:
             return {
@@ -176,69 +341,132 @@ class FlightAwareConnector:
                 'fallback': 'Usar cálculo manual de delays'
             }
     
-    def _calculate_delays_from_flights(self, airport_code: str = "NLU") -> Dict[str, Any]:
+    def calculate_delays_from_flights(self, airport_code: str = "NLU", incremental: bool = True) -> Dict[str, Any]:
         """
         Calcula estadísticas de delay basándose en vuelos actuales
+        
+        En modo incremental solo se piden los vuelos con evento desde el
+        último cursor (con un traslape) y se actualizan los agregados del
+        índice del proceso; `incremental=False` descarta el índice y recarga
+        la ventana. Cada aeropuerto se consulta a lo más una vez por
+        MIN_POLL_INTERVAL_S; dentro del intervalo se regresan los agregados
+        del índice sin requests ('flights_fetched': 0). Si el poll falla y el
+        índice ya tiene vuelos, se regresan sus estadísticas marcadas con
+        'stale': True.
         """
         try:
-            # Obtener departures y arrivals
-            departures = self.get_airport_flights(airport_code, 'departures')
-            arrivals = self.get_airport_flights(airport_code, 'arrivals')
-            
-            total_flights = 0
-            delayed_flights = 0
-            total_delay_minutes = 0
-            
-            # Analizar departures
-            if departures.get('success'):
-                for flight in departures.get('flights', []):
-                    total_flights += 1
-                    # Lógica para detectar delays (depende de estructura de datos)
-                    # Por ahora usar datos simulados basados en promedios
-            
-            # Analizar arrivals  
-            if arrivals.get('success'):
-                for flight in arrivals.get('flights', []):
-                    total_flights += 1
-            
-            # Estadísticas simuladas si no hay datos suficientes
-            if total_flights == 0:
-                return {
-                    'success': True,
-                    'calculated_stats': True,
-                    'total_flights_analyzed': 0,
-                    'delay_stats': {
-                        'average_departure_delay': 8.5,  # minutos
-                        'average_arrival_delay': 12.3,
-                        'on_time_percentage': 82.7,
-                        'note': 'Estadísticas estimadas - datos insuficientes'
-                    },
-                    'timestamp': datetime.now().isoformat()
-                }
-            
-            # Calcular estadísticas reales si hay datos
-            on_time_percentage = ((total_flights - delayed_flights) / total_flights) * 100
-            avg_delay = total_delay_minutes / max(delayed_flights, 1)
-            
-            return {
-                'success': True,
-                'calculated_stats': True,
-                'total_flights_analyzed': total_flights,
-                'delayed_flights': delayed_flights,
-                'delay_stats': {
-                    'average_delay_minutes': avg_delay,
-                    'on_time_percentage': on_time_percentage,
-                    'total_flights': total_flights
-                },
-                'timestamp': datetime.now().isoformat()
-            }
-            
+            with _delay_lock:
+                return self._poll_delay_index(airport_code, incremental)
         except Exception as e:
             return {
                 'success': False,
                 'error': str(e)
             }
     
+    def _poll_delay_index(self, airport_code: str, incremental: bool) -> Dict[str, Any]:
+        now = datetime.now(timezone.utc)
+        index = _delay_indexes.get(airport_code)
+        cursor = _delay_cursors.get(airport_code)
+        polled_at = _delay_polled_at.get(airport_code)
+        if incremental and polled_at is not None and time.monotonic() - polled_at < MIN_POLL_INTERVAL_S:
+            return self._cached_delay_stats(index, cursor, now)
+        
+        if index is None or not incremental:
+            index = _delay_indexes[airport_code] = FlightDelayIndex()
+            cursor = None
+        _delay_polled_at[airport_code] = time.monotonic()
+        start = cursor - timedelta(minutes=POLL_OVERLAP_MINUTES) if cursor else None
+        
+        # Obtener departures y arrivals cambiados desde el cursor
+        changed = 0
+        fetched = 0
+        for direction in ('departures', 'arrivals'):
+            result = self.get_airport_flights(airport_code, direction, start=start)
+            if not result.get('success'):
+                # Sin avanzar el cursor: el siguiente poll vuelve a pedir este tramo
+                if cursor is None:
+                    del _delay_indexes[airport_code]
+                    return self._estimated_delay_stats(result)
+                index.prune(now)
+                stats = index.stats()
+                if stats['total_flights'] == 0:
+                    return self._estimated_delay_stats(result)
+                return {
+                    **self._index_delay_stats(stats, cursor, fetched, changed, incremental=True),
+                    'stale': True,
+                    'error_vuelos': result.get('error_msg') or result.get('error')
+                }
+            flights = from_flightaware(result.get('flights', []), direction)
+            fetched += len(flights)
+            changed += index.upsert(flights, direction)
+        
+        _delay_cursors[airport_code] = now
+        index.prune(now)
+        stats = index.stats()
+        
+        # Estadísticas simuladas si no hay datos suficientes
+        if stats['total_flights'] == 0:
+            return self._estimated_delay_stats()
+        
+        return self._index_delay_stats(stats, now, fetched, changed, incremental=cursor is not None)
+    
+    def _cached_delay_stats(self, index: Optional['FlightDelayIndex'], cursor: Optional[datetime],
+                            now: datetime) -> Dict[str, Any]:
+        """Agregados del índice sin poll (dentro de MIN_POLL_INTERVAL_S)"""
+        if index is None or cursor is None:
+            return self._estimated_delay_stats()
+        index.prune(now)
+        stats = index.stats()
+        if stats['total_flights'] == 0:
+            return self._estimated_delay_stats()
+        result = self._index_delay_stats(stats, cursor, 0, 0, incremental=True)
+        # Un cursor más viejo que el intervalo significa que el último poll falló
+        result['stale'] = now - cursor >= timedelta(seconds=MIN_POLL_INTERVAL_S)
+        return result
+    
+    @staticmethod
+    def _index_delay_stats(stats: Dict[str, Any], cursor: datetime, fetched: int, changed: int,
+                           incremental: bool) -> Dict[str, Any]:
+        """Resultado de `calculate_delays_from_flights` a partir de `FlightDelayIndex.stats()`"""
+        return {
+            'success': True,
+            'calculated_stats': True,
+            'incremental': incremental,
+            'stale': False,
+            'total_flights_analyzed': stats['total_flights'],
+            'delayed_flights': stats['delayed_flights'],
+            'flights_fetched': fetched,
+            'flights_changed': changed,
+            'delay_stats': {
+                'average_delay_minutes': stats['average_delay_minutes'],
+                'average_departure_delay': stats['average_departure_delay'],
+                'average_arrival_delay': stats['average_arrival_delay'],
+                'on_time_percentage': stats['on_time_percentage'],
+                'cancelled_flights': stats['cancelled_flights'],
+                'total_flights': stats['total_flights']
+            },
+            'cursor': cursor.isoformat(),
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    def _estimated_delay_stats(self, error: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Estadísticas estimadas cuando no hay vuelos suficientes"""
+        stats = {
+            'success': True,
+            'calculated_stats': True,
+            'total_flights_analyzed': 0,
+            'delay_stats': {
+                'average_departure_delay': 8.5,  # minutos
+                'average_arrival_delay': 12.3,
+                'on_time_percentage': 82.7,
+                'note': 'Estadísticas estimadas - datos insuficientes'
+            },
+            'timestamp': datetime.now().isoformat()
+        }
+        if error:
+            stats['error_vuelos'] = error.get('error_msg') or error.get('error')
+        return stats
+    
     def get_aifa_operations_summary(self, airport_code: str = "NLU") -> Dict[str, Any]:
         """
         Resumen completo de operaciones AIFA
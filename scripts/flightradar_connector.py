@@ -4,11 +4,11 @@ FlightRadar24 API Connector
 Integración con FlightRadar24 para datos de vuelos en tiempo real
 """
 
-import requests
 import json
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 import time
+from http_transport import PROBE_TIMEOUT, get_http_transport
 
 class FlightRadar24Connector:
     """
@@ -63,8 +63,8 @@ class FlightRadar24Connector:
             'icao': 'MMSM'
         }
         
-        self.session = requests.Session()
-        self.session.headers.update(self.headers)
+        # Pool compartido; los headers (con la autenticación elegida) van en cada request
+        self.http = get_http_transport()
     
     def test_connection(self) -> Dict[str, Any]:
         """Prueba exhaustiva de conexión con múltiples endpoints y métodos de autenticación"""
@@ -103,7 +103,7 @@ class FlightRadar24Connector:
                         
                         print(f"   🧪 Probando: {base_url} + {list(auth_method.keys())[0]} + {endpoint_name}")
                         
-                        response = requests.get(url, headers=test_headers, params=params, timeout=5)
+                        response = self.http.get(url, headers=test_headers, params=params, timeout=PROBE_TIMEOUT)
                         
                         test_result = {
                             'base_url': base_url,
@@ -126,7 +126,7 @@ class FlightRadar24Connector:
                                 if not results['best_working_config']:
                                     results['best_working_config'] = test_result
                                     self.base_url = base_url
-                                    self.session.headers.update(auth_method)
+                                    self.headers.update(auth_method)
                                     
                             except:
                                 test_result['data_sample'] = response.text[:200]
@@ -185,7 +185,7 @@ class FlightRadar24Connector:
                 'limit': 10
             }
             
-            response = self.session.get(url, params=params, timeout=10)
+            response = self.http.get(url, headers=self.headers, params=params)
             
             if response.status_code == 200:
                 data = response.json()
@@ -250,7 +250,7 @@ class FlightRadar24Connector:
                 'limit': 50
             }
             
-            response = self.session.get(url, params=params, timeout=15)
+            response = self.http.get(url, headers=self.headers, params=params)
             
             if response.status_code == 200:
                 data = response.json()
@@ -332,7 +332,7 @@ class FlightRadar24Connector:
             for endpoint in endpoints_to_try:
                 try:
                     url = f"{self.base_url}/{endpoint}"
-                    response = self.session.get(url, timeout=10)
+                    response = self.http.get(url, headers=self.headers)
                     
                     if response.status_code == 200:
                         data = response.json()
@@ -366,7 +366,7 @@ class FlightRadar24Connector:
         try:
             url = f"{self.base_url}/flights/{flight_id}"
             
-            response = self.session.get(url, timeout=10)
+            response = self.http.get(url, headers=self.headers)
             
             if response.status_code == 200:
                 data = response.json()
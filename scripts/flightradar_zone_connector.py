@@ -4,11 +4,12 @@ FlightRadar24 Zone Feed Connector
 Integración específica con el endpoint que funciona: Zone Feed
 """
 
-import requests
 import json
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 import time
+from flight_records import from_fr24_zone, aifa_related_mask, to_fr24_records
+from http_transport import get_http_transport
 
 class FlightRadar24ZoneConnector:
     """
@@ -34,8 +35,8 @@ class FlightRadar24ZoneConnector:
             'mexico_full': {'bounds': '33,-86,14,-118', 'name': 'México Completo'}
         }
         
-        self.session = requests.Session()
-        self.session.headers.update(self.headers)
+        # Pool compartido; los headers van en cada request
+        self.http = get_http_transport()
     
     def test_connection(self) -> Dict[str, Any]:
         """Prueba la conexión con el endpoint que funciona"""
@@ -49,7 +50,7 @@ class FlightRadar24ZoneConnector:
             }
             
             start_time = time.time()
-            response = self.session.get(self.base_url, params=params, timeout=10)
+            response = self.http.get(self.base_url, headers=self.headers, params=params)
             response_time = (time.time() - start_time) * 1000
             
             if response.status_code == 200:
@@ -92,97 +93,89 @@ class FlightRadar24ZoneConnector:
                 'error': str(e)
             }
     
+    def _area_frames(self, zone: str) -> Dict[str, Any]:
+        """
+        Consulta una zona y regresa los vuelos como DataFrames
+
+        'flights' y 'aifa_flights' usan el esquema de flight_records
+        (altitud en metros, velocidad en m/s en 'velocity').
+        """
+        if zone not in self.mexico_zones:
+            return {
+                'success': False,
+                'error': f'Zona {zone} no definida. Disponibles: {list(self.mexico_zones.keys())}'
+            }
+        
+        zone_config = self.mexico_zones[zone]
+        params = {
+            'bounds': zone_config['bounds'],
+            'faa': '1',
+            'satellite': '1',
+            'mlat': '1', 
+            'flarm': '1'
+        }
+        
+        response = self.http.get(self.base_url, headers=self.headers, params=params)
+        
+        if response.status_code != 200:
+            return {
+                'success': False,
+                'error': f'HTTP {response.status_code}: {response.text}'
+            }
+        
+        data = response.json()
+        aircraft_data = data.get('aircraft', {})
+        
+        # Columnas del esquema común directo de las filas crudas
+        # (dict {flight_id: fila} o lista de filas)
+        flights = from_fr24_zone(aircraft_data)
+        
+        return {
+            'success': True,
+            'zone_config': zone_config,
+            'data': data,
+            'aircraft_data': aircraft_data,
+            'flights': flights,
+            'aifa_flights': flights[aifa_related_mask(flights)].reset_index(drop=True),
+            'timestamp': datetime.now().isoformat()
+        }
+    
     def get_flights_in_area(self, zone: str = 'aifa_area') -> Dict[str, Any]:
-        """Obtiene vuelos en una zona específica"""
+        """
+        Obtiene vuelos en una zona específica
+
+        'flights' y 'aifa_flights' son listas de dicts serializables a JSON
+        con 'altitude' en ft y 'speed' en kt, como antes; las unidades del
+        esquema común van en 'altitude_m' y 'velocity' (m/s).
+        """
         try:
-            if zone not in self.mexico_zones:
-                return {
-                    'success': False,
-                    'error': f'Zona {zone} no definida. Disponibles: {list(self.mexico_zones.keys())}'
-                }
-            
-            zone_config = self.mexico_zones[zone]
-            params = {
-                'bounds': zone_config['bounds'],
-                'faa': '1',
-                'satellite': '1',
-                'mlat': '1', 
-                'flarm': '1'
-            }
+            area = self._area_frames(zone)
+            if not area['success']:
+                return area
             
-            response = self.session.get(self.base_url, params=params, timeout=15)
+            data = area['data']
+            aircraft_data = area['aircraft_data']
+            zone_config = area['zone_config']
             
-            if response.status_code == 200:
-                data = response.json()
-                aircraft_data = data.get('aircraft', {})
-                
-                # Procesar datos de aeronaves
-                processed_flights = []
-                aifa_related_flights = []
-                
-                # Manejar diferentes estructuras de datos
-                if isinstance(aircraft_data, dict):
-                    # Formato diccionario {flight_id: flight_info}
-                    aircraft_items = aircraft_data.items()
-                elif isinstance(aircraft_data, list):
-                    # Formato lista de aeronaves
-                    aircraft_items = enumerate(aircraft_data)
-                else:
-                    # Sin datos de aeronaves
-                    aircraft_items = []
-                
-                for flight_id, flight_info in aircraft_items:
-                    try:
-                        # flight_info es típicamente una lista con datos de la aeronave
-                        if isinstance(flight_info, list) and len(flight_info) >= 8:
-                            flight_data = {
-                                'flight_id': flight_id,
-                                'callsign': flight_info[1] if len(flight_info) > 1 else 'N/A',
-                                'latitude': flight_info[2] if len(flight_info) > 2 else 0,
-                                'longitude': flight_info[3] if len(flight_info) > 3 else 0,
-                                'heading': flight_info[4] if len(flight_info) > 4 else 0,
-                                'altitude': flight_info[5] if len(flight_info) > 5 else 0,
-                                'speed': flight_info[6] if len(flight_info) > 6 else 0,
-                                'aircraft_type': flight_info[8] if len(flight_info) > 8 else 'N/A',
-                                'origin': flight_info[11] if len(flight_info) > 11 else 'N/A',
-                                'destination': flight_info[12] if len(flight_info) > 12 else 'N/A',
-                                'airline': flight_info[13] if len(flight_info) > 13 else 'N/A'
-                            }
-                            
-                            processed_flights.append(flight_data)
-                            
-                            # Detectar vuelos relacionados con AIFA
-                            if self._is_aifa_related(flight_data):
-                                aifa_related_flights.append(flight_data)
-                                
-                    except Exception as e:
-                        print(f"Error procesando vuelo {flight_id}: {e}")
-                        continue
-                
-                return {
-                    'success': True,
-                    'zone': zone_config['name'],
-                    'bounds': zone_config['bounds'],
-                    'total_aircraft': len(processed_flights),
-                    'aifa_related': len(aifa_related_flights),
-                    'full_count': data.get('full_count', 0),
-                    'version': data.get('version', 'N/A'),
-                    'flights': processed_flights,
-                    'aifa_flights': aifa_related_flights,
-                    'timestamp': datetime.now().isoformat(),
-                    'source': 'flightradar24_zone_feed',
-                    'debug_info': {
-                        'raw_data_keys': list(data.keys()),
-                        'aircraft_data_type': type(aircraft_data).__name__,
-                        'aircraft_data_length': len(aircraft_data) if hasattr(aircraft_data, '__len__') else 'N/A',
-                        'aircraft_sample': str(aircraft_data)[:200] if aircraft_data else 'Empty'
-                    }
-                }
-            else:
-                return {
-                    'success': False,
-                    'error': f'HTTP {response.status_code}: {response.text}'
+            return {
+                'success': True,
+                'zone': zone_config['name'],
+                'bounds': zone_config['bounds'],
+                'total_aircraft': len(area['flights']),
+                'aifa_related': len(area['aifa_flights']),
+                'full_count': data.get('full_count', 0),
+                'version': data.get('version', 'N/A'),
+                'flights': to_fr24_records(area['flights']),
+                'aifa_flights': to_fr24_records(area['aifa_flights']),
+                'timestamp': area['timestamp'],
+                'source': 'flightradar24_zone_feed',
+                'debug_info': {
+                    'raw_data_keys': list(data.keys()),
+                    'aircraft_data_type': type(aircraft_data).__name__,
+                    'aircraft_data_length': len(aircraft_data) if hasattr(aircraft_data, '__len__') else 'N/A',
+                    'aircraft_sample': str(aircraft_data)[:200] if aircraft_data else 'Empty'
                 }
+            }
                 
         except Exception as e:
             return {
@@ -190,74 +183,57 @@ class FlightRadar24ZoneConnector:
                 'error': str(e)
             }
     
-    def _is_aifa_related(self, flight_data: Dict) -> bool:
-        """Determina si un vuelo está relacionado con AIFA"""
-        aifa_indicators = ['NLU', 'MMSM', 'AIFA', 'FELIPE ANGELES', 'SANTA LUCIA']
-        
-        # Buscar en origen, destino, callsign
-        search_fields = [
-            flight_data.get('origin', ''),
-            flight_data.get('destination', ''),
-            flight_data.get('callsign', '')
-        ]
-        
-        for field in search_fields:
-            if field and any(indicator in str(field).upper() for indicator in aifa_indicators):
-                return True
-        
-        # También verificar proximidad geográfica (coordenadas cerca de AIFA)
-        lat = flight_data.get('latitude', 0)
-        lon = flight_data.get('longitude', 0)
-        
-        if lat and lon:
-            # AIFA está en 19.7425, -99.0157
-            aifa_lat, aifa_lon = 19.7425, -99.0157
-            
-            # Si está dentro de ~20km de AIFA
-            lat_diff = abs(lat - aifa_lat)
-            lon_diff = abs(lon - aifa_lon)
-            
-            if lat_diff < 0.2 and lon_diff < 0.2:  # Aproximadamente 20km
-                return True
-        
-        return False
-    
-    def get_aifa_summary(self) -> Dict[str, Any]:
-        """Obtiene un resumen específico de actividad AIFA"""
+    def get_aifa_summary(self, columnar: bool = False) -> Dict[str, Any]:
+        """
+        Obtiene un resumen específico de actividad AIFA
+
+        Args:
+            columnar: True para recibir los vuelos AIFA como un solo
+                DataFrame del esquema de flight_records ('aifa_flights', con
+                columna 'movimiento': salida/llegada/sobrevuelo) en vez de
+                las listas de registros; evita convertir fila por fila cuando
+                el consumidor trabaja con columnas (snapshot de KPIs)
+
+        Returns:
+            Sin `columnar`, las listas de vuelos tienen el formato de
+            get_flights_in_area (JSON, ft y kt)
+        """
         try:
             # Obtener datos del área AIFA
-            aifa_data = self.get_flights_in_area('aifa_area')
+            aifa_data = self._area_frames('aifa_area')
             
             if not aifa_data['success']:
                 return aifa_data
             
-            # Análisis específico para AIFA
-            flights = aifa_data.get('flights', [])
-            aifa_flights = aifa_data.get('aifa_flights', [])
+            # Análisis específico para AIFA (DataFrames de flight_records)
+            flights = aifa_data['flights']
+            aifa_flights = aifa_data['aifa_flights']
             
             # Clasificar vuelos AIFA
-            departures = []
-            arrivals = []
-            overflights = []
-            
-            for flight in aifa_flights:
-                origin = str(flight.get('origin', '')).upper()
-                destination = str(flight.get('destination', '')).upper()
-                
-                if 'NLU' in origin or 'MMSM' in origin:
-                    departures.append(flight)
-                elif 'NLU' in destination or 'MMSM' in destination:
-                    arrivals.append(flight)
-                else:
-                    # Vuelo que pasa cerca de AIFA
-                    overflights.append(flight)
+            aifa_codes = 'NLU|MMSM'
+            from_aifa = aifa_flights['origin'].fillna('').astype(str).str.upper().str.contains(aifa_codes)
+            to_aifa = ~from_aifa & aifa_flights['destination'].fillna('').astype(str).str.upper().str.contains(aifa_codes)
+            departures = aifa_flights[from_aifa]
+            arrivals = aifa_flights[to_aifa]
+            # Vuelos que pasan cerca de AIFA
+            overflights = aifa_flights[~from_aifa & ~to_aifa]
             
             # Estadísticas de aerolíneas
-            airlines = {}
-            for flight in aifa_flights:
-                airline = flight.get('airline', 'Unknown')
-                if airline and airline != 'N/A':
-                    airlines[airline] = airlines.get(airline, 0) + 1
+            airlines = aifa_flights['airline'].dropna()
+            airlines = {airline: int(count) for airline, count in airlines[airlines != 'N/A'].value_counts().items()}
+            
+            if columnar:
+                flight_data = {
+                    'aifa_flights': aifa_flights.assign(
+                        movimiento=from_aifa.map({True: 'salida', False: 'sobrevuelo'}).mask(to_aifa, 'llegada')
+                    )
+                }
+            else:
+                flight_data = {
+                    'departure_flights': to_fr24_records(departures),
+                    'arrival_flights': to_fr24_records(arrivals),
+                    'overflight_aircraft': to_fr24_records(overflights)
+                }
             
             return {
                 'success': True,
@@ -269,11 +245,9 @@ class FlightRadar24ZoneConnector:
                     'overflights': len(overflights)
                 },
                 'airlines_operating': airlines,
-                'departure_flights': departures,
-                'arrival_flights': arrivals,
-                'overflight_aircraft': overflights,
-                'data_freshness': aifa_data.get('timestamp'),
-                'zone_coverage': aifa_data.get('zone'),
+                **flight_data,
+                'data_freshness': aifa_data['timestamp'],
+                'zone_coverage': aifa_data['zone_config']['name'],
                 'source': 'flightradar24_zone_feed'
             }
             
@@ -331,7 +305,7 @@ def test_flightradar_zone_connector():
             print(f"🛩️ Vuelos AIFA detectados:")
             for i, flight in enumerate(aifa_data['aifa_flights'][:3], 1):
                 print(f"   {i}. {flight['callsign']} - {flight['origin']} → {flight['destination']}")
-                print(f"      Alt: {flight['altitude']}ft, Vel: {flight['speed']}kt")
+                print(f"      Alt: {flight['altitude'] or 0:.0f}m, Vel: {flight['velocity'] or 0:.0f}m/s")
     else:
         print(f"❌ Error: {aifa_data['error']}")
         return False
@@ -13,6 +13,7 @@ from typing import Dict, List, Optional, Any
 import logging
 from pathlib import Path
 from dotenv import load_dotenv
+from flight_records import from_opensky_states, write_flights_csv
 
 # Cargar variables de entorno
 load_dotenv()
@@ -118,28 +119,13 @@ class FreeAPIFetcher:
                 if response.status == 200:
                     data = await response.json()
                     
-                    # Procesar vuelos
-                    flights_data = []
-                    if data and 'states' in data:
-                        for state in data['states']:
-                            if state[1]:  # Si tiene callsign
-                                flights_data.append({
-                                    'icao24': state[0],
-                                    'callsign': state[1].strip(),
-                                    'origin_country': state[2],
-                                    'longitude': state[5],
-                                    'latitude': state[6],
-                                    'altitude': state[7],
-                                    'velocity': state[9],
-                                    'heading': state[10],
-                                    'timestamp': datetime.fromtimestamp(data['time'])
-                                })
+                    # Procesar vuelos (solo con callsign)
+                    flights = from_opensky_states(data.get('states') if data else None, data.get('time') if data else None)
                     
                     # Guardar snapshot actual
-                    if flights_data:
-                        df = pd.DataFrame(flights_data)
-                        df.to_csv(self.data_path / 'vuelos_tiempo_real.csv', index=False)
-                        logger.info(f"Vuelos en tiempo real: {len(flights_data)} detectados sobre CDMX")
+                    if len(flights):
+                        write_flights_csv(flights, self.data_path / 'vuelos_tiempo_real.csv')
+                        logger.info(f"Vuelos en tiempo real: {len(flights)} detectados sobre CDMX")
                     
                     return True
                 else:
@@ -168,44 +154,20 @@ class FreeAPIFetcher:
                     data = await response.json()
                     
                     if data and data.get('states'):
-                        flights_data = []
-                        aifa_flights = []
+                        flights = from_opensky_states(data['states'], data.get('time'))
                         
-                        for state in data['states']:
-                            if state[1]:  # Si tiene callsign
-                                # Calcular distancia a AIFA
-                                distance_to_aifa = self._calculate_distance_to_aifa(state[6], state[5]) if state[6] and state[5] else None
-                                
-                                flight_info = {
-                                    'icao24': state[0],
-                                    'callsign': state[1].strip(),
-                                    'origin_country': state[2],
-                                    'longitude': state[5],
-                                    'latitude': state[6],
-                                    'altitude': state[7],
-                                    'velocity': state[9],
-                                    'heading': state[10],
-                                    'timestamp': datetime.fromtimestamp(data['time']),
-                                    'distance_to_aifa_km': distance_to_aifa
-                                }
-                                
-                                flights_data.append(flight_info)
-                                
-                                # Filtrar vuelos cercanos a AIFA (< 100km)
-                                if distance_to_aifa and distance_to_aifa < 100:
-                                    aifa_flights.append(flight_info)
+                        # Filtrar vuelos cercanos a AIFA (< 100km)
+                        aifa_flights = flights[flights['distance_to_aifa_km'] < 100]
                         
                         # Guardar todos los vuelos  
-                        if flights_data:
-                            df_all = pd.DataFrame(flights_data)
-                            df_all.to_csv(self.data_path / 'vuelos_tiempo_real.csv', index=False)
+                        if len(flights):
+                            write_flights_csv(flights, self.data_path / 'vuelos_tiempo_real.csv')
                         
                         # Guardar vuelos cercanos a AIFA
-                        if aifa_flights:
-                            df_aifa = pd.DataFrame(aifa_flights)
-                            df_aifa.to_csv(self.data_path / 'vuelos_cerca_aifa_tiempo_real.csv', index=False)
+                        if len(aifa_flights):
+                            write_flights_csv(aifa_flights, self.data_path / 'vuelos_cerca_aifa_tiempo_real.csv')
                         
-                        logger.info(f"✅ OpenSky público: {len(flights_data)} vuelos total, {len(aifa_flights)} cerca de AIFA")
+                        logger.info(f"✅ OpenSky público: {len(flights)} vuelos total, {len(aifa_flights)} cerca de AIFA")
                         return True
                     else:
                         logger.warning("No se encontraron vuelos activos")
@@ -218,28 +180,6 @@ class FreeAPIFetcher:
             logger.error(f"Error en OpenSky público: {e}")
             return False
     
-    def _calculate_distance_to_aifa(self, lat, lon):
-        """Calcular distancia aproximada a AIFA en km"""
-        if not lat or not lon:
-            return None
-            
-        # Coordenadas AIFA: 19.7365°N, 99.0149°W
-        aifa_lat, aifa_lon = 19.7365, -99.0149
-        
-        # Fórmula haversine simplificada
-        import math
-        
-        lat1, lon1 = math.radians(aifa_lat), math.radians(aifa_lon)
-        lat2, lon2 = math.radians(lat), math.radians(lon)
-        
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-        
-        a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-        c = 2 * math.asin(math.sqrt(a))
-        
-        return c * 6371  # Radio de la Tierra en km
-    
     async def _fetch_aifa_specific_data(self) -> bool:
         """Obtiene datos específicos del aeropuerto AIFA usando OpenSky autenticado"""
         try:
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Transporte HTTP compartido para los conectores síncronos de AIFA
+Un pool de conexiones (keep-alive, gzip) por proceso, con timeouts de
+conexión y lectura por host; cada request se registra en el registro de
+métricas del proceso (el mismo de APIClient)
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Any, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from services.metrics import MetricsRegistry, RequestTrace, get_metrics_registry
+
+# Tamaño del pool: hosts distintos que se mantienen abiertos y conexiones por host
+POOL_CONNECTIONS = 16
+POOL_MAXSIZE = 16
+
+# (connect, read) en segundos; la conexión falla rápido, la lectura espera al API.
+# Los conectores no pasan timeout en sus requests de datos: el de su host es
+# el único lugar donde se ajusta
+DEFAULT_TIMEOUT: Tuple[float, float] = (3.05, 10.0)
+HOST_TIMEOUTS: Dict[str, Tuple[float, float]] = {
+    'api.aviationstack.com': (3.05, 10.0),
+    'aeroapi.flightaware.com': (3.05, 15.0),
+    'api.openweathermap.org': (3.05, 10.0),
+    'data-live.flightradar24.com': (3.05, 15.0),
+    'data-cloud.flightradar24.com': (3.05, 15.0),
+    'api.flightradar24.com': (3.05, 15.0),
+    'sandbox-api.flightradar24.com': (3.05, 15.0),
+    'api-sandbox.flightradar24.com': (3.05, 15.0),
+    'www.flightradar24.com': (3.05, 15.0),
+}
+
+# Pruebas de conexión (test_connection): lectura corta en cualquier host
+PROBE_TIMEOUT: Tuple[float, float] = (3.05, 5.0)
+
+# Nombre de API (el de config/api_config.py) por host, para las métricas
+HOST_APIS: Dict[str, str] = {
+    'api.aviationstack.com': 'aviationstack',
+    'aeroapi.flightaware.com': 'flightaware',
+    'api.openweathermap.org': 'openweather',
+    'data-live.flightradar24.com': 'flightradar24',
+    'data-cloud.flightradar24.com': 'flightradar24',
+    'api.flightradar24.com': 'flightradar24',
+    'sandbox-api.flightradar24.com': 'flightradar24',
+    'api-sandbox.flightradar24.com': 'flightradar24',
+    'www.flightradar24.com': 'flightradar24',
+}
+
+DEFAULT_HEADERS = {
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive'
+}
+
+Timeout = Union[None, float, Tuple[float, float]]
+
+
+class HTTPTransport:
+    """
+    Pool de conexiones HTTP compartido por los conectores
+
+    Todos los hilos comparten el mismo `HTTPAdapter` (el pool de urllib3 es
+    thread-safe); cada hilo tiene su propia `requests.Session` para no
+    compartir cookies ni headers mutables. Los conectores pasan sus headers
+    en cada request en vez de modificar la sesión.
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = POOL_CONNECTIONS,
+        pool_maxsize: int = POOL_MAXSIZE,
+        host_timeouts: Optional[Dict[str, Tuple[float, float]]] = None,
+        default_timeout: Tuple[float, float] = DEFAULT_TIMEOUT,
+        metrics_registry: Optional[MetricsRegistry] = None
+    ):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.host_timeouts = dict(HOST_TIMEOUTS if host_timeouts is None else host_timeouts)
+        self.default_timeout = default_timeout
+
+        # pool_block=False: si el pool se llena se abre una conexión extra en vez de esperar
+        self._adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=False)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._requests_by_host: Counter = Counter()
+        self.sessions_created = 0
+        self.metrics_registry = metrics_registry if metrics_registry is not None else get_metrics_registry()
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.mount('https://', self._adapter)
+            session.mount('http://', self._adapter)
+            session.headers.update(DEFAULT_HEADERS)
+            self._local.session = session
+            with self._lock:
+                self.sessions_created += 1
+        return session
+
+    def timeout_for(self, url: str, timeout: Timeout = None) -> Tuple[float, float]:
+        """
+        Timeout (connect, read) de un request
+
+        Sin timeout explícito se usa el del host (HOST_TIMEOUTS). Un número
+        se toma como timeout de lectura y se combina con el de conexión del
+        host; una tupla se usa tal cual (p.ej. PROBE_TIMEOUT).
+        """
+        host_timeout = self.host_timeouts.get(urlsplit(url).hostname or '', self.default_timeout)
+        if timeout is None:
+            return host_timeout
+        if isinstance(timeout, tuple):
+            return timeout
+        return (min(host_timeout[0], timeout), timeout)
+
+    @staticmethod
+    def _metric_labels(url: str) -> Tuple[str, str]:
+        parts = urlsplit(url)
+        return HOST_APIS.get(parts.hostname or '', parts.hostname or 'desconocido'), parts.path or '/'
+
+    def request(self, method: str, url: str, timeout: Timeout = None, **kwargs) -> requests.Response:
+        with self._lock:
+            self._requests_by_host[urlsplit(url).hostname] += 1
+
+        # Latencia, bytes y status del request (sin caché: siempre 'bypass')
+        trace = RequestTrace(attempts=1)
+        started = time.perf_counter()
+        response = None
+        try:
+            response = self._session().request(method, url, timeout=self.timeout_for(url, timeout), **kwargs)
+            trace.status = response.status_code
+            if not kwargs.get('stream'):
+                trace.size_bytes = len(response.content)
+            return response
+        finally:
+            success = response is not None and response.status_code < 400
+            self.metrics_registry.record(
+                *self._metric_labels(url), trace, (time.perf_counter() - started) * 1000, success
+            )
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def close(self):
+        """Cierra las conexiones del pool (las sesiones por hilo se recrean al usarse)"""
+        self._adapter.close()
+        self._local = threading.local()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'sessions_created': self.sessions_created,
+                'pool_connections': self.pool_connections,
+                'pool_maxsize': self.pool_maxsize,
+                'requests_by_host': dict(self._requests_by_host)
+            }
+
+
+_default_transport: Optional[HTTPTransport] = None
+_default_transport_lock = threading.Lock()
+
+
+def get_http_transport() -> HTTPTransport:
+    """Transporte HTTP único del proceso"""
+    global _default_transport
+    with _default_transport_lock:
+        if _default_transport is None:
+            _default_transport = HTTPTransport()
+        return _default_transport
+
+
+def record_cache_hit(api_name: str, endpoint: str, outcome: str = 'hit'):
+    """Registra un resultado que un conector sirvió de su propio caché, sin request"""
+    get_metrics_registry().record(api_name, endpoint, RequestTrace(cache=outcome), 0.0, True)
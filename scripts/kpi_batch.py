@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Evaluación en lote de KPIs de AIFA por escenario y aeropuerto
+Calcula los KPIs estructurales (1-5 y económicos) de cientos de escenarios
+de objetivos/benchmarks y de aeropuertos pares (TLC, MEX, ...) en forma
+vectorizada, sin llamar a `calculate_*` por escenario
+"""
+
+from typing import Dict, Any
+
+import numpy as np
+import pandas as pd
+
+# Columnas que un escenario puede sobrescribir (el resto sale del baseline
+# del aeropuerto o de `kpi_config`)
+SCENARIO_COLUMNS = (
+    'pasajeros', 'crecimiento', 'gates_activos', 'gates_totales', 'inversion_mdp',
+    'participacion_objetivo', 'ranking_objetivo', 'crecimiento_promedio_nacional'
+)
+
+# Derrama por pasajero en miles de MXN (mismos factores que GobMXRealDataConnector)
+DERRAMA_DIRECTA_POR_PASAJERO = 2.8
+DERRAMA_INDIRECTA_POR_PASAJERO = 4.2
+
+# Gates del AICM usados como referencia de productividad
+GATES_AICM = 56
+
+
+def airport_baselines(data_connector) -> pd.DataFrame:
+    """
+    Valores base por aeropuerto (índice = código IATA)
+
+    Todos los aeropuertos del benchmark nacional tienen pasajeros; gates,
+    crecimiento e inversión solo se conocen para NLU (y gates para MEX), los
+    demás quedan en NaN hasta que un escenario los proporcione.
+    """
+    verified = data_connector.verified_aifa_data
+    rows = {
+        airport['codigo']: {'nombre': airport['aeropuerto'], 'pasajeros': float(airport['pasajeros'])}
+        for airport in data_connector.benchmarks_nacionales.values()
+    }
+    df = pd.DataFrame.from_dict(rows, orient='index')
+    for column in ('crecimiento', 'gates_activos', 'gates_totales', 'inversion_mdp'):
+        df[column] = np.nan
+
+    df.loc['NLU', ['pasajeros', 'crecimiento', 'gates_activos', 'gates_totales', 'inversion_mdp']] = [
+        verified['pasajeros_2024'], verified['crecimiento_2024_vs_2023'],
+        verified['gates_ocupados'], verified['gates_totales'], verified['inversion_total_mdp']
+    ]
+    if 'MEX' in df.index:
+        df.loc['MEX', 'gates_totales'] = GATES_AICM
+    df.index.name = 'aeropuerto'
+    return df
+
+
+def _estado_vs_objetivo(valor: np.ndarray, objetivo: np.ndarray) -> np.ndarray:
+    """Versión vectorizada de AIFAKPICalculator._evaluar_estado"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        progreso = valor / objetivo * 100
+    return np.select(
+        [progreso >= 90, progreso >= 75, progreso >= 50, ~np.isnan(progreso)],
+        ['EXCELENTE', 'BUENO', 'REGULAR', 'REQUIERE_ATENCION'],
+        default='SIN_DATOS'
+    )
+
+
+def _estado_utilizacion(utilizacion: np.ndarray) -> np.ndarray:
+    """Versión vectorizada de AIFAKPICalculator._evaluar_utilizacion"""
+    return np.select(
+        [utilizacion < 30, utilizacion < 60, utilizacion < 85, utilizacion >= 85],
+        ['BAJA_UTILIZACION', 'UTILIZACION_OPTIMA', 'ALTA_UTILIZACION', 'SATURACION'],
+        default='SIN_DATOS'
+    )
+
+
+def evaluate_scenarios(
+    scenarios: pd.DataFrame,
+    baselines: pd.DataFrame,
+    kpi_config: Dict[str, Any],
+    total_pasajeros_nacional: float
+) -> pd.DataFrame:
+    """
+    Evalúa los KPIs estructurales para cada fila de `scenarios`
+
+    Args:
+        scenarios: Una fila por escenario. Columnas opcionales: 'escenario'
+            (nombre), 'aeropuerto' (IATA, default NLU) y cualquiera de
+            SCENARIO_COLUMNS para sobrescribir el baseline/los objetivos
+        baselines: Resultado de `airport_baselines()`
+        kpi_config: `AIFAKPICalculator.kpi_config` (objetivos y benchmarks)
+        total_pasajeros_nacional: Denominador de la participación nacional
+
+    Returns:
+        DataFrame con una fila por escenario y una columna por KPI
+
+    Los KPIs en vivo (KPI_006 a KPI_009) dependen de APIs externas en el
+    momento del render y no forman parte de la evaluación por escenario.
+    """
+    n = len(scenarios)
+    scenarios = scenarios.reset_index(drop=True)
+    airports = (scenarios['aeropuerto'].fillna('NLU') if 'aeropuerto' in scenarios else pd.Series(['NLU'] * n)).astype(str).str.upper()
+
+    unknown = sorted(set(airports) - set(baselines.index))
+    if unknown:
+        raise ValueError(f"Aeropuertos sin baseline: {', '.join(unknown)}")
+
+    base = baselines.reindex(airports).reset_index(drop=True)
+    defaults = {
+        'participacion_objetivo': kpi_config['objetivos_2025']['participacion_objetivo'],
+        'ranking_objetivo': kpi_config['objetivos_2025']['ranking_objetivo'],
+        'crecimiento_promedio_nacional': kpi_config['benchmarks_industria']['crecimiento_promedio_nacional']
+    }
+
+    def column(name: str) -> np.ndarray:
+        """Valor del escenario, si no el del baseline, si no el default"""
+        fallback = base[name].to_numpy(dtype=float) if name in base else np.full(n, defaults.get(name, np.nan), dtype=float)
+        if name not in scenarios:
+            return fallback
+        values = pd.to_numeric(scenarios[name], errors='coerce').to_numpy(dtype=float)
+        return np.where(np.isnan(values), fallback, values)
+
+    pasajeros = column('pasajeros')
+    crecimiento = column('crecimiento')
+    gates_activos = column('gates_activos')
+    gates_totales = column('gates_totales')
+    inversion_mdp = column('inversion_mdp')
+    participacion_objetivo = column('participacion_objetivo')
+    ranking_objetivo = column('ranking_objetivo')
+    crecimiento_promedio = column('crecimiento_promedio_nacional')
+
+    # KPI 1: Participación nacional
+    participacion = pasajeros / total_pasajeros_nacional * 100
+
+    # KPI 3: Ranking contra los demás aeropuertos del benchmark
+    codes = baselines.index.to_numpy()
+    peers = baselines['pasajeros'].to_numpy(dtype=float)
+    is_self = codes[None, :] == airports.to_numpy()[:, None]
+    peer_matrix = np.where(is_self, -np.inf, peers[None, :])
+    ranking = 1 + (peer_matrix > pasajeros[:, None]).sum(axis=1)
+
+    # Pasajeros del aeropuerto que hoy ocupa la posición objetivo (sin contarse a sí mismo)
+    ranked_peers = -np.sort(-peer_matrix, axis=1)
+    target_index = np.clip(np.nan_to_num(ranking_objetivo, nan=1).astype(int) - 1, 0, ranked_peers.shape[1] - 1)
+    pasajeros_en_objetivo = np.take_along_axis(ranked_peers, target_index[:, None], axis=1)[:, 0]
+    pasajeros_para_objetivo = np.maximum(pasajeros_en_objetivo - pasajeros + 1, 0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # KPI 4 y 5: Infraestructura
+        utilizacion = gates_activos / gates_totales * 100
+        pasajeros_por_gate = pasajeros / gates_activos
+        pasajeros_por_gate_aicm = baselines.loc['MEX', 'pasajeros'] / GATES_AICM if 'MEX' in baselines.index else np.nan
+        eficiencia_relativa = pasajeros_por_gate / pasajeros_por_gate_aicm
+
+        # KPIs económicos
+        costo_por_pasajero = inversion_mdp * 1000000 / pasajeros
+
+    derrama_directa = pasajeros * DERRAMA_DIRECTA_POR_PASAJERO / 1000
+    derrama_indirecta = pasajeros * DERRAMA_INDIRECTA_POR_PASAJERO / 1000
+
+    return pd.DataFrame({
+        'escenario': scenarios['escenario'] if 'escenario' in scenarios else pd.RangeIndex(n).astype(str),
+        'aeropuerto': airports,
+        'pasajeros': pasajeros,
+        'participacion_pct': participacion.round(3),
+        'participacion_objetivo': participacion_objetivo,
+        'brecha_participacion': (participacion_objetivo - participacion).round(3),
+        'estado_participacion': _estado_vs_objetivo(participacion, participacion_objetivo),
+        'crecimiento_pct': crecimiento,
+        'ventaja_crecimiento': (crecimiento - crecimiento_promedio).round(1),
+        'pasajeros_proyectados': (pasajeros * (1 + crecimiento / 100)).round(),
+        'ranking': ranking,
+        'ranking_objetivo': ranking_objetivo,
+        'pasajeros_para_ranking_objetivo': pasajeros_para_objetivo,
+        'utilizacion_gates_pct': utilizacion.round(1),
+        'estado_utilizacion': _estado_utilizacion(utilizacion),
+        'pasajeros_por_gate': pasajeros_por_gate.round(),
+        'eficiencia_vs_aicm': eficiencia_relativa.round(2),
+        'derrama_directa_mdp': derrama_directa.round(1),
+        'derrama_indirecta_mdp': derrama_indirecta.round(1),
+        'derrama_total_mdp': (derrama_directa + derrama_indirecta).round(1),
+        'costo_inversion_por_pasajero': costo_por_pasajero.round(2)
+    })
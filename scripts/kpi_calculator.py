@@ -4,11 +4,46 @@ Motor de cálculo de KPIs reales para AIFA
 Integra datos gubernamentales verificados con APIs comerciales
 """
 
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Mapping, Optional, Tuple
 from datetime import datetime, timedelta
+import time
 import numpy as np
 import pandas as pd
 from real_data_connector import GobMXRealDataConnector, AviationStackConnector, FlightAwareConnector
+from kpi_snapshot import SourceSnapshot, take_snapshot, DEFAULT_SECTION_TIMEOUT, LIVE_SECTIONS
+from connection_health import ConnectionHealthRegistry, get_health_registry
+from kpi_graph import KPIGraph, KPINode
+from kpi_history import KPIHistoryStore, get_history_store
+from kpi_batch import airport_baselines, evaluate_scenarios
+from kpi_records import ExecutiveDashboardRecord, KPIRecord
+
+# Nodos de KPI por sección del dashboard ejecutivo
+STRATEGIC_KPIS = ('kpi_1_participacion_nacional', 'kpi_2_crecimiento_anual', 'kpi_3_posicionamiento')
+OPERATIONAL_KPIS = (
+    'kpi_4_utilizacion_infraestructura', 'kpi_5_productividad_gates', 'kpi_6_operaciones_tiempo_real',
+    'kpi_7_puntualidad_real', 'kpi_8_condiciones_meteorologicas', 'kpi_9_rastreo_aeronaves'
+)
+ECONOMIC_KPIS = ('kpi_7_derrama_economica', 'kpi_8_roi_inversion_publica')
+ALL_KPIS = STRATEGIC_KPIS + OPERATIONAL_KPIS + ECONOMIC_KPIS
+
+# Secciones del dashboard ejecutivo (KPIs y su resumen) y nodos agregados
+DASHBOARD_SECTIONS = {
+    'kpis_estrategicos': STRATEGIC_KPIS + ('resumen_estrategico',),
+    'kpis_operacionales': OPERATIONAL_KPIS + ('resumen_operacional',),
+    'kpis_economicos': ECONOMIC_KPIS
+}
+DASHBOARD_EXTRAS = ('alertas', 'recomendaciones', 'scorecard_general')
+DASHBOARD_PERIOD = '2024-2025'
+
+# Estados de KPI que indican datos simulados/estimados en lugar de datos en vivo
+FALLBACK_STATES = ('NO_DISPONIBLE', 'TIMEOUT', 'ERROR', 'ERROR_API', 'FALLBACK_SIMULADO', 'LIMITADO_POR_PLAN')
+
+# Cifras oficiales que se reportan mientras el historial de KPIs esté vacío
+TENDENCIA_PARTICIPACION_OFICIAL = '+141.3% vs 2023'
+CRECIMIENTO_OFICIAL_2024 = 141.3
+
+# Ventana del historial para la tendencia de KPI_001 (días)
+TENDENCIA_VENTANA_DIAS = 365
 
 class AIFAKPICalculator:
     """
@@ -16,13 +51,30 @@ class AIFAKPICalculator:
     Utiliza datos reales del gobierno mexicano y APIs comerciales
     """
     
-    def __init__(self, data_connector=None, aviation_connector=None, flightaware_connector=None, weather_manager=None, flightradar_connector=None):
+    def __init__(self, data_connector=None, aviation_connector=None, flightaware_connector=None, weather_manager=None, flightradar_connector=None,
+                 parallel_live: bool = True, section_timeout: float = DEFAULT_SECTION_TIMEOUT,
+                 health_registry: ConnectionHealthRegistry = None, history_store: KPIHistoryStore = None):
         self.data_connector = data_connector or GobMXRealDataConnector()
         self.aviation_connector = aviation_connector
         self.flightaware_connector = flightaware_connector
         self.weather_manager = weather_manager
         self.flightradar_connector = flightradar_connector
         
+        # Modo de consulta de las APIs en vivo (KPI_006 a KPI_009): en paralelo
+        # cada sección tiene `section_timeout` segundos; si no responde a tiempo
+        # el KPI se reporta con sus datos simulados
+        self.parallel_live = parallel_live
+        self.section_timeout = section_timeout
+        
+        # Estado de conexión de las APIs (TTL + actualización pasiva); evita
+        # un test_connection() antes de cada llamada de datos
+        self.health_registry = health_registry or get_health_registry()
+        
+        # Historial de dashboards para tendencias reales (data/kpi_history.f64)
+        self.history_store = history_store if history_store is not None else get_history_store()
+        # Últimas tendencias calculadas; se reutilizan si un render agota su presupuesto
+        self._tendencias: Dict[str, Any] = {}
+        
         # Configuración de KPIs
         self.kpi_config = {
             'objetivos_2025': {
@@ -39,23 +91,276 @@ class AIFAKPICalculator:
                 'satisfaccion_promedio': 87.0
             }
         }
+        
+        # Grafo de KPIs memoizado por entradas (recálculo incremental)
+        self.kpi_graph = self._build_kpi_graph()
+    
+    def take_snapshot(self, include_live: bool = True, section_timeout: Optional[float] = None) -> SourceSnapshot:
+        """
+        Consulta cada fuente una sola vez y congela el resultado
+        
+        Args:
+            include_live: False para consultar solo la fuente gubernamental
+            section_timeout: Tiempo límite en segundos para este snapshot;
+                fuerza el modo paralelo (default: `self.section_timeout`)
+        """
+        return take_snapshot(
+            self.data_connector,
+            self.aviation_connector,
+            self.flightaware_connector,
+            self.weather_manager,
+            self.flightradar_connector,
+            include_live=include_live,
+            parallel=self.parallel_live or section_timeout is not None,
+            section_timeout=self.section_timeout if section_timeout is None else section_timeout,
+            health=self.health_registry
+        )
     
-    def calculate_strategic_kpis(self) -> Dict[str, Any]:
+    def _build_kpi_graph(self) -> KPIGraph:
+        """
+        Declara cada KPI como nodo del grafo con sus fuentes de entrada
+        
+        Los KPIs en vivo dependen solo de su sección del snapshot, así que
+        si cambia únicamente el clima se recalculan KPI_008 y los nodos
+        agregados que dependen de él (resumen operacional y scorecard).
+        """
+        gov = lambda method: (lambda snapshot, deps: method(snapshot.gov_kpis))
+        live = lambda method: (lambda snapshot, deps: method(snapshot))
+        # Campos que dependen del historial y no de las fuentes del nodo: se
+        # refrescan en cada render aunque el KPI se reutilice
+        from_history = lambda **fields: (lambda snapshot: {key: field() for key, field in fields.items()})
+        # Hora de obtención de la sección en vivo, refrescada aunque el KPI se reutilice
+        fetched_at = lambda field, key='timestamp': (
+            lambda snapshot: {'timestamp': (getattr(snapshot, field) or {}).get(key, '')}
+        )
+        
+        return KPIGraph([
+            # Estratégicos
+            KPINode('kpi_1_participacion_nacional', gov(self._kpi_participacion_nacional), sources=('gov.posicionamiento_nacional',),
+                    stamp=from_history(tendencia=self._tendencia_participacion)),
+            KPINode('kpi_2_crecimiento_anual', gov(self._kpi_crecimiento_anual), sources=('gov.crecimiento_historico',)),
+            KPINode('kpi_3_posicionamiento', gov(self._kpi_posicionamiento), sources=('gov.posicionamiento_nacional',),
+                    stamp=from_history(probabilidad_exito=self._calcular_probabilidad_ranking)),
+            KPINode('resumen_estrategico',
+                    lambda snapshot, deps: self._generar_resumen_estrategico(list(deps.values())),
+                    depends_on=STRATEGIC_KPIS),
+            
+            # Operacionales
+            KPINode('kpi_4_utilizacion_infraestructura', gov(self._kpi_utilizacion_infraestructura), sources=('gov.eficiencia_operacional',)),
+            KPINode('kpi_5_productividad_gates', gov(self._kpi_productividad_gates), sources=('gov.eficiencia_operacional',)),
+            KPINode('kpi_6_operaciones_tiempo_real', live(self._calculate_realtime_kpis), sources=('aviation',),
+                    stamp=fetched_at('aviation_flights')),
+            KPINode('kpi_7_puntualidad_real', live(self._calculate_punctuality_kpis), sources=('flightaware',),
+                    stamp=fetched_at('flightaware_delays')),
+            KPINode('kpi_8_condiciones_meteorologicas', live(self._calculate_weather_kpis), sources=('weather',),
+                    stamp=fetched_at('weather')),
+            KPINode('kpi_9_rastreo_aeronaves', live(self._calculate_flightradar_kpis), sources=('flightradar',),
+                    stamp=fetched_at('flightradar_summary', 'data_freshness')),
+            KPINode('resumen_operacional',
+                    lambda snapshot, deps: self._generar_resumen_operacional(list(deps.values())),
+                    depends_on=OPERATIONAL_KPIS),
+            
+            # Económicos
+            KPINode('kpi_7_derrama_economica', gov(self._kpi_derrama_economica), sources=('gov.impacto_economico',)),
+            KPINode('kpi_8_roi_inversion_publica', gov(self._kpi_roi_inversion_publica), sources=('gov.impacto_economico',)),
+            
+            # Agregados del dashboard ejecutivo
+            KPINode('alertas',
+                    lambda snapshot, deps: self._generar_alertas(deps, deps),
+                    depends_on=('kpi_1_participacion_nacional',)),
+            KPINode('recomendaciones',
+                    lambda snapshot, deps: self._generar_recomendaciones(deps, deps, deps),
+                    depends_on=ALL_KPIS),
+            KPINode('scorecard_general',
+                    lambda snapshot, deps: self._calcular_scorecard_general(deps, deps, deps),
+                    depends_on=ALL_KPIS)
+        ])
+    
+    def last_recomputed(self) -> Dict[str, Any]:
+        """Nodos del grafo de KPIs recalculados y reutilizados en la última evaluación"""
+        return self.kpi_graph.last_run()
+    
+    def calculate_strategic_kpis(self, snapshot: Optional[SourceSnapshot] = None) -> Dict[str, Any]:
         """
         Calcula los KPIs estratégicos basados en datos gubernamentales reales
         """
-        real_data = self.data_connector.get_aifa_real_kpis()
+        snapshot = snapshot or self.take_snapshot(include_live=False)
+        return self.kpi_graph.evaluate(snapshot, STRATEGIC_KPIS + ('resumen_estrategico',))
+    
+    def calculate_operational_kpis(self, snapshot: Optional[SourceSnapshot] = None) -> Dict[str, Any]:
+        """
+        KPIs operacionales basados en eficiencia y productividad
+        """
+        snapshot = snapshot or self.take_snapshot()
+        return self.kpi_graph.evaluate(snapshot, OPERATIONAL_KPIS + ('resumen_operacional',))
+    
+    def calculate_economic_impact_kpis(self, snapshot: Optional[SourceSnapshot] = None) -> Dict[str, Any]:
+        """
+        KPIs de impacto económico y social
+        """
+        snapshot = snapshot or self.take_snapshot(include_live=False)
+        return self.kpi_graph.evaluate(snapshot, ECONOMIC_KPIS)
+    
+    def generate_executive_dashboard(self, budget_ms: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Genera dashboard ejecutivo con todos los KPIs
+        
+        Todas las fuentes se consultan una sola vez (un snapshot por render),
+        así que cada KPI del reporte corresponde al mismo instante. Solo se
+        recalculan los nodos cuyas entradas cambiaron desde el render anterior
+        (ver `last_recomputed()`). Cada dashboard se agrega al historial y
+        `tendencias` resume deltas, pendientes y proyección vs objetivos.
+        
+        Args:
+            budget_ms: Presupuesto de latencia del render completo. Las
+                fuentes en vivo que no respondan a tiempo dejan su KPI
+                pendiente: se reporta su último valor conocido (o su fallback
+                si nunca se calculó) con 'pendiente': True. Si al terminar los
+                KPIs ya no queda presupuesto, el render no se agrega al
+                historial y `tendencias` repite el último resumen
+                ('historial_omitido': True en `estado_calculo`).
+        
+        `estado_calculo` reporta por KPI el tiempo (consulta + cálculo) y el
+        origen del dato: 'live', 'cached' (último valor conocido) o 'fallback'.
+        """
+        started = time.perf_counter()
+        snapshot, nodes, estado_calculo = self._evaluate_render(budget_ms, started)
+        
+        dashboard = {
+            'timestamp': snapshot.taken_at.isoformat(),
+            'periodo_reporte': DASHBOARD_PERIOD,
+            **{section: {name: nodes[name] for name in names} for section, names in DASHBOARD_SECTIONS.items()},
+            **{name: nodes[name] for name in DASHBOARD_EXTRAS},
+            'estado_calculo': estado_calculo
+        }
+        return self._finish_render(dashboard, started)
+    
+    def generate_executive_dashboard_record(self, budget_ms: Optional[float] = None) -> ExecutiveDashboardRecord:
+        """
+        Dashboard ejecutivo en forma compacta (registros con slots)
+        
+        Se arma directo de los nodos del grafo, sin pasar por el dict de
+        `generate_executive_dashboard()`, y se lee igual que ese dict (es lo
+        que consumen los dashboards de Streamlit). `.dumps()` da los bytes
+        para caché o envío al navegador; `.as_dict()` el dict mutable.
+        """
+        started = time.perf_counter()
+        snapshot, nodes, estado_calculo = self._evaluate_render(budget_ms, started)
+        
+        sections, summaries = {}, {}
+        for section, names in DASHBOARD_SECTIONS.items():
+            sections[section] = tuple(KPIRecord.from_dict(name, nodes[name]) for name in names if name in ALL_KPIS)
+            summaries[section] = {name: nodes[name] for name in names if name not in ALL_KPIS}
+        record = ExecutiveDashboardRecord(
+            snapshot.taken_at.isoformat(),
+            DASHBOARD_PERIOD,
+            sections,
+            summaries,
+            {**{name: nodes[name] for name in DASHBOARD_EXTRAS}, 'estado_calculo': estado_calculo}
+        )
+        return self._finish_render(record, started)
+    
+    def _evaluate_render(self, budget_ms: Optional[float], started: float) -> Tuple[SourceSnapshot, Dict[str, Any], Dict[str, Any]]:
+        """Snapshot del render, valores de los nodos y `estado_calculo`"""
+        remaining_ms = self._remaining_budget_ms(budget_ms, started)
+        snapshot = self.take_snapshot(section_timeout=remaining_ms / 1000 if remaining_ms is not None else None)
+        nodes = self.kpi_graph.evaluate(snapshot)
+        run = self.kpi_graph.last_run()
+        
+        pending = set(run['pending'])
+        for name in pending.intersection(ALL_KPIS):
+            nodes[name] = {**nodes[name], 'pendiente': True}
+        
+        estado_calculo = {
+            'presupuesto_ms': budget_ms,
+            'tiempo_total_ms': None,
+            'historial_omitido': False,
+            'pendientes': sorted(pending.intersection(ALL_KPIS)),
+            'kpis': {name: self._kpi_status(name, nodes[name], snapshot, run) for name in ALL_KPIS}
+        }
+        return snapshot, nodes, estado_calculo
+    
+    def _finish_render(self, dashboard, started: float):
+        """Agrega el render al historial, sus tendencias y el tiempo total"""
+        extra = dashboard.extra if isinstance(dashboard, ExecutiveDashboardRecord) else dashboard
+        estado_calculo = extra['estado_calculo']
+        
+        # El historial cuenta contra el presupuesto: sin tiempo restante se
+        # omite y se reportan las últimas tendencias calculadas
+        remaining_ms = self._remaining_budget_ms(estado_calculo['presupuesto_ms'], started)
+        if remaining_ms is None or remaining_ms > 0:
+            self.history_store.append_dashboard(dashboard)
+            self._tendencias = self.history_store.summary(targets=self._history_targets())
+        else:
+            estado_calculo['historial_omitido'] = True
+        extra['tendencias'] = self._tendencias
+        
+        estado_calculo['tiempo_total_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        return dashboard
+    
+    @staticmethod
+    def _remaining_budget_ms(budget_ms: Optional[float], started: float) -> Optional[float]:
+        """Presupuesto que le queda al render (None si no tiene presupuesto)"""
+        if budget_ms is None:
+            return None
+        return max(budget_ms - (time.perf_counter() - started) * 1000, 0.0)
+    
+    def evaluate_scenarios(self, scenarios: pd.DataFrame) -> pd.DataFrame:
+        """
+        Evalúa en lote los KPIs estructurales para una tabla de escenarios
+        
+        Args:
+            scenarios: Una fila por escenario con 'aeropuerto' (NLU, TLC,
+                MEX, ...) y overrides de objetivos/benchmarks; ver
+                `kpi_batch.SCENARIO_COLUMNS`
+        
+        Returns:
+            DataFrame con los KPIs de cada escenario
+        """
+        verified = self.data_connector.verified_aifa_data
+        total_nacional = verified['pasajeros_2024'] / verified['participacion_nacional'] * 100
+        return evaluate_scenarios(scenarios, airport_baselines(self.data_connector), self.kpi_config, total_nacional)
+    
+    def _kpi_status(self, name: str, value: Dict[str, Any], snapshot: SourceSnapshot, run: Dict[str, Any]) -> Dict[str, Any]:
+        """Tiempo y origen del dato de un KPI en el último render"""
+        node = self.kpi_graph.nodes[name]
+        live_sections = [source for source in node.sources if source in LIVE_SECTIONS]
+        fetch_ms = sum(snapshot.timing(section) or 0.0 for section in live_sections or ['gov'])
+        
+        if name in run['pending']:
+            origen = 'cached' if name not in run['recomputed'] else 'fallback'
+        elif value.get('estado') in FALLBACK_STATES or value.get('precision') in ('SIMULADA', 'ESTIMADA'):
+            origen = 'fallback'
+        else:
+            origen = 'live'
         
-        # KPI 1: Participación en mercado nacional
+        return {
+            'origen': origen,
+            'pendiente': name in run['pending'],
+            'tiempo_ms': round(fetch_ms + run['timings'].get(name, 0.0), 2)
+        }
+    
+    def _history_targets(self) -> Dict[str, float]:
+        """Objetivos 2025 por serie del historial"""
+        objetivos = self.kpi_config['objetivos_2025']
+        return {
+            'participacion_nacional': objetivos['participacion_objetivo'],
+            'ranking_nacional': objetivos['ranking_objetivo'],
+            'puntualidad': objetivos['puntualidad_objetivo']
+        }
+    
+    # Definición de cada KPI (nodos del grafo)
+    def _kpi_participacion_nacional(self, real_data: Mapping[str, Any]) -> Dict[str, Any]:
+        """KPI 1: Participación en mercado nacional"""
         participacion = real_data['posicionamiento_nacional']['participacion_pasajeros']
-        kpi_1 = {
+        return {
             'id': 'KPI_001',
             'nombre': 'Participación en Tráfico Nacional de Pasajeros',
             'categoria': 'ESTRATÉGICO',
             'formula': 'Pasajeros AIFA / Total Pasajeros Nacionales * 100',
             'valor_actual': participacion['valor'],
             'unidad': '%',
-            'tendencia': '+141.3% vs 2023',
+            'tendencia': self._tendencia_participacion(),
             'objetivo_2025': self.kpi_config['objetivos_2025']['participacion_objetivo'],
             'brecha_objetivo': round(self.kpi_config['objetivos_2025']['participacion_objetivo'] - participacion['valor'], 2),
             'estado': self._evaluar_estado(participacion['valor'], self.kpi_config['objetivos_2025']['participacion_objetivo']),
@@ -63,10 +368,11 @@ class AIFAKPICalculator:
             'confiabilidad': participacion['confiabilidad'],
             'impacto_negocio': 'ALTO - Determina posición competitiva nacional'
         }
-        
-        # KPI 2: Tasa de crecimiento
+    
+    def _kpi_crecimiento_anual(self, real_data: Mapping[str, Any]) -> Dict[str, Any]:
+        """KPI 2: Tasa de crecimiento"""
         crecimiento_data = real_data['crecimiento_historico']
-        kpi_2 = {
+        return {
             'id': 'KPI_002',
             'nombre': 'Tasa de Crecimiento Anual de Pasajeros',
             'categoria': 'ESTRATÉGICO',
@@ -78,10 +384,11 @@ class AIFAKPICalculator:
             'estado': 'SOBRESALIENTE',
             'impacto_negocio': 'CRÍTICO - Motor de crecimiento del negocio'
         }
-        
-        # KPI 3: Posicionamiento nacional
+    
+    def _kpi_posicionamiento(self, real_data: Mapping[str, Any]) -> Dict[str, Any]:
+        """KPI 3: Posicionamiento nacional"""
         ranking_data = real_data['posicionamiento_nacional']['ranking_aeropuertos']
-        kpi_3 = {
+        return {
             'id': 'KPI_003',
             'nombre': 'Ranking Nacional de Aeropuertos por Pasajeros',
             'categoria': 'ESTRATÉGICO',
@@ -94,24 +401,12 @@ class AIFAKPICalculator:
             'probabilidad_exito': self._calcular_probabilidad_ranking(),
             'impacto_negocio': 'ALTO - Prestigio y atracción de aerolíneas'
         }
-        
-        return {
-            'kpi_1_participacion_nacional': kpi_1,
-            'kpi_2_crecimiento_anual': kpi_2,
-            'kpi_3_posicionamiento': kpi_3,
-            'resumen_estrategico': self._generar_resumen_estrategico([kpi_1, kpi_2, kpi_3])
-        }
     
-    def calculate_operational_kpis(self) -> Dict[str, Any]:
-        """
-        KPIs operacionales basados en eficiencia y productividad
-        """
-        real_data = self.data_connector.get_aifa_real_kpis()
+    def _kpi_utilizacion_infraestructura(self, real_data: Mapping[str, Any]) -> Dict[str, Any]:
+        """KPI 4: Utilización de infraestructura"""
         eficiencia_data = real_data['eficiencia_operacional']
-        
-        # KPI 4: Utilización de infraestructura
         utilizacion = eficiencia_data['utilizacion_infraestructura']
-        kpi_4 = {
+        return {
             'id': 'KPI_004',
             'nombre': 'Utilización de Infraestructura (Gates)',
             'categoria': 'OPERACIONAL',
@@ -124,10 +419,12 @@ class AIFAKPICalculator:
             'oportunidad_mejora': 'ALTA - 18 gates disponibles para crecimiento',
             'impacto_negocio': 'MEDIO - Optimización de activos'
         }
-        
-        # KPI 5: Productividad por gate
+    
+    def _kpi_productividad_gates(self, real_data: Mapping[str, Any]) -> Dict[str, Any]:
+        """KPI 5: Productividad por gate"""
+        eficiencia_data = real_data['eficiencia_operacional']
         productividad = eficiencia_data['productividad']
-        kpi_5 = {
+        return {
             'id': 'KPI_005',
             'nombre': 'Productividad por Gate Activo',
             'categoria': 'OPERACIONAL',
@@ -138,38 +435,11 @@ class AIFAKPICalculator:
             'estado': 'EFICIENTE',
             'impacto_negocio': 'MEDIO - Eficiencia operacional'
         }
-        
-        # KPI 6: Datos en tiempo real (AviationStack + FlightAware)
-        kpi_6 = self._calculate_realtime_kpis()
-        
-        # KPI 7: Puntualidad real (FlightAware)
-        kpi_7 = self._calculate_punctuality_kpis()
-        
-        # KPI 8: Condiciones meteorológicas (OpenWeatherMap)
-        kpi_8 = self._calculate_weather_kpis()
-        
-        # KPI 9: Rastreo de aeronaves (FlightRadar24)
-        kpi_9 = self._calculate_flightradar_kpis()
-        
-        return {
-            'kpi_4_utilizacion_infraestructura': kpi_4,
-            'kpi_5_productividad_gates': kpi_5,
-            'kpi_6_operaciones_tiempo_real': kpi_6,
-            'kpi_7_puntualidad_real': kpi_7,
-            'kpi_8_condiciones_meteorologicas': kpi_8,
-            'kpi_9_rastreo_aeronaves': kpi_9,
-            'resumen_operacional': self._generar_resumen_operacional([kpi_4, kpi_5, kpi_6, kpi_7, kpi_8, kpi_9])
-        }
     
-    def calculate_economic_impact_kpis(self) -> Dict[str, Any]:
-        """
-        KPIs de impacto económico y social
-        """
-        real_data = self.data_connector.get_aifa_real_kpis()
+    def _kpi_derrama_economica(self, real_data: Mapping[str, Any]) -> Dict[str, Any]:
+        """KPI 7 (económico): Derrama económica"""
         impacto_data = real_data['impacto_economico']
-        
-        # KPI 7: Derrama económica
-        kpi_7 = {
+        return {
             'id': 'KPI_007',
             'nombre': 'Derrama Económica Anual',
             'categoria': 'ECONÓMICO',
@@ -180,10 +450,12 @@ class AIFAKPICalculator:
             'multiplicador_economico': 2.5,  # Por cada peso directo
             'impacto_negocio': 'ALTO - Justificación social del proyecto'
         }
-        
-        # KPI 8: ROI de inversión pública
+    
+    def _kpi_roi_inversion_publica(self, real_data: Mapping[str, Any]) -> Dict[str, Any]:
+        """KPI 8 (económico): ROI de inversión pública"""
+        impacto_data = real_data['impacto_economico']
         inversion = impacto_data['inversion_total']
-        kpi_8 = {
+        return {
             'id': 'KPI_008',
             'nombre': 'Retorno de Inversión Pública',
             'categoria': 'ECONÓMICO',
@@ -194,30 +466,6 @@ class AIFAKPICalculator:
             'beneficio_social_neto': 'POSITIVO',
             'impacto_negocio': 'ESTRATÉGICO - Viabilidad del proyecto'
         }
-        
-        return {
-            'kpi_7_derrama_economica': kpi_7,
-            'kpi_8_roi_inversion_publica': kpi_8
-        }
-    
-    def generate_executive_dashboard(self) -> Dict[str, Any]:
-        """
-        Genera dashboard ejecutivo con todos los KPIs
-        """
-        strategic = self.calculate_strategic_kpis()
-        operational = self.calculate_operational_kpis()
-        economic = self.calculate_economic_impact_kpis()
-        
-        return {
-            'timestamp': datetime.now().isoformat(),
-            'periodo_reporte': '2024-2025',
-            'kpis_estrategicos': strategic,
-            'kpis_operacionales': operational,
-            'kpis_economicos': economic,
-            'alertas': self._generar_alertas(strategic, operational),
-            'recomendaciones': self._generar_recomendaciones(strategic, operational, economic),
-            'scorecard_general': self._calcular_scorecard_general(strategic, operational, economic)
-        }
     
     # Métodos auxiliares
     def _evaluar_estado(self, valor_actual: float, objetivo: float) -> str:
@@ -232,10 +480,20 @@ class AIFAKPICalculator:
         else:
             return 'REQUIERE_ATENCION'
     
+    def _tendencia_participacion(self) -> str:
+        """Cambio de la participación nacional en el historial (cifra oficial si aún no hay historial)"""
+        change = self.history_store.change('participacion_nacional', window_days=TENDENCIA_VENTANA_DIAS)
+        if change is None:
+            return TENDENCIA_PARTICIPACION_OFICIAL
+        pct, since = change
+        return f"{pct:+.1f}% vs {datetime.fromtimestamp(since).date().isoformat()}"
+    
     def _calcular_probabilidad_ranking(self) -> float:
         """Calcula probabilidad de alcanzar objetivo de ranking"""
-        # Basado en tasa de crecimiento actual vs requerida
-        crecimiento_actual = 141.3
+        # Basado en tasa de crecimiento actual (último registro del historial) vs requerida
+        crecimiento_actual = self.history_store.latest('crecimiento_anual')
+        if crecimiento_actual is None:
+            crecimiento_actual = CRECIMIENTO_OFICIAL_2024
         crecimiento_requerido = 15.2
         if crecimiento_actual > crecimiento_requerido * 2:
             return 85.0
@@ -255,14 +513,15 @@ class AIFAKPICalculator:
         else:
             return 'SATURACION'
     
-    def _calculate_realtime_kpis(self) -> Dict[str, Any]:
+    def _calculate_realtime_kpis(self, snapshot: SourceSnapshot) -> Dict[str, Any]:
         """Calcula KPIs en tiempo real usando AviationStack"""
-        if not self.aviation_connector:
+        timed_out = snapshot.is_timed_out('aviation')
+        if not self.aviation_connector or timed_out:
             return {
                 'id': 'KPI_006',
                 'nombre': 'Operaciones en Tiempo Real',
-                'estado': 'NO_DISPONIBLE',
-                'razon': 'API AviationStack no configurada',
+                'estado': 'TIMEOUT' if timed_out else 'NO_DISPONIBLE',
+                'razon': 'AviationStack no respondió a tiempo' if timed_out else 'API AviationStack no configurada',
                 'datos_simulados': {
                     'operaciones_estimadas_dia': 45,
                     'puntualidad_estimada': 87.2,
@@ -272,8 +531,10 @@ class AIFAKPICalculator:
         
         # Intentar obtener datos reales
         try:
-            test_connection = self.aviation_connector.test_connection()
-            flights_data = self.aviation_connector.get_flights_summary()
+            if snapshot.error('aviation'):
+                raise RuntimeError(snapshot.error('aviation'))
+            test_connection = snapshot.aviation_status
+            flights_data = snapshot.aviation_flights
             
             # Verificar si obtuvo datos reales
             if flights_data.get('precision') == 'REAL':
@@ -314,14 +575,15 @@ class AIFAKPICalculator:
                 'fallback': 'Datos simulados disponibles'
             }
     
-    def _calculate_punctuality_kpis(self) -> Dict[str, Any]:
+    def _calculate_punctuality_kpis(self, snapshot: SourceSnapshot) -> Dict[str, Any]:
         """Calcula KPIs de puntualidad usando FlightAware"""
-        if not self.flightaware_connector:
+        timed_out = snapshot.is_timed_out('flightaware')
+        if not self.flightaware_connector or timed_out:
             return {
                 'id': 'KPI_007',
                 'nombre': 'Puntualidad y Delays',
-                'estado': 'NO_DISPONIBLE',
-                'razon': 'FlightAware no configurado',
+                'estado': 'TIMEOUT' if timed_out else 'NO_DISPONIBLE',
+                'razon': 'FlightAware no respondió a tiempo' if timed_out else 'FlightAware no configurado',
                 'datos_simulados': {
                     'puntualidad_estimada': 87.2,
                     'delay_promedio_min': 8.5,
@@ -331,11 +593,13 @@ class AIFAKPICalculator:
         
         # Intentar obtener datos reales de delays
         try:
-            test_connection = self.flightaware_connector.test_connection()
+            if snapshot.error('flightaware'):
+                raise RuntimeError(snapshot.error('flightaware'))
+            test_connection = snapshot.flightaware_status
             
             if test_connection.get('api_activa'):
-                # Obtener estadísticas de delays del AIFA
-                delay_stats = self.flightaware_connector.get_delay_statistics("NLU")
+                # Estadísticas de delays del AIFA
+                delay_stats = snapshot.flightaware_delays
                 
                 if delay_stats.get('success'):
                     return {
@@ -393,14 +657,15 @@ class AIFAKPICalculator:
                 'fallback': 'Datos simulados disponibles'
             }
     
-    def _calculate_weather_kpis(self) -> Dict[str, Any]:
+    def _calculate_weather_kpis(self, snapshot: SourceSnapshot) -> Dict[str, Any]:
         """Calcula KPIs meteorológicos usando OpenWeatherMap"""
-        if not self.weather_manager:
+        timed_out = snapshot.is_timed_out('weather')
+        if not self.weather_manager or timed_out:
             return {
                 'id': 'KPI_008',
                 'nombre': 'Condiciones Meteorológicas',
-                'estado': 'NO_DISPONIBLE',
-                'razon': 'WeatherManager no configurado',
+                'estado': 'TIMEOUT' if timed_out else 'NO_DISPONIBLE',
+                'razon': 'OpenWeatherMap no respondió a tiempo' if timed_out else 'WeatherManager no configurado',
                 'datos_simulados': {
                     'condiciones_estimadas': 'BUENAS',
                     'impacto_operacional': 'minimal',
@@ -409,8 +674,10 @@ class AIFAKPICalculator:
             }
         
         try:
-            # Obtener datos meteorológicos de AIFA
-            weather_data = self.weather_manager.get_current_weather('NLU')
+            if snapshot.error('weather'):
+                raise RuntimeError(snapshot.error('weather'))
+            # Datos meteorológicos de AIFA
+            weather_data = snapshot.weather
             
             if weather_data and weather_data.get('data_source', '').startswith('openweathermap'):
                 current = weather_data.get('current', {})
@@ -529,14 +796,15 @@ class AIFAKPICalculator:
             'estado_general': 'CUMPLE' if compliance >= 80 else 'PARCIAL' if compliance >= 60 else 'NO_CUMPLE'
         }
     
-    def _calculate_flightradar_kpis(self) -> Dict[str, Any]:
+    def _calculate_flightradar_kpis(self, snapshot: SourceSnapshot) -> Dict[str, Any]:
         """Calcula KPIs de rastreo de aeronaves usando FlightRadar24"""
-        if not self.flightradar_connector:
+        timed_out = snapshot.is_timed_out('flightradar')
+        if not self.flightradar_connector or timed_out:
             return {
                 'id': 'KPI_009',
                 'nombre': 'Rastreo de Aeronaves',
-                'estado': 'NO_DISPONIBLE',
-                'razon': 'FlightRadar24 no configurado',
+                'estado': 'TIMEOUT' if timed_out else 'NO_DISPONIBLE',
+                'razon': 'FlightRadar24 no respondió a tiempo' if timed_out else 'FlightRadar24 no configurado',
                 'datos_simulados': {
                     'aeronaves_area_estimadas': 15,
                     'aifa_related_estimadas': 3,
@@ -545,8 +813,10 @@ class AIFAKPICalculator:
             }
         
         try:
-            # Obtener resumen de actividad de FlightRadar24
-            fr24_summary = self.flightradar_connector.get_aifa_summary()
+            if snapshot.error('flightradar'):
+                raise RuntimeError(snapshot.error('flightradar'))
+            # Resumen de actividad de FlightRadar24
+            fr24_summary = snapshot.flightradar_summary
             
             if fr24_summary['success']:
                 summary_data = fr24_summary.get('summary', {})
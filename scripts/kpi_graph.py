@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Grafo declarativo de KPIs de AIFA con recálculo incremental
+Cada KPI es un nodo con fuentes de entrada explícitas; un nodo solo se
+recalcula cuando cambia el hash de sus entradas o de sus dependencias
+"""
+
+import copy
+import hashlib
+import json
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Any, Callable, FrozenSet, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from kpi_snapshot import SourceSnapshot, LIVE_SECTIONS
+
+
+def _live_source(section: str) -> Callable[[SourceSnapshot], Any]:
+    """Entrada de una sección en vivo: sus campos, su error y si excedió el tiempo"""
+    fields = {
+        'aviation': ('aviation_status', 'aviation_flights'),
+        'flightaware': ('flightaware_status', 'flightaware_delays'),
+        'weather': ('weather',),
+        'flightradar': ('flightradar_summary',)
+    }[section]
+
+    def extract(snapshot: SourceSnapshot) -> Any:
+        return {
+            'data': [getattr(snapshot, name) for name in fields],
+            'error': snapshot.error(section),
+            'timed_out': snapshot.is_timed_out(section)
+        }
+    return extract
+
+
+def _gov_source(key: str) -> Callable[[SourceSnapshot], Any]:
+    return lambda snapshot: snapshot.gov_kpis[key]
+
+
+# Fuentes de entrada que un nodo puede declarar
+SOURCES: Dict[str, Callable[[SourceSnapshot], Any]] = {
+    'gov.posicionamiento_nacional': _gov_source('posicionamiento_nacional'),
+    'gov.crecimiento_historico': _gov_source('crecimiento_historico'),
+    'gov.eficiencia_operacional': _gov_source('eficiencia_operacional'),
+    'gov.impacto_economico': _gov_source('impacto_economico'),
+    **{section: _live_source(section) for section in LIVE_SECTIONS}
+}
+
+
+@dataclass(frozen=True)
+class KPINode:
+    """
+    Nodo del grafo
+
+    Args:
+        name: Llave del resultado (p.ej. 'kpi_8_condiciones_meteorologicas')
+        compute: Función (snapshot, deps) → valor; solo debe leer las
+            fuentes declaradas en `sources` y los nodos de `depends_on`
+        sources: Llaves de SOURCES que alimentan al nodo
+        depends_on: Nodos previos cuyo resultado recibe en `deps`
+        stamp: Función snapshot → campos volátiles (p.ej. 'timestamp') que
+            se escriben en cada evaluación sobre el valor, recalculado o
+            reutilizado; solo reemplaza llaves que el valor ya tiene
+    """
+    name: str
+    compute: Callable[[SourceSnapshot, Dict[str, Any]], Any]
+    sources: Tuple[str, ...] = ()
+    depends_on: Tuple[str, ...] = ()
+    stamp: Optional[Callable[[SourceSnapshot], Dict[str, Any]]] = None
+
+
+# Llaves que cambian en cada consulta sin que cambie el dato (hora de
+# obtención, latencia, antigüedad); no cuentan para el hash de un nodo, y el
+# `stamp` del nodo las actualiza en el valor memoizado
+VOLATILE_KEYS = frozenset({
+    'timestamp', 'data_freshness', 'ultima_verificacion', 'obtenido',
+    'last_updated', 'response_time', 'response_time_ms', 'age_s'
+})
+
+
+def _strip_volatile(value: Any) -> Any:
+    if isinstance(value, pd.DataFrame):
+        # Vuelos en columnas (flight_records): un hash por fila
+        stable = value.drop(columns=[name for name in value.columns if name in VOLATILE_KEYS])
+        return pd.util.hash_pandas_object(stable, index=False).tolist()
+    if isinstance(value, Mapping):
+        return {k: _strip_volatile(v) for k, v in value.items() if k not in VOLATILE_KEYS}
+    if isinstance(value, (list, tuple)):
+        return [_strip_volatile(v) for v in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=str)
+    return value
+
+
+def _hash_inputs(values: Sequence[Any]) -> str:
+    return hashlib.md5(
+        json.dumps(_strip_volatile(values), sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+class KPIGraph:
+    """
+    Evalúa un conjunto de nodos memoizando cada uno por el hash de sus entradas
+
+    Los nodos se declaran en orden topológico (cada dependencia antes de sus
+    dependientes). El hash de un nodo combina el de sus fuentes con el hash
+    de sus dependencias, así que un cambio solo se propaga río abajo.
+    """
+
+    def __init__(self, nodes: Iterable[KPINode]):
+        self.nodes: Dict[str, KPINode] = {}
+        for node in nodes:
+            for source in node.sources:
+                if source not in SOURCES:
+                    raise ValueError(f"Nodo {node.name}: fuente desconocida '{source}'")
+            for dependency in node.depends_on:
+                if dependency not in self.nodes:
+                    raise ValueError(f"Nodo {node.name}: dependencia '{dependency}' no declarada antes")
+            self.nodes[node.name] = node
+
+        self._memo: Dict[str, Tuple[str, Any]] = {}
+        self._last_run: Dict[str, Any] = {'recomputed': [], 'reused': [], 'pending': [], 'timings': {}, 'timestamp': None}
+        self._lock = threading.Lock()
+
+    def _closure(self, targets: Iterable[str]) -> set:
+        needed = set()
+        pending = list(targets)
+        while pending:
+            name = pending.pop()
+            if name not in self.nodes:
+                raise KeyError(f"Nodo KPI desconocido: {name}")
+            if name not in needed:
+                needed.add(name)
+                pending.extend(self.nodes[name].depends_on)
+        return needed
+
+    def pending_nodes(self, snapshot: SourceSnapshot) -> FrozenSet[str]:
+        """Nodos con alguna fuente en vivo que excedió su tiempo límite"""
+        return frozenset(
+            name for name, node in self.nodes.items()
+            if snapshot.timed_out.intersection(node.sources)
+        )
+
+    def evaluate(self, snapshot: SourceSnapshot, targets: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """
+        Evalúa los nodos pedidos (y sus dependencias) sobre un snapshot
+
+        Un nodo pendiente (su fuente excedió el tiempo límite) conserva su
+        último valor memoizado; si no tiene, se calcula con lo que trae el
+        snapshot (su fallback) pero no se memoiza. Los valores regresados son
+        copias: modificarlos no altera el memo. Los nodos no pendientes con
+        `stamp` reciben los campos volátiles del snapshot actual.
+
+        Args:
+            snapshot: Fuentes del render
+            targets: Nodos a evaluar; None = todos
+
+        Returns:
+            Diccionario nodo → valor
+        """
+        needed = self._closure(targets) if targets is not None else set(self.nodes)
+        pending = self.pending_nodes(snapshot)
+
+        with self._lock:
+            source_values: Dict[str, Any] = {}
+            hashes: Dict[str, str] = {}
+            results: Dict[str, Any] = {}
+            recomputed: List[str] = []
+            reused: List[str] = []
+            pending_run: List[str] = []
+            timings: Dict[str, float] = {}
+
+            for name, node in self.nodes.items():
+                if name not in needed:
+                    continue
+
+                memo = self._memo.get(name)
+                if name in pending:
+                    pending_run.append(name)
+                    if memo is not None:
+                        hashes[name], results[name] = memo
+                        timings[name] = 0.0
+                        continue
+
+                for source in node.sources:
+                    if source not in source_values:
+                        source_values[source] = SOURCES[source](snapshot)
+                inputs_hash = _hash_inputs(
+                    [source_values[source] for source in node.sources] +
+                    [hashes[dependency] for dependency in node.depends_on]
+                )
+                hashes[name] = inputs_hash
+
+                if memo is not None and memo[0] == inputs_hash:
+                    results[name] = memo[1]
+                    reused.append(name)
+                    timings[name] = 0.0
+                else:
+                    started = time.perf_counter()
+                    deps = {dependency: results[dependency] for dependency in node.depends_on}
+                    results[name] = node.compute(snapshot, deps)
+                    timings[name] = (time.perf_counter() - started) * 1000
+                    if name not in pending:
+                        self._memo[name] = (inputs_hash, results[name])
+                    recomputed.append(name)
+
+            self._last_run = {
+                'recomputed': recomputed,
+                'reused': reused,
+                'pending': pending_run,
+                'timings': timings,
+                'timestamp': datetime.now().isoformat()
+            }
+            results = copy.deepcopy(results)
+
+        # Campos volátiles del snapshot actual (el memo conserva los del cálculo)
+        for name, value in results.items():
+            stamp = self.nodes[name].stamp
+            if stamp is not None and name not in pending and isinstance(value, dict):
+                value.update((key, fresh) for key, fresh in stamp(snapshot).items() if key in value)
+        return results
+
+    def last_run(self) -> Dict[str, Any]:
+        """
+        Nodos recalculados, reutilizados y pendientes en la última
+        evaluación, con el tiempo de cálculo de cada nodo en ms
+        """
+        with self._lock:
+            return {
+                'recomputed': list(self._last_run['recomputed']),
+                'reused': list(self._last_run['reused']),
+                'pending': list(self._last_run['pending']),
+                'timings': dict(self._last_run['timings']),
+                'timestamp': self._last_run['timestamp']
+            }
+
+    def invalidate(self, name: str = None):
+        """
+        Descarta el memo de un nodo y de sus dependientes (o de todos),
+        p.ej. al cambiar la configuración de KPIs
+        """
+        with self._lock:
+            if name is None:
+                self._memo.clear()
+                return
+            stale = {name}
+            for node_name, node in self.nodes.items():
+                if stale.intersection(node.depends_on):
+                    stale.add(node_name)
+            for node_name in stale:
+                self._memo.pop(node_name, None)
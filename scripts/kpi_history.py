@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Historial de KPIs de AIFA
+Log columnar de solo-agregado (float64 con NumPy) de cada dashboard ejecutivo,
+con tendencias, deltas, promedios móviles y proyección de brecha vs objetivo
+calculados de forma vectorizada sobre todo el historial
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import warnings
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Dict, Any, Callable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_HISTORY_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'kpi_history.f64')
+
+# Mínimo de segundos entre dos registros (Streamlit re-renderiza muy seguido)
+DEFAULT_MIN_INTERVAL = 60.0
+
+SECONDS_PER_DAY = 86400.0
+
+# Proyecciones más lejanas no reportan fecha (pendientes casi planas)
+MAX_PROJECTION_DAYS = 3650
+
+
+def _path(*keys: str) -> Callable[[Mapping], Any]:
+    """Extractor de un valor anidado del dashboard (dict o ExecutiveDashboardRecord); None si no existe"""
+    def extract(dashboard: Mapping) -> Any:
+        value = dashboard
+        for key in keys:
+            if not isinstance(value, Mapping):
+                return None
+            value = value.get(key)
+        return value
+    return extract
+
+
+def _first(*extractors: Callable[[Dict[str, Any]], Any]) -> Callable[[Dict[str, Any]], Any]:
+    def extract(dashboard: Dict[str, Any]) -> Any:
+        for extractor in extractors:
+            value = extractor(dashboard)
+            if value is not None:
+                return value
+        return None
+    return extract
+
+
+# Series numéricas que se guardan de cada dashboard (el orden define las columnas)
+KPI_SERIES: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    'participacion_nacional': _path('kpis_estrategicos', 'kpi_1_participacion_nacional', 'valor_actual'),
+    'crecimiento_anual': _path('kpis_estrategicos', 'kpi_2_crecimiento_anual', 'valor_2024'),
+    'ranking_nacional': _path('kpis_estrategicos', 'kpi_3_posicionamiento', 'posicion_actual'),
+    'utilizacion_gates': _path('kpis_operacionales', 'kpi_4_utilizacion_infraestructura', 'porcentaje_utilizacion'),
+    'pasajeros_por_gate': _path('kpis_operacionales', 'kpi_5_productividad_gates', 'pasajeros_por_gate'),
+    'operaciones_dia': _first(
+        _path('kpis_operacionales', 'kpi_6_operaciones_tiempo_real', 'operaciones_dia'),
+        _path('kpis_operacionales', 'kpi_6_operaciones_tiempo_real', 'operaciones_estimadas_dia')
+    ),
+    'puntualidad': _path('kpis_operacionales', 'kpi_7_puntualidad_real', 'on_time_percentage'),
+    'temperatura': _path('kpis_operacionales', 'kpi_8_condiciones_meteorologicas', 'temperatura_actual'),
+    'score_meteorologico': _path('kpis_operacionales', 'kpi_8_condiciones_meteorologicas', 'score_condiciones'),
+    'aeronaves_area': _path('kpis_operacionales', 'kpi_9_rastreo_aeronaves', 'aeronaves_area'),
+    'derrama_total_mdp': _path('kpis_economicos', 'kpi_7_derrama_economica', 'derrama_total_mdp'),
+    'score_general': _path('scorecard_general', 'score_general')
+}
+
+
+def _as_float(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class KPIHistoryStore:
+    """
+    Historial de KPIs en un archivo de filas float64 de ancho fijo
+
+    Columna 0 = timestamp (epoch), resto = KPI_SERIES. Las columnas se
+    guardan en un JSON al lado del archivo; si cambian, el historial previo
+    se reacomoda por nombre (series nuevas quedan en NaN). En memoria se
+    mantiene un arreglo con crecimiento geométrico, así que agregar es O(1)
+    amortizado y cada consulta opera sobre una vista sin copiar.
+
+    Varios procesos pueden agregar al mismo archivo: si creció por registros
+    ajenos, la siguiente consulta lo vuelve a leer. Las filas se ordenan por
+    timestamp al leer, así que las consultas no dependen del orden de llegada.
+    """
+
+    def __init__(self, path: Optional[str] = DEFAULT_HISTORY_PATH, min_interval: float = DEFAULT_MIN_INTERVAL):
+        """
+        Args:
+            path: Archivo del log; None para un historial solo en memoria
+            min_interval: Segundos mínimos entre registros (0 = registrar todo)
+        """
+        self.path = os.path.abspath(path) if path else None
+        self.min_interval = min_interval
+        self.columns = ['timestamp'] + list(KPI_SERIES)
+        self._data = np.empty((0, len(self.columns)), dtype=np.float64)
+        self._size = 0
+        self._sorted = True
+        self._file_size = 0  # bytes del archivo que ya están en memoria
+        self._lock = threading.Lock()
+        self._load()
+
+    # Persistencia
+    def _columns_path(self) -> str:
+        return self.path + '.columns.json'
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self._columns_path(), 'r', encoding='utf-8') as f:
+                stored_columns = json.load(f)
+            file_size = os.path.getsize(self.path)
+            raw = np.fromfile(self.path, dtype=np.float64, count=file_size // 8)
+            rows = raw[:len(raw) - len(raw) % len(stored_columns)].reshape(-1, len(stored_columns))
+        except (OSError, ValueError) as e:
+            logging.warning(f"Historial de KPIs ilegible, se inicia vacío: {e}")
+            return
+        self._file_size = file_size
+
+        if stored_columns != self.columns:
+            remapped = np.full((len(rows), len(self.columns)), np.nan)
+            for i, name in enumerate(self.columns):
+                if name in stored_columns:
+                    remapped[:, i] = rows[:, stored_columns.index(name)]
+            rows = remapped
+            self._rewrite(rows)
+
+        # Procesos distintos agregan en desorden: en memoria va ordenado
+        self._data = rows[np.argsort(rows[:, 0], kind='stable')]
+        self._size = len(rows)
+        self._sorted = True
+
+    def _merge_file(self):
+        """Relee el archivo si otro proceso le agregó registros (llamar con el lock)"""
+        if not self.path:
+            return
+        try:
+            file_size = os.path.getsize(self.path)
+        except OSError:
+            return
+        if file_size != self._file_size:
+            self._file_size = file_size  # si no se puede leer, no se reintenta hasta que vuelva a cambiar
+            self._load()
+
+    def _rewrite(self, rows: np.ndarray):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            rows.astype(np.float64).tofile(self.path)
+            with open(self._columns_path(), 'w', encoding='utf-8') as f:
+                json.dump(self.columns, f)
+            self._file_size = rows.size * 8
+        except OSError as e:
+            logging.warning(f"No se pudo reescribir el historial de KPIs: {e}")
+
+    def _persist(self, row: np.ndarray):
+        if not self.path:
+            return
+        try:
+            if not os.path.exists(self._columns_path()):
+                self._rewrite(self._data[:self._size - 1])
+            with open(self.path, 'ab') as f:
+                row.tofile(f)
+            self._file_size += row.nbytes
+        except OSError as e:
+            logging.warning(f"No se pudo guardar el historial de KPIs: {e}")
+
+    # Escritura
+    def append(self, values: Dict[str, Any], timestamp: Optional[float] = None, force: bool = False) -> bool:
+        """
+        Agrega un registro con las series dadas (las faltantes quedan en NaN)
+
+        Returns:
+            False si se omitió por `min_interval`
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        row = np.array([timestamp] + [_as_float(values.get(name)) for name in KPI_SERIES], dtype=np.float64)
+
+        with self._lock:
+            if not force and self._size and timestamp - self._data[self._size - 1, 0] < self.min_interval:
+                return False
+            if self._size == len(self._data):
+                grown = np.empty((max(64, len(self._data) * 2), len(self.columns)), dtype=np.float64)
+                grown[:self._size] = self._data[:self._size]
+                self._data = grown
+            if self._size and timestamp < self._data[self._size - 1, 0]:
+                self._sorted = False
+            self._data[self._size] = row
+            self._size += 1
+            self._persist(row)
+        return True
+
+    def append_dashboard(self, dashboard: Mapping, force: bool = False) -> bool:
+        """Agrega las series de un resultado de `generate_executive_dashboard()` (dict o registro)"""
+        values = {name: extract(dashboard) for name, extract in KPI_SERIES.items()}
+        timestamp = dashboard.get('timestamp')
+        epoch = datetime.fromisoformat(timestamp).timestamp() if timestamp else None
+        return self.append(values, timestamp=epoch, force=force)
+
+    def __len__(self) -> int:
+        return self._size
+
+    # Consultas
+    def _rows(self, since: Optional[float] = None) -> np.ndarray:
+        with self._lock:
+            self._merge_file()
+            if not self._sorted:
+                order = np.argsort(self._data[:self._size, 0], kind='stable')
+                self._data[:self._size] = self._data[:self._size][order]
+                self._sorted = True
+            rows = self._data[:self._size]
+        if since is not None:
+            rows = rows[np.searchsorted(rows[:, 0], since):]
+        return rows
+
+    def frame(self, since: Optional[datetime] = None) -> pd.DataFrame:
+        """Historial como DataFrame indexado por fecha"""
+        rows = self._rows(since.timestamp() if since else None)
+        df = pd.DataFrame(rows[:, 1:], columns=self.columns[1:])
+        df.index = pd.to_datetime(rows[:, 0], unit='s')
+        df.index.name = 'timestamp'
+        return df
+
+    def latest(self, name: str) -> Optional[float]:
+        """Último valor registrado de una serie (None si no tiene registros)"""
+        column = self._rows()[:, self.columns.index(name)]
+        values = column[~np.isnan(column)]
+        return float(values[-1]) if len(values) else None
+
+    def change(self, name: str, window_days: Optional[float] = None) -> Optional[Tuple[float, float]]:
+        """
+        Cambio porcentual de una serie entre su primer y su último registro
+
+        Args:
+            name: Serie de KPI_SERIES
+            window_days: Solo los últimos N días; None = todo el historial
+
+        Returns:
+            (cambio %, timestamp del registro base), o None con menos de dos
+            registros o base cero
+        """
+        rows = self._rows(time.time() - window_days * SECONDS_PER_DAY if window_days else None)
+        column = rows[:, self.columns.index(name)]
+        mask = ~np.isnan(column)
+        if mask.sum() < 2:
+            return None
+        times, values = rows[mask, 0], column[mask]
+        if values[0] == 0:
+            return None
+        return float((values[-1] / values[0] - 1) * 100), float(times[0])
+
+    def deltas(self, periods: int = 1) -> Dict[str, float]:
+        """Último valor menos el de `periods` registros atrás, por serie"""
+        rows = self._rows()
+        if len(rows) <= periods:
+            return {name: np.nan for name in KPI_SERIES}
+        delta = rows[-1, 1:] - rows[-1 - periods, 1:]
+        return dict(zip(KPI_SERIES, delta.tolist()))
+
+    def rolling_mean(self, window: str = '7D') -> pd.DataFrame:
+        """Promedio móvil por ventana de tiempo ('7D', '24h', ...)"""
+        return self.frame().rolling(window, min_periods=1).mean()
+
+    def trends(self, window_days: Optional[float] = None) -> Dict[str, float]:
+        """
+        Pendiente por día de cada serie (mínimos cuadrados, ignorando NaN)
+
+        Args:
+            window_days: Solo los últimos N días; None = todo el historial
+        """
+        rows = self._rows(time.time() - window_days * SECONDS_PER_DAY if window_days else None)
+        if len(rows) < 2:
+            return {name: np.nan for name in KPI_SERIES}
+
+        t = ((rows[:, 0] - rows[-1, 0]) / SECONDS_PER_DAY)[:, None]
+        y = rows[:, 1:]
+        mask = ~np.isnan(y)
+        n = mask.sum(axis=0)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            t_mean = np.where(mask, t, 0.0).sum(axis=0) / n
+            y_mean = np.where(mask, y, 0.0).sum(axis=0) / n
+            dt = np.where(mask, t - t_mean, 0.0)
+            dy = np.where(mask, y - y_mean, 0.0)
+            variance = (dt * dt).sum(axis=0)
+            slope = np.where((n >= 2) & (variance > 0), (dt * dy).sum(axis=0) / variance, np.nan)
+
+        return dict(zip(KPI_SERIES, slope.tolist()))
+
+    def summary(self, targets: Optional[Dict[str, float]] = None, window_days: Optional[float] = 30,
+                rolling_window: str = '7D') -> Dict[str, Dict[str, Any]]:
+        """
+        Resumen por serie: último valor, delta, promedio móvil, pendiente y
+        proyección de la brecha contra el objetivo
+
+        Args:
+            targets: Objetivo por serie (p.ej. {'participacion_nacional': 1.8})
+            window_days: Ventana para la pendiente
+            rolling_window: Ventana del promedio móvil
+        """
+        rows = self._rows()
+        if not len(rows):
+            return {}
+
+        targets = targets or {}
+        last = rows[-1, 1:]
+        deltas = self.deltas()
+        slopes = self.trends(window_days)
+        recent = rows[rows[:, 0] > rows[-1, 0] - pd.Timedelta(rolling_window).total_seconds(), 1:]
+        with np.errstate(invalid='ignore'), warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            rolling = dict(zip(KPI_SERIES, np.nanmean(recent, axis=0).tolist()))
+        last_time = rows[-1, 0]
+
+        summary = {}
+        for i, name in enumerate(KPI_SERIES):
+            if np.isnan(last[i]):
+                continue
+            slope = slopes[name]
+            item = {
+                'ultimo': round(float(last[i]), 3),
+                'delta': _rounded(deltas[name]),
+                'promedio_movil': _rounded(rolling[name]),
+                'pendiente_dia': _rounded(slope, 4),
+                'registros': int(len(rows))
+            }
+            if name in targets:
+                gap = targets[name] - last[i]
+                item['objetivo'] = targets[name]
+                item['brecha'] = round(float(gap), 3)
+                if gap == 0:
+                    item['dias_a_objetivo'] = 0.0
+                elif not np.isnan(slope) and slope != 0 and np.sign(slope) == np.sign(gap) and gap / slope <= MAX_PROJECTION_DAYS:
+                    days = gap / slope
+                    item['dias_a_objetivo'] = round(float(days), 1)
+                    item['fecha_proyectada'] = datetime.fromtimestamp(last_time + days * SECONDS_PER_DAY).date().isoformat()
+                else:
+                    item['dias_a_objetivo'] = None  # la tendencia no converge al objetivo (o tardaría demasiado)
+            summary[name] = item
+        return summary
+
+
+def _rounded(value: float, digits: int = 3) -> Optional[float]:
+    return None if value is None or np.isnan(value) else round(float(value), digits)
+
+
+_default_store: Optional[KPIHistoryStore] = None
+_default_store_lock = threading.Lock()
+
+
+def get_history_store() -> KPIHistoryStore:
+    """Historial de KPIs único del proceso (archivo en data/)"""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = KPIHistoryStore()
+        return _default_store
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Modelo compacto de resultados de KPIs de AIFA
+Registros con __slots__ para cada KPI, serialización a bytes (orjson si está
+instalado) y adaptadores de solo lectura para el código que consume dicts
+"""
+
+import json
+import zlib
+from collections.abc import Mapping
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, Any, Iterator, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional
+    orjson = None
+
+# Versión del formato serializado
+PAYLOAD_VERSION = 2
+
+# Campos comunes a todos los KPIs; se guardan por posición y no por llave
+COMMON_FIELDS = ('id', 'nombre', 'categoria', 'estado', 'fuente', 'precision')
+
+# Payloads a partir de este tamaño se comprimen en `dumps()` (bytes)
+COMPRESSION_THRESHOLD = 512
+
+# Secciones del dashboard ejecutivo que contienen KPIs
+KPI_SECTIONS = ('kpis_estrategicos', 'kpis_operacionales', 'kpis_economicos')
+
+
+@dataclass(eq=False)
+class KPIRecord(Mapping):
+    """
+    Un KPI del dashboard
+
+    Los campos comunes van en slots; los específicos de cada KPI en `extra`.
+    Implementa Mapping, así que `record['valor_actual']` y
+    `record.get('estado')` funcionan igual que con el dict original.
+    `present` es una máscara de bits (uno por campo común, en el orden de
+    COMMON_FIELDS) que distingue un campo ausente de uno que vale None.
+    """
+    __slots__ = ('key', 'present') + COMMON_FIELDS + ('extra',)
+
+    key: str
+    present: int
+    id: Optional[str]
+    nombre: Optional[str]
+    categoria: Optional[str]
+    estado: Optional[str]
+    fuente: Optional[str]
+    precision: Optional[str]
+    extra: Dict[str, Any]
+
+    @classmethod
+    def from_dict(cls, key: str, kpi: Dict[str, Any]) -> 'KPIRecord':
+        extra = {name: value for name, value in kpi.items() if name not in COMMON_FIELDS}
+        present = sum(1 << bit for bit, name in enumerate(COMMON_FIELDS) if name in kpi)
+        return cls(key, present, *(kpi.get(name) for name in COMMON_FIELDS), extra)
+
+    def _has(self, name: str) -> bool:
+        return bool(self.present >> COMMON_FIELDS.index(name) & 1)
+
+    def __getitem__(self, name: str) -> Any:
+        if name in COMMON_FIELDS:
+            if not self._has(name):
+                raise KeyError(name)
+            return getattr(self, name)
+        return self.extra[name]
+
+    def __iter__(self) -> Iterator[str]:
+        for name in COMMON_FIELDS:
+            if self._has(name):
+                yield name
+        yield from self.extra
+
+    def __len__(self) -> int:
+        return bin(self.present).count('1') + len(self.extra)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.items())
+
+    def _row(self) -> list:
+        return [self.key, self.present] + [getattr(self, name) for name in COMMON_FIELDS] + [self.extra]
+
+    @classmethod
+    def _from_row(cls, row: list) -> 'KPIRecord':
+        return cls(*row)
+
+
+@dataclass(eq=False)
+class ExecutiveDashboardRecord(Mapping):
+    """
+    Resultado compacto de `generate_executive_dashboard()`
+
+    Como Mapping se comporta como el dict original: cada sección de KPIs se
+    expone como un mapping de solo lectura {llave: KPIRecord, resumen: dict},
+    que se arma una vez y se reutiliza. `as_dict()` reconstruye el dict
+    completo para quien lo necesite mutable.
+    """
+    __slots__ = ('timestamp', 'periodo_reporte', 'sections', 'summaries', 'extra', '_views')
+
+    timestamp: str
+    periodo_reporte: str
+    sections: Dict[str, Tuple[KPIRecord, ...]]
+    summaries: Dict[str, Dict[str, Any]]   # sección → {'resumen_…': {...}}
+    extra: Dict[str, Any]                  # alertas, recomendaciones, scorecard, ...
+
+    def __post_init__(self):
+        self._views: Dict[str, Mapping] = {}
+
+    @classmethod
+    def from_dashboard(cls, dashboard: Dict[str, Any]) -> 'ExecutiveDashboardRecord':
+        sections, summaries = {}, {}
+        for section in KPI_SECTIONS:
+            content = dashboard.get(section, {})
+            sections[section] = tuple(
+                KPIRecord.from_dict(key, value) for key, value in content.items() if key.startswith('kpi_')
+            )
+            summaries[section] = {key: value for key, value in content.items() if not key.startswith('kpi_')}
+        extra = {
+            key: value for key, value in dashboard.items()
+            if key not in KPI_SECTIONS and key not in ('timestamp', 'periodo_reporte')
+        }
+        return cls(dashboard.get('timestamp'), dashboard.get('periodo_reporte'), sections, summaries, extra)
+
+    def section(self, name: str) -> Mapping:
+        """Sección de KPIs como mapping de solo lectura (se arma en el primer acceso)"""
+        view = self._views.get(name)
+        if view is None:
+            view = self._views[name] = MappingProxyType({
+                **{record.key: record for record in self.sections[name]},
+                **self.summaries.get(name, {})
+            })
+        return view
+
+    def __getitem__(self, name: str) -> Any:
+        if name == 'timestamp':
+            return self.timestamp
+        if name == 'periodo_reporte':
+            return self.periodo_reporte
+        if name in KPI_SECTIONS:
+            return self.section(name)
+        return self.extra[name]
+
+    def __iter__(self) -> Iterator[str]:
+        yield 'timestamp'
+        yield 'periodo_reporte'
+        yield from KPI_SECTIONS
+        yield from self.extra
+
+    def __len__(self) -> int:
+        return 2 + len(KPI_SECTIONS) + len(self.extra)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Dict equivalente al de `generate_executive_dashboard()`"""
+        dashboard = {'timestamp': self.timestamp, 'periodo_reporte': self.periodo_reporte}
+        for name in KPI_SECTIONS:
+            dashboard[name] = {
+                **{record.key: record.to_dict() for record in self.sections[name]},
+                **self.summaries.get(name, {})
+            }
+        dashboard.update(self.extra)
+        return dashboard
+
+    # Serialización
+    def to_payload(self) -> Dict[str, Any]:
+        """Forma compacta: KPIs como filas con los campos comunes por posición"""
+        return {
+            'v': PAYLOAD_VERSION,
+            't': self.timestamp,
+            'p': self.periodo_reporte,
+            'f': list(COMMON_FIELDS),
+            's': {name: [record._row() for record in records] for name, records in self.sections.items()},
+            'r': self.summaries,
+            'x': self.extra
+        }
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any]) -> 'ExecutiveDashboardRecord':
+        if payload.get('v') != PAYLOAD_VERSION or tuple(payload.get('f', ())) != COMMON_FIELDS:
+            raise ValueError(f"Formato de payload de KPIs no soportado: v={payload.get('v')}")
+        sections = {name: tuple(KPIRecord._from_row(row) for row in rows) for name, rows in payload['s'].items()}
+        return cls(payload['t'], payload['p'], sections, payload['r'], payload['x'])
+
+    def to_json(self) -> bytes:
+        """Payload compacto como JSON (para enviar al navegador)"""
+        return to_json(self.to_payload())
+
+    def dumps(self) -> bytes:
+        """Payload compacto para caché (comprimido si es grande)"""
+        return dumps(self.to_payload())
+
+    @classmethod
+    def loads(cls, data: bytes) -> 'ExecutiveDashboardRecord':
+        return cls.from_payload(loads(data))
+
+
+def to_json(obj: Any) -> bytes:
+    """JSON compacto en bytes (orjson si está disponible)"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS, default=_json_default)
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False, default=_json_default).encode('utf-8')
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    Bytes para caché: prefijo de 1 byte (b'j' JSON, b'z' JSON con zlib),
+    mismo esquema que los backends de caché compartida del cliente de APIs
+    """
+    raw = to_json(obj)
+    if len(raw) >= COMPRESSION_THRESHOLD:
+        return b'z' + zlib.compress(raw, 6)
+    return b'j' + raw
+
+
+def loads(data: bytes) -> Any:
+    """Inverso de `dumps()`; también acepta JSON sin prefijo"""
+    prefix, body = data[:1], data[1:]
+    if prefix == b'z':
+        body = zlib.decompress(body)
+    elif prefix != b'j':
+        body = data
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def _json_default(obj: Any) -> Any:
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if hasattr(obj, 'item'):  # escalares de NumPy
+        return obj.item()
+    return str(obj)
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Snapshot de fuentes para el cálculo de KPIs de AIFA
+Consulta cada conector una sola vez por render para que todos los KPIs
+de un reporte reflejen el mismo instante
+"""
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from datetime import datetime
+from types import MappingProxyType
+from typing import Dict, Any, Optional, Mapping, FrozenSet, Tuple
+
+from connection_health import ConnectionHealthRegistry, get_health_registry
+
+
+@dataclass(frozen=True)
+class SourceSnapshot:
+    """
+    Datos crudos de todas las fuentes, tomados una vez por render
+
+    Inmutable: los métodos de cálculo solo leen de aquí. Un campo en None
+    significa que el conector no está configurado o que su consulta falló;
+    en el segundo caso el error queda en `errors` con la llave de la sección.
+    """
+    taken_at: datetime
+    gov_kpis: Mapping[str, Any]
+    aviation_status: Optional[Dict[str, Any]] = None
+    aviation_flights: Optional[Dict[str, Any]] = None
+    flightaware_status: Optional[Dict[str, Any]] = None
+    flightaware_delays: Optional[Dict[str, Any]] = None
+    weather: Optional[Dict[str, Any]] = None
+    flightradar_summary: Optional[Dict[str, Any]] = None
+    errors: Mapping[str, str] = field(default_factory=lambda: MappingProxyType({}))
+    timed_out: FrozenSet[str] = frozenset()
+    timings: Mapping[str, float] = field(default_factory=lambda: MappingProxyType({}))
+
+    def error(self, section: str) -> Optional[str]:
+        """Error registrado al consultar la sección, si lo hubo"""
+        return self.errors.get(section)
+
+    def is_timed_out(self, section: str) -> bool:
+        """True si la sección no respondió dentro de su tiempo límite"""
+        return section in self.timed_out
+
+    def timing(self, section: str) -> Optional[float]:
+        """Milisegundos que tomó consultar la sección ('gov' o una sección en vivo)"""
+        return self.timings.get(section)
+
+
+# Secciones en vivo del snapshot (una por KPI de tiempo real)
+LIVE_SECTIONS = ('aviation', 'flightaware', 'weather', 'flightradar')
+
+# Tiempo límite por sección en modo paralelo (segundos)
+DEFAULT_SECTION_TIMEOUT = 8.0
+
+# Pool compartido para las consultas en vivo. Una sección que excede su
+# tiempo límite sigue corriendo en su hilo, pero el render ya no la espera.
+_live_executor = ThreadPoolExecutor(max_workers=len(LIVE_SECTIONS) * 2, thread_name_prefix='kpi-live')
+
+# Consulta en curso por (sección, conector): mientras una consulta que
+# excedió su tiempo límite siga corriendo, los renders siguientes la
+# esperan a ella en vez de encolar otra
+_inflight: Dict[Tuple[str, int], Future] = {}
+_inflight_lock = threading.Lock()
+
+
+def _submit_live(section: str, collector, connector, health) -> Future:
+    """Lanza la consulta de una sección, o reutiliza la que sigue en curso"""
+    key = (section, id(connector))
+    with _inflight_lock:
+        future = _inflight.get(key)
+        if future is None or future.done():
+            future = _inflight[key] = _live_executor.submit(_timed, collector, connector, health)
+        return future
+
+
+def collect_gov_kpis(data_connector) -> Mapping[str, Any]:
+    """KPIs gubernamentales (fuente estática), de solo lectura a nivel raíz"""
+    return MappingProxyType(data_connector.get_aifa_real_kpis())
+
+
+def collect_aviation(aviation_connector, health: ConnectionHealthRegistry) -> Dict[str, Any]:
+    """
+    Resumen de vuelos de AviationStack (KPI_006)
+
+    El resumen cae a datos simulados cuando la API falla, así que la
+    precisión del resultado es la señal de salud de la API. No se usa
+    test_connection() como prueba: cada llamada gasta cuota facturada.
+    """
+    flights = aviation_connector.get_flights_summary()
+    if flights.get('cache_cuota'):
+        health.record_failure(
+            'aviation', 'Cuota del intervalo gastada; se sirve el último resultado',
+            status='LIMITADO_POR_CUOTA', api_activa=True
+        )
+    elif flights.get('precision') == 'REAL':
+        health.record_success('aviation')
+    else:
+        health.record_failure('aviation', flights.get('nota', 'API no disponible'))
+    return {
+        'aviation_status': health.status('aviation'),
+        'aviation_flights': flights
+    }
+
+
+def collect_flightaware(flightaware_connector, health: ConnectionHealthRegistry) -> Dict[str, Any]:
+    """Estado y delays de FlightAware (KPI_007); delays solo si la API está activa"""
+    delays = None
+    if health.status('flightaware', flightaware_connector.test_connection).get('api_activa'):
+        delays = flightaware_connector.get_delay_statistics("NLU")
+        _record_flightaware_outcome(health, delays)
+    return {
+        'flightaware_status': health.status('flightaware', flightaware_connector.test_connection),
+        'flightaware_delays': delays
+    }
+
+
+def _record_flightaware_outcome(health: ConnectionHealthRegistry, delays: Dict[str, Any]):
+    """Traduce el resultado de get_delay_statistics() al registro de salud"""
+    if delays.get('success'):
+        health.record_success('flightaware')
+        return
+
+    error_code = delays.get('error_code')
+    error_msg = delays.get('error_msg') or delays.get('error', 'Sin respuesta')
+    if error_code is None:
+        health.record_failure('flightaware', error_msg, status='ERROR_CONEXION')
+    elif error_code == 401:
+        health.record_failure('flightaware', 'API Key inválida o no autorizada', status='ERROR_AUTH', error_code=error_code)
+    elif error_code >= 500:
+        health.record_failure('flightaware', error_msg, error_code=error_code)
+    else:
+        # 429 o endpoint fuera del plan: la API responde, pero limitada
+        health.record_failure('flightaware', error_msg, status='LIMITADO', api_activa=True, error_code=error_code)
+
+
+def collect_weather(weather_manager, health: ConnectionHealthRegistry) -> Dict[str, Any]:
+    """Clima actual del AIFA (KPI_008)"""
+    weather = weather_manager.get_current_weather('NLU')
+    if weather and weather.get('data_source', '').startswith('openweathermap'):
+        health.record_success('weather')
+    else:
+        health.record_failure('weather', 'Datos simulados - API no disponible')
+    return {'weather': weather}
+
+
+def collect_flightradar(flightradar_connector, health: ConnectionHealthRegistry) -> Dict[str, Any]:
+    """Resumen de actividad FlightRadar24 (KPI_009), con los vuelos en columnas"""
+    summary = flightradar_connector.get_aifa_summary(columnar=True)
+    if summary.get('success'):
+        health.record_success('flightradar')
+    else:
+        health.record_failure('flightradar', summary.get('error', 'Sin datos en el momento'), api_activa=True)
+    return {'flightradar_summary': summary}
+
+
+def _timed(collector, connector, health: ConnectionHealthRegistry):
+    """Ejecuta un collector y regresa (resultado, milisegundos)"""
+    started = time.perf_counter()
+    result = collector(connector, health)
+    return result, (time.perf_counter() - started) * 1000
+
+
+def take_snapshot(
+    data_connector,
+    aviation_connector=None,
+    flightaware_connector=None,
+    weather_manager=None,
+    flightradar_connector=None,
+    include_live: bool = True,
+    parallel: bool = False,
+    section_timeout: float = DEFAULT_SECTION_TIMEOUT,
+    health: Optional[ConnectionHealthRegistry] = None
+) -> SourceSnapshot:
+    """
+    Consulta cada conector una vez y congela los resultados
+
+    Args:
+        data_connector: Conector de datos gubernamentales (obligatorio)
+        aviation_connector, flightaware_connector, weather_manager,
+        flightradar_connector: Conectores en vivo opcionales
+        include_live: False para tomar solo la fuente gubernamental
+        parallel: Consultar las secciones en vivo de forma concurrente
+        section_timeout: Tiempo límite en modo paralelo, contado desde el
+            inicio del snapshot; las secciones que no terminan a tiempo
+            quedan en `timed_out`
+        health: Registro de salud de conexiones (por defecto el del proceso);
+            reemplaza los test_connection() previos a cada llamada
+
+    Returns:
+        SourceSnapshot con todas las fuentes
+    """
+    started = time.perf_counter()
+    deadline = time.monotonic() + section_timeout
+    health = health or get_health_registry()
+    fields: Dict[str, Any] = {'gov_kpis': collect_gov_kpis(data_connector)}
+    errors: Dict[str, str] = {}
+    timed_out = set()
+    timings: Dict[str, float] = {'gov': (time.perf_counter() - started) * 1000}
+
+    if include_live:
+        collectors = {
+            'aviation': (collect_aviation, aviation_connector),
+            'flightaware': (collect_flightaware, flightaware_connector),
+            'weather': (collect_weather, weather_manager),
+            'flightradar': (collect_flightradar, flightradar_connector)
+        }
+        collectors = {
+            section: (collector, connector)
+            for section, (collector, connector) in collectors.items()
+            if connector is not None
+        }
+
+        if parallel:
+            # Todas las secciones arrancan juntas y comparten el mismo
+            # deadline, así que el render espera a lo más `section_timeout`
+            submitted = time.perf_counter()
+            futures = {
+                section: _submit_live(section, collector, connector, health)
+                for section, (collector, connector) in collectors.items()
+            }
+            for section, future in futures.items():
+                try:
+                    result, timings[section] = future.result(timeout=max(deadline - time.monotonic(), 0))
+                    fields.update(result)
+                except FutureTimeoutError:
+                    timed_out.add(section)
+                    timings[section] = (time.perf_counter() - submitted) * 1000
+                except Exception as e:
+                    errors[section] = str(e)
+                    timings[section] = (time.perf_counter() - submitted) * 1000
+                    health.record_failure(section, str(e), status='ERROR_CONEXION')
+        else:
+            for section, (collector, connector) in collectors.items():
+                section_started = time.perf_counter()
+                try:
+                    fields.update(collector(connector, health))
+                except Exception as e:
+                    errors[section] = str(e)
+                    health.record_failure(section, str(e), status='ERROR_CONEXION')
+                timings[section] = (time.perf_counter() - section_started) * 1000
+
+    return SourceSnapshot(
+        taken_at=datetime.now(),
+        errors=MappingProxyType(errors),
+        timed_out=frozenset(timed_out),
+        timings=MappingProxyType(timings),
+        **fields
+    )
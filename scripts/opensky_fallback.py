@@ -11,6 +11,7 @@ import json
 from datetime import datetime, timedelta
 from pathlib import Path
 import logging
+from flight_records import from_opensky_states, write_flights_csv
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -39,43 +40,25 @@ class OpenSkyFallback:
                         data = await response.json()
                         
                         if data and data.get('states'):
-                            flights_data = []
-                            
-                            for state in data['states']:
-                                if state[1]:  # Si tiene callsign
-                                    flight_info = {
-                                        'icao24': state[0],
-                                        'callsign': state[1].strip(),
-                                        'origin_country': state[2],
-                                        'longitude': state[5],
-                                        'latitude': state[6],
-                                        'altitude': state[7],
-                                        'velocity': state[9],
-                                        'heading': state[10],
-                                        'timestamp': datetime.fromtimestamp(data['time']),
-                                        'distance_to_aifa': self._calculate_distance_to_aifa(state[6], state[5]) if state[6] and state[5] else None
-                                    }
-                                    flights_data.append(flight_info)
+                            flights = from_opensky_states(data['states'], data.get('time'))
                             
                             # Filtrar vuelos cercanos a AIFA (dentro de 100km)
-                            aifa_flights = [f for f in flights_data if f['distance_to_aifa'] and f['distance_to_aifa'] < 100]
+                            aifa_flights = flights[flights['distance_to_aifa_km'] < 100]
                             
                             # Guardar todos los vuelos
-                            df_all = pd.DataFrame(flights_data)
-                            df_all.to_csv(self.data_path / 'vuelos_mexico_tiempo_real.csv', index=False)
+                            write_flights_csv(flights, self.data_path / 'vuelos_mexico_tiempo_real.csv')
                             
                             # Guardar vuelos cercanos a AIFA
-                            if aifa_flights:
-                                df_aifa = pd.DataFrame(aifa_flights)
-                                df_aifa.to_csv(self.data_path / 'vuelos_cerca_aifa.csv', index=False)
+                            if len(aifa_flights):
+                                write_flights_csv(aifa_flights, self.data_path / 'vuelos_cerca_aifa.csv')
                             
                             # Generar estadísticas
-                            stats = self._generate_flight_stats(flights_data, aifa_flights)
+                            stats = self._generate_flight_stats(flights, aifa_flights)
                             
                             with open(self.data_path / 'estadisticas_vuelos_publicos.json', 'w') as f:
                                 json.dump(stats, f, indent=2, default=str, ensure_ascii=False)
                             
-                            logger.info(f"✅ Vuelos obtenidos - Total: {len(flights_data)}, Cerca AIFA: {len(aifa_flights)}")
+                            logger.info(f"✅ Vuelos obtenidos - Total: {len(flights)}, Cerca AIFA: {len(aifa_flights)}")
                             return True
                         else:
                             logger.warning("No se encontraron vuelos en el área")
@@ -88,81 +71,55 @@ class OpenSkyFallback:
             logger.error(f"Error obteniendo vuelos: {e}")
             return False
     
-    def _calculate_distance_to_aifa(self, lat, lon):
-        """Calcular distancia aproximada a AIFA en km"""
-        if not lat or not lon:
-            return None
-            
-        # Coordenadas AIFA: 19.7365°N, 99.0149°W
-        aifa_lat, aifa_lon = 19.7365, -99.0149
-        
-        # Fórmula haversine simplificada
-        import math
-        
-        lat1, lon1 = math.radians(aifa_lat), math.radians(aifa_lon)
-        lat2, lon2 = math.radians(lat), math.radians(lon)
-        
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-        
-        a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-        c = 2 * math.asin(math.sqrt(a))
-        
-        return c * 6371  # Radio de la Tierra en km
-    
-    def _generate_flight_stats(self, all_flights, aifa_flights):
-        """Generar estadísticas de vuelos"""
+    def _generate_flight_stats(self, all_flights: pd.DataFrame, aifa_flights: pd.DataFrame):
+        """Generar estadísticas de vuelos (sobre las columnas de flight_records)"""
         stats = {
             'timestamp': datetime.now().isoformat(),
             'total_flights_mexico': len(all_flights),
             'flights_near_aifa_100km': len(aifa_flights),
             'coverage_area': 'México Central (18.5-20.5°N, 100.5-97.5°W)',
-            'countries_detected': list(set(f['origin_country'] for f in all_flights if f['origin_country'])),
+            'countries_detected': all_flights['origin_country'].dropna().unique().tolist(),
             'airlines_detected': [],
             'altitude_stats': {},
             'velocity_stats': {},
             'aifa_analysis': {}
         }
         
-        if all_flights:
+        if len(all_flights):
             # Análisis de aerolíneas (por callsign)
-            callsigns = [f['callsign'][:3] for f in all_flights if f['callsign'] and len(f['callsign']) >= 3]
-            airline_counts = {}
-            for airline in callsigns:
-                airline_counts[airline] = airline_counts.get(airline, 0) + 1
-            
-            stats['airlines_detected'] = dict(sorted(airline_counts.items(), key=lambda x: x[1], reverse=True)[:10])
+            callsigns = all_flights['callsign'].dropna()
+            prefixes = callsigns[callsigns.str.len() >= 3].str[:3]
+            stats['airlines_detected'] = {airline: int(count) for airline, count in prefixes.value_counts().head(10).items()}
             
             # Estadísticas de altitud
-            altitudes = [f['altitude'] for f in all_flights if f['altitude'] and f['altitude'] > 0]
-            if altitudes:
+            altitudes = all_flights['altitude'][all_flights['altitude'] > 0]
+            if len(altitudes):
                 stats['altitude_stats'] = {
-                    'min_meters': min(altitudes),
-                    'max_meters': max(altitudes),
-                    'avg_meters': sum(altitudes) / len(altitudes),
-                    'flights_below_10000m': len([a for a in altitudes if a < 10000])
+                    'min_meters': float(altitudes.min()),
+                    'max_meters': float(altitudes.max()),
+                    'avg_meters': float(altitudes.mean()),
+                    'flights_below_10000m': int((altitudes < 10000).sum())
                 }
             
             # Estadísticas de velocidad
-            velocities = [f['velocity'] for f in all_flights if f['velocity'] and f['velocity'] > 0]
-            if velocities:
+            velocities = all_flights['velocity'][all_flights['velocity'] > 0]
+            if len(velocities):
                 stats['velocity_stats'] = {
-                    'min_mps': min(velocities),
-                    'max_mps': max(velocities),
-                    'avg_mps': sum(velocities) / len(velocities),
-                    'avg_kmh': (sum(velocities) / len(velocities)) * 3.6
+                    'min_mps': float(velocities.min()),
+                    'max_mps': float(velocities.max()),
+                    'avg_mps': float(velocities.mean()),
+                    'avg_kmh': float(velocities.mean()) * 3.6
                 }
         
         # Análisis específico de área AIFA
-        if aifa_flights:
-            aifa_altitudes = [f['altitude'] for f in aifa_flights if f['altitude'] and f['altitude'] > 0]
-            aifa_countries = list(set(f['origin_country'] for f in aifa_flights if f['origin_country']))
+        if len(aifa_flights):
+            aifa_altitudes = aifa_flights['altitude']
             
             stats['aifa_analysis'] = {
-                'flights_in_approach_altitude': len([a for a in aifa_altitudes if 500 < a < 3000]) if aifa_altitudes else 0,
-                'countries_near_aifa': aifa_countries,
+                'flights_in_approach_altitude': int(((aifa_altitudes > 500) & (aifa_altitudes < 3000)).sum()),
+                'countries_near_aifa': aifa_flights['origin_country'].dropna().unique().tolist(),
                 'potential_aifa_traffic': len(aifa_flights),
-                'closest_flight_km': min(f['distance_to_aifa'] for f in aifa_flights) if aifa_flights else None
+                'closest_flight_km': float(aifa_flights['distance_to_aifa_km'].min())
             }
         
         return stats
@@ -4,22 +4,63 @@ Conector para datos REALES del gobierno mexicano y APIs comerciales
 Fuentes verificadas: AFAC, DATATUR, AviationStack
 """
 
-import requests
 import pandas as pd
 import json
+import hashlib
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import time
 from typing import Dict, Any, Optional
 import logging
 import os
+import sys
+from flight_records import from_aviationstack
+from flightaware_connector import (
+    FlightAwareConnector as AeroAPIFlightsConnector, delays_endpoint_error, remember_delays_endpoint_error
+)
+from http_transport import PROBE_TIMEOUT, Timeout, get_http_transport, record_cache_hit
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from services.quota_ledger import QuotaLedger, QuotaExhaustedError, get_quota_ledger
+
+# Formato del bundle de KPIs gubernamentales (cambia si cambia su estructura)
+KPI_BUNDLE_FORMAT = 1
+
+# Bundle precompilado; se usa al arrancar si existe y su versión coincide
+DEFAULT_KPI_BUNDLE_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'aifa_kpi_bundle.json')
+
+# Paginación de /flights de AviationStack (el API no acepta limit > 100).
+# Cada página es un request facturado: un resumen cuesta 2 × páginas
+# (salidas y llegadas), contra 100 requests/mes del plan gratuito
+# (AVIATIONSTACK_MONTHLY_QUOTA). Subir este tope solo con un plan mayor.
+AVIATIONSTACK_PAGE_SIZE = 100
+AVIATIONSTACK_MAX_PAGES = 1
+
+# Nombre de AviationStack en el libro de cuotas
+AVIATIONSTACK_QUOTA_API = 'aviationstack'
+
+# Salidas y llegadas se consultan en paralelo
+_aviationstack_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='aviationstack')
+
+# Bundles ya construidos en el proceso, por versión (serializados en JSON)
+_kpi_bundles: Dict[str, str] = {}
+_kpi_bundles_lock = threading.Lock()
+
 
 class GobMXRealDataConnector:
     """
     Conector para datos REALES del gobierno mexicano
     Fuentes verificadas: AFAC, DATATUR, datos.gob.mx
+
+    Los KPIs solo cambian cuando AFAC publica cifras nuevas: se construyen
+    una vez por versión de los datos verificados (o se cargan del bundle
+    precompilado) y se guardan serializados; cada llamada recibe su propio
+    dict, que se puede modificar, copiar o serializar.
     """
     
-    def __init__(self):
+    def __init__(self, bundle_path: Optional[str] = DEFAULT_KPI_BUNDLE_PATH):
         self.sources = {
             'afac': 'https://www.gob.mx/afac/acciones-y-programas/estadisticas-280404',
             'datatur': 'https://datatur.sectur.gob.mx/SitePages/FlujoPorAerolinea.aspx',
@@ -57,11 +98,80 @@ class GobMXRealDataConnector:
             9: {'aeropuerto': 'Toluca', 'pasajeros': 6800000, 'codigo': 'TLC'},
             10: {'aeropuerto': 'Felipe Ángeles (AIFA)', 'pasajeros': 6348000, 'codigo': 'NLU'}
         }
+        
+        self.bundle_path = os.path.abspath(bundle_path) if bundle_path else None
+        self.kpi_bundle_version = self._kpi_bundle_version()
+        self._kpi_bundle_json = self._load_kpi_bundle()
     
     def get_aifa_real_kpis(self) -> Dict[str, Any]:
         """
         Retorna KPIs REALES del AIFA con fuentes verificables
+        
+        Returns:
+            Dict nuevo en cada llamada (json.loads del bundle, decenas de µs)
+        """
+        return json.loads(self._kpi_bundle_json)
+    
+    def _kpi_bundle_version(self) -> str:
+        """Versión del bundle: fecha de verificación + hash de los datos de entrada"""
+        inputs = json.dumps(
+            [KPI_BUNDLE_FORMAT, self.verified_aifa_data, self.benchmarks_nacionales, self.sources],
+            sort_keys=True, default=str
+        )
+        digest = hashlib.md5(inputs.encode()).hexdigest()[:10]
+        return f"{self.verified_aifa_data['ultima_verificacion']}-{digest}"
+    
+    def _load_kpi_bundle(self) -> str:
+        """Bundle (JSON) de la versión actual: del proceso, del archivo precompilado o construido"""
+        with _kpi_bundles_lock:
+            bundle = _kpi_bundles.get(self.kpi_bundle_version)
+            if bundle is None:
+                kpis = self._read_compiled_bundle()
+                if kpis is None:
+                    kpis = self._build_aifa_real_kpis()
+                bundle = _kpi_bundles[self.kpi_bundle_version] = json.dumps(kpis, ensure_ascii=False)
+            return bundle
+    
+    def _read_compiled_bundle(self) -> Optional[Dict[str, Any]]:
+        if not self.bundle_path or not os.path.exists(self.bundle_path):
+            return None
+        try:
+            with open(self.bundle_path, 'r', encoding='utf-8') as f:
+                compiled = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Bundle de KPIs ilegible, se reconstruye: {e}")
+            return None
+        if compiled.get('format') != KPI_BUNDLE_FORMAT or compiled.get('version') != self.kpi_bundle_version:
+            logging.info(f"Bundle de KPIs desactualizado ({compiled.get('version')}), se reconstruye")
+            return None
+        return compiled['kpis']
+    
+    def compile_kpi_bundle(self, path: Optional[str] = None) -> str:
+        """
+        Escribe el bundle precompilado de la versión actual
+        
+        Args:
+            path: Destino (default: `bundle_path` del conector)
+        
+        Returns:
+            Ruta del archivo escrito
         """
+        path = os.path.abspath(path or self.bundle_path or DEFAULT_KPI_BUNDLE_PATH)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        compiled = {
+            'format': KPI_BUNDLE_FORMAT,
+            'version': self.kpi_bundle_version,
+            'compilado': datetime.now().isoformat(),
+            'kpis': self.get_aifa_real_kpis()
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(compiled, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+        return path
+    
+    def _build_aifa_real_kpis(self) -> Dict[str, Any]:
+        """Construye los KPIs a partir de `verified_aifa_data` (una vez por versión)"""
         return {
             'posicionamiento_nacional': {
                 'participacion_pasajeros': {
@@ -172,17 +282,58 @@ class GobMXRealDataConnector:
 class AviationStackConnector:
     """
     Integración con AviationStack para datos en tiempo real del AIFA
+    
+    Cada llamada pasa antes por el libro de cuotas; si el presupuesto del
+    intervalo actual ya se gastó, la llamada no se hace y los métodos
+    públicos regresan el último resultado guardado (marcado con
+    'cache_cuota') sin llamar al API.
     """
     
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, page_size: int = AVIATIONSTACK_PAGE_SIZE,
+                 max_pages: int = AVIATIONSTACK_MAX_PAGES, quota_ledger: Optional[QuotaLedger] = None):
         self.api_key = api_key or "59f5d7300a3c8236dc29e095fa6ab923"
         self.base_url = "http://api.aviationstack.com/v1"
-        self.timeout = 10
+        self.page_size = page_size
+        self.max_pages = max_pages
+        # Pool de conexiones compartido (keep-alive) por salidas y llegadas
+        self.http = get_http_transport()
+        self.quota = quota_ledger or get_quota_ledger()
+        
+    def _get(self, url: str, params: Dict[str, Any], timeout: Timeout = None):
+        """
+        GET al API, solo si el libro de cuotas autoriza (y registra) la llamada
         
+        Raises:
+            QuotaExhaustedError si la cuota o la ráfaga del intervalo se agotó
+        """
+        if not self.quota.try_record(AVIATIONSTACK_QUOTA_API):
+            raise QuotaExhaustedError(AVIATIONSTACK_QUOTA_API)
+        return self.http.get(url, params=params, timeout=timeout)
+    
+    def _quota_exhausted(self) -> bool:
+        return not self.quota.can_refresh(AVIATIONSTACK_QUOTA_API)
+    
+    def _cached_result(self, key: str) -> Optional[Dict[str, Any]]:
+        """Último resultado guardado de `key`, marcado como servido por cuota"""
+        cached = self.quota.cached_result(AVIATIONSTACK_QUOTA_API, key)
+        if cached is None:
+            return None
+        payload, fetched_at = cached
+        record_cache_hit(AVIATIONSTACK_QUOTA_API, f'cache:{key}')
+        return {**payload, 'cache_cuota': True, 'obtenido': datetime.fromtimestamp(fetched_at).isoformat()}
+    
+    def quota_status(self) -> Dict[str, Any]:
+        """Cuota usada, restante e intervalo mínimo entre refrescos"""
+        return self.quota.status(AVIATIONSTACK_QUOTA_API)
+    
     def get_airport_info(self, iata_code: str = "NLU") -> Dict[str, Any]:
         """
         Obtiene información del aeropuerto AIFA
         """
+        key = f"airport_info:{iata_code}"
+        if self._quota_exhausted():
+            return self._cached_result(key) or {'error': 'Cuota de AviationStack agotada para este intervalo'}
+        
         try:
             url = f"{self.base_url}/airports"
             params = {
@@ -191,14 +342,14 @@ class AviationStackConnector:
                 'limit': 1
             }
             
-            response = requests.get(url, params=params, timeout=self.timeout)
+            response = self._get(url, params=params)
             response.raise_for_status()
             
             data = response.json()
             
             if 'data' in data and len(data['data']) > 0:
                 airport = data['data'][0]
-                return {
+                info = {
                     'nombre': airport.get('airport_name', 'N/A'),
                     'iata': airport.get('iata_code', 'N/A'),
                     'icao': airport.get('icao_code', 'N/A'),
@@ -210,9 +361,13 @@ class AviationStackConnector:
                     'fuente': 'AviationStack API',
                     'timestamp': datetime.now().isoformat()
                 }
+                self.quota.save_result(AVIATIONSTACK_QUOTA_API, key, info)
+                return info
             else:
                 return {'error': 'Aeropuerto no encontrado'}
-                
+        
+        except QuotaExhaustedError as e:
+            return self._cached_result(key) or {'error': str(e)}
         except Exception as e:
             logging.error(f"Error obteniendo info del aeropuerto: {e}")
             return {'error': str(e)}
@@ -220,59 +375,101 @@ class AviationStackConnector:
     def get_flights_summary(self, iata_code: str = "NLU") -> Dict[str, Any]:
         """
         Obtiene resumen de vuelos reales usando AviationStack API
+        
+        Salidas y llegadas se consultan en paralelo; cada página se agrega al
+        llegar (hasta `max_pages` páginas de `page_size` vuelos por dirección).
+        Costo: 2 × páginas requests de la cuota mensual por resumen. Las
+        páginas se recortan a lo que el libro de cuotas permite gastar ahora;
+        si no alcanza ni para una por dirección (o el API falla) se regresa
+        el último resumen guardado y, si no hay, datos simulados.
         """
+        key = f"flights_summary:{iata_code}"
+        pages = min(self.max_pages, self.quota.available_calls(AVIATIONSTACK_QUOTA_API) // 2)
+        if pages < 1:
+            return self._cached_result(key) or self._get_simulated_flights_data()
+        
         try:
             # Intentar obtener vuelos reales
-            departures = self.get_real_flights(iata_code, flight_type='departure')
-            arrivals = self.get_real_flights(iata_code, flight_type='arrival')
+            departures_future = _aviationstack_executor.submit(self._aggregate_flights, iata_code, 'departure', pages)
+            arrivals_future = _aviationstack_executor.submit(self._aggregate_flights, iata_code, 'arrival', pages)
+            departures = departures_future.result()
+            arrivals = arrivals_future.result()
             
             if departures.get('success') and arrivals.get('success'):
                 # Combinar datos reales
-                total_departures = len(departures.get('flights', []))
-                total_arrivals = len(arrivals.get('flights', []))
-                
-                # Extraer destinos y aerolíneas
-                all_flights = departures.get('flights', []) + arrivals.get('flights', [])
-                destinos = set()
-                aerolineas = set()
-                
-                for flight in all_flights:
-                    # Extraer destinos según el tipo de vuelo
-                    arrival_iata = flight.get('arrival', {}).get('iata')
-                    departure_iata = flight.get('departure', {}).get('iata')
-                    
-                    if arrival_iata and arrival_iata != iata_code:
-                        destinos.add(arrival_iata)
-                    if departure_iata and departure_iata != iata_code:
-                        destinos.add(departure_iata)
-                    
-                    # Extraer aerolíneas
-                    airline_name = flight.get('airline', {}).get('name')
-                    if airline_name:
-                        aerolineas.add(airline_name)
+                destinos = departures['destinos'] + arrivals['destinos']
+                aerolineas = departures['aerolineas'] + arrivals['aerolineas']
                 
-                return {
-                    'total_operaciones_dia': total_departures + total_arrivals,
-                    'salidas_reales': total_departures,
-                    'llegadas_reales': total_arrivals,
-                    'principales_destinos': list(destinos)[:5],
-                    'aerolineas_activas': list(aerolineas)[:5],
+                summary = {
+                    'total_operaciones_dia': departures['total'] + arrivals['total'],
+                    'salidas_reales': departures['total'],
+                    'llegadas_reales': arrivals['total'],
+                    'principales_destinos': [iata for iata, _ in destinos.most_common(5)],
+                    'aerolineas_activas': [name for name, _ in aerolineas.most_common(5)],
+                    'conteo_completo': departures['completo'] and arrivals['completo'],
                     'fuente': 'AviationStack API - Datos Reales',
                     'precision': 'REAL',
                     'timestamp': datetime.now().isoformat()
                 }
+                self.quota.save_result(AVIATIONSTACK_QUOTA_API, key, summary)
+                return summary
             else:
-                # Fallback a datos simulados mejorados
-                return self._get_simulated_flights_data()
+                # Último resumen real guardado; si no hay, datos simulados
+                return self._cached_result(key) or self._get_simulated_flights_data()
             
         except Exception as e:
             logging.error(f"Error obteniendo vuelos: {e}")
-            return self._get_simulated_flights_data()
+            return self._cached_result(key) or self._get_simulated_flights_data()
+    
+    def _aggregate_flights(self, iata_code: str, flight_type: str, pages: int = None) -> Dict[str, Any]:
+        """
+        Recorre las páginas de vuelos de una dirección agregando cada una al
+        llegar, sin acumular los vuelos
+        
+        Args:
+            pages: Máximo de páginas (default: `max_pages`); si la cuota se
+                agota a media paginación se regresa el conteo parcial
+        
+        Returns:
+            {'success', 'total', 'destinos': Counter, 'aerolineas': Counter,
+            'completo': si se leyeron todas las páginas}
+        """
+        destinos, aerolineas = Counter(), Counter()
+        total = 0
+        offset = 0
+        
+        for _ in range(self.max_pages if pages is None else pages):
+            page = self.get_real_flights(iata_code, flight_type, limit=self.page_size, offset=offset)
+            if not page.get('success'):
+                # Una página intermedia fallida deja el conteo parcial
+                if offset == 0:
+                    return page
+                break
+            
+            flights = page['flights']
+            frame = from_aviationstack(flights)
+            
+            # Destinos según el tipo de vuelo (el otro extremo del vuelo)
+            for column in ('destination', 'origin'):
+                codes = frame[column].dropna()
+                destinos.update(codes[codes != iata_code])
+            
+            # Aerolíneas
+            aerolineas.update(frame['airline'].dropna())
+            
+            total += len(flights)
+            offset += len(flights)
+            if not flights or offset >= page.get('total_available', offset):
+                return {'success': True, 'total': total, 'destinos': destinos, 'aerolineas': aerolineas, 'completo': True}
+        
+        return {'success': True, 'total': total, 'destinos': destinos, 'aerolineas': aerolineas, 'completo': False}
     
-    def get_real_flights(self, iata_code: str = "NLU", flight_type: str = "departure", limit: int = 20) -> Dict[str, Any]:
+    def get_real_flights(self, iata_code: str = "NLU", flight_type: str = "departure", limit: int = 20,
+                         offset: int = 0) -> Dict[str, Any]:
         """
         Obtiene vuelos reales del aeropuerto usando AviationStack
         flight_type: 'departure' o 'arrival'
+        offset: Desplazamiento para paginar (ver `pagination.total` en la respuesta)
         """
         try:
             url = f"{self.base_url}/flights"
@@ -290,17 +487,21 @@ class AviationStackConnector:
                     'arr_iata': iata_code,
                     'limit': limit
                 }
+            if offset:
+                params['offset'] = offset
             
-            response = requests.get(url, params=params, timeout=self.timeout)
+            response = self._get(url, params=params)
             
             if response.status_code == 200:
                 data = response.json()
-                flights = data.get('data', [])
+                flights = data.get('data') or []
                 
                 return {
                     'success': True,
                     'flights': flights,
                     'total_found': len(flights),
+                    'total_available': data.get('pagination', {}).get('total', len(flights)),
+                    'offset': offset,
                     'flight_type': flight_type,
                     'timestamp': datetime.now().isoformat()
                 }
@@ -310,7 +511,13 @@ class AviationStackConnector:
                     'error_code': response.status_code,
                     'error_msg': response.text[:200]
                 }
-                
+        
+        except QuotaExhaustedError as e:
+            return {
+                'success': False,
+                'cuota_agotada': True,
+                'error': str(e)
+            }
         except Exception as e:
             return {
                 'success': False,
@@ -371,6 +578,13 @@ class AviationStackConnector:
         """
         Prueba la conexión con la API
         """
+        if self._quota_exhausted():
+            return self._cached_result('test_connection') or {
+                'status': 'LIMITADO_POR_CUOTA',
+                'api_activa': False,
+                'cuota': self.quota_status()
+            }
+        
         try:
             url = f"{self.base_url}/airports"
             params = {
@@ -378,17 +592,19 @@ class AviationStackConnector:
                 'limit': 1
             }
             
-            response = requests.get(url, params=params, timeout=5)
+            response = self._get(url, params=params, timeout=PROBE_TIMEOUT)
             
             if response.status_code == 200:
                 data = response.json()
-                return {
+                status = {
                     'status': 'CONECTADO',
                     'api_activa': True,
-                    'requests_disponibles': 'Plan gratuito: 1,000/mes',
+                    'requests_disponibles': f"Plan gratuito: {self.quota.quotas[AVIATIONSTACK_QUOTA_API]['limit']:,}/mes",
                     'total_aeropuertos': data.get('pagination', {}).get('total', 'N/A'),
                     'timestamp': datetime.now().isoformat()
                 }
+                self.quota.save_result(AVIATIONSTACK_QUOTA_API, 'test_connection', status)
+                return status
             else:
                 return {
                     'status': 'ERROR',
@@ -396,7 +612,13 @@ class AviationStackConnector:
                     'error_code': response.status_code,
                     'error_msg': response.text
                 }
-                
+        
+        except QuotaExhaustedError:
+            return self._cached_result('test_connection') or {
+                'status': 'LIMITADO_POR_CUOTA',
+                'api_activa': False,
+                'cuota': self.quota_status()
+            }
         except Exception as e:
             return {
                 'status': 'ERROR_CONEXION',
@@ -407,6 +629,9 @@ class AviationStackConnector:
 class FlightAwareConnector:
     """
     Integración con FlightAware AeroAPI para datos de aeropuerto y delays
+    
+    Si el plan no incluye /delays, los delays se calculan con el índice de
+    vuelos del proceso (`flightaware_connector.FlightDelayIndex`).
     """
     
     def __init__(self, api_key: str = None):
@@ -416,7 +641,8 @@ class FlightAwareConnector:
             "x-apikey": self.api_key,
             "Accept": "application/json; charset=UTF-8"
         }
-        self.timeout = 10
+        self.http = get_http_transport()
+        self.flights = AeroAPIFlightsConnector(self.api_key)
         
     def get_airport_info(self, airport_code: str = "NLU") -> Dict[str, Any]:
         """
@@ -425,7 +651,7 @@ class FlightAwareConnector:
         try:
             url = f"{self.base_url}/airports/{airport_code}"
             
-            response = requests.get(url, headers=self.headers, timeout=self.timeout)
+            response = self.http.get(url, headers=self.headers)
             
             if response.status_code == 200:
                 data = response.json()
@@ -460,11 +686,20 @@ class FlightAwareConnector:
     def get_delay_statistics(self, airport_code: str = "NLU") -> Dict[str, Any]:
         """
         Obtiene estadísticas de delays del aeropuerto
+        
+        Un 4xx de /delays se recuerda DELAYS_ENDPOINT_RETRY_S y mientras tanto
+        se usa solo el índice de vuelos, que consulta AeroAPI a lo más una vez
+        por MIN_POLL_INTERVAL_S.
         """
         try:
+            # /delays fuera del plan (4xx recordado): sin volver a probarlo
+            error = delays_endpoint_error(airport_code)
+            if error:
+                return self._delays_from_flight_index(airport_code) or error
+            
             url = f"{self.base_url}/airports/{airport_code}/delays"
             
-            response = requests.get(url, headers=self.headers, timeout=self.timeout)
+            response = self.http.get(url, headers=self.headers)
             
             if response.status_code == 200:
                 data = response.json()
@@ -492,11 +727,8 @@ class FlightAwareConnector:
                     'timestamp': datetime.now().isoformat()
                 }
             else:
-                return {
-                    'success': False,
-                    'error_code': response.status_code,
-                    'error_msg': response.text[:200]
-                }
+                error = remember_delays_endpoint_error(airport_code, response.status_code, response.text)
+                return self._delays_from_flight_index(airport_code) or error
                 
         except Exception as e:
             return {
@@ -504,6 +736,31 @@ class FlightAwareConnector:
                 'error': str(e)
             }
     
+    def _delays_from_flight_index(self, airport_code: str) -> Optional[Dict[str, Any]]:
+        """
+        Delays calculados con el índice de vuelos, en el formato de
+        `get_delay_statistics`; None si el índice no tiene vuelos reales
+        """
+        result = self.flights.calculate_delays_from_flights(airport_code)
+        if not result.get('success') or not result.get('total_flights_analyzed'):
+            return None
+        stats = result['delay_stats']
+        on_time = stats['on_time_percentage']
+        color = 'green' if on_time >= 90 else 'yellow' if on_time >= 80 else 'orange' if on_time >= 70 else 'red'
+        return {
+            'success': True,
+            'delay_seconds': round(stats['average_delay_minutes'] * 60),
+            'delay_minutes': stats['average_delay_minutes'],
+            'status_color': color,
+            'on_time_percentage': on_time,
+            'category': 'calculada',
+            'reasons': [],
+            'total_flights_analyzed': result['total_flights_analyzed'],
+            'stale': result.get('stale', False),
+            'fuente': 'FlightAware AeroAPI - vuelos del aeropuerto',
+            'timestamp': datetime.now().isoformat()
+        }
+    
     def test_connection(self) -> Dict[str, Any]:
         """
         Prueba la conexión con FlightAware
@@ -512,7 +769,7 @@ class FlightAwareConnector:
             url = f"{self.base_url}/airports"
             params = {'max_pages': 1}
             
-            response = requests.get(url, headers=self.headers, params=params, timeout=5)
+            response = self.http.get(url, headers=self.headers, params=params, timeout=PROBE_TIMEOUT)
             
             if response.status_code == 200:
                 data = response.json()
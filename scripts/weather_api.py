@@ -8,6 +8,7 @@ import json
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 import time
+from http_transport import get_http_transport
 
 class WeatherAPI:
     """Cliente para OpenWeatherMap API"""
@@ -16,6 +17,7 @@ class WeatherAPI:
         self.api_key = api_key
         self.base_url = "https://api.openweathermap.org/data/2.5"
         self.geo_url = "http://api.openweathermap.org/geo/1.0"
+        self.http = get_http_transport()
         
         # Coordenadas de aeropuertos principales mexicanos
         self.airports = {
@@ -55,7 +57,7 @@ class WeatherAPI:
                 'lang': 'es'
             }
             
-            response = requests.get(url, params=params, timeout=10)
+            response = self.http.get(url, params=params)
             response.raise_for_status()
             
             data = response.json()
@@ -122,7 +124,7 @@ class WeatherAPI:
                 'lang': 'es'
             }
             
-            response = requests.get(url, params=params, timeout=10)
+            response = self.http.get(url, params=params)
             response.raise_for_status()
             
             data = response.json()
@@ -3,11 +3,11 @@ Weather Manager - Sistema integrado de datos meteorológicos
 Combina datos reales de OpenWeatherMap con simulación de respaldo
 """
 
-import requests
 import json
 from datetime import datetime
 from typing import Dict, List, Optional, Union
 from weather_simulator import WeatherSimulator
+from http_transport import PROBE_TIMEOUT, get_http_transport
 
 class WeatherManager:
     """
@@ -23,6 +23,7 @@ class WeatherManager:
         self.base_url_v25 = "https://api.openweathermap.org/data/2.5"
         self.base_url_v3 = "https://api.openweathermap.org/data/3.0"
         self.simulator = WeatherSimulator()
+        self.http = get_http_transport()
         self.use_real_data = False
         
         # Verificar si el token es válido
@@ -40,7 +41,7 @@ class WeatherManager:
                 'units': 'metric'
             }
             
-            response = requests.get(test_url, params=test_params, timeout=5)
+            response = self.http.get(test_url, params=test_params, timeout=PROBE_TIMEOUT)
             
             if response.status_code == 200:
                 self.use_real_data = True
@@ -57,7 +58,7 @@ class WeatherManager:
                     'units': 'metric'
                 }
                 
-                response = requests.get(test_url, params=test_params, timeout=5)
+                response = self.http.get(test_url, params=test_params, timeout=PROBE_TIMEOUT)
                 if response.status_code == 200:
                     self.use_real_data = True
                     self.api_version = "2.5_basic"
@@ -133,7 +134,7 @@ class WeatherManager:
             'lang': 'es'
         }
         
-        response = requests.get(url, params=params, timeout=10)
+        response = self.http.get(url, params=params)
         response.raise_for_status()
         data = response.json()
         
@@ -191,7 +192,7 @@ class WeatherManager:
             'lang': 'es'
         }
         
-        response = requests.get(url, params=params, timeout=10)
+        response = self.http.get(url, params=params)
         response.raise_for_status()
         data = response.json()
         
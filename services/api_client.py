@@ -5,14 +5,22 @@ Maneja autenticación, rate limiting, caché y errores
 
 import asyncio
 import aiohttp
+import logging
 import time
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple, AsyncIterator, Iterable, Union
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 import json
 import hashlib
+import threading
+from collections import OrderedDict
 
-from config.api_config import get_api_config, CACHE_CONFIG
+from config.api_config import get_api_config, build_cache_ttl_table, CACHE_CONFIG, ENDPOINT_RATE_LIMITS
+from services.metrics import RequestTrace, get_metrics_registry
+from services.resilience import RetryPolicy, CircuitBreaker, parse_retry_after
+from services.http_pool import ConnectionPool, get_connection_pool
+from services.cache_backends import CacheBackend, create_shared_backend, serialize_payload, deserialize_payload
+from services.quota_ledger import get_quota_ledger
 
 @dataclass
 class APIResponse:
@@ -22,90 +30,538 @@ class APIResponse:
     error: Optional[str] = None
     cached: bool = False
     timestamp: datetime = None
+    stale: bool = False  # dato expirado servido mientras se revalida
     
     def __post_init__(self):
         if self.timestamp is None:
             self.timestamp = datetime.now()
 
+@dataclass
+class RequestSpec:
+    """Descripción de un request para `APIClient.request_many`"""
+    api_name: str
+    endpoint: str
+    method: str = 'GET'
+    params: Optional[Dict] = None
+    headers: Optional[Dict] = None
+    use_cache: bool = True
+
+class QuotaExceededError(Exception):
+    """Se agotó la cuota diaria/mensual de una API"""
+    
+    def __init__(self, api_name: str, quota: int, period: str):
+        super().__init__(f"Cuota de {api_name} agotada: {quota} requests por {period}")
+        self.api_name = api_name
+        self.quota = quota
+        self.period = period
+
+_ledger_lock = threading.Lock()
+_ledger = None
+
+def _quota_ledger():
+    """
+    Libro de cuotas del proceso (services/quota_ledger.py), compartido con los
+    conectores síncronos; None si no se pudo abrir
+    """
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            try:
+                _ledger = get_quota_ledger()
+            except Exception as e:
+                logging.warning(f"Libro de cuotas no disponible, se usa el contador en memoria: {e}")
+                _ledger = False
+        return _ledger or None
+
+def _record_ledger_call(api_name: str) -> Optional[Tuple[bool, int, int]]:
+    """
+    Registra una llamada en el libro de cuotas (I/O de SQLite: se ejecuta en
+    el executor, fuera del event loop)
+
+    Returns:
+        (autorizada, límite, usadas), o None si la API no está en el libro
+    """
+    ledger = _quota_ledger()
+    if ledger is None or api_name not in ledger.quotas:
+        return None
+    allowed = ledger.try_record(api_name, paced=False)
+    return allowed, ledger.quotas[api_name]['limit'], ledger.status(api_name)['usadas']
+
+class TokenBucket:
+    """
+    Token bucket con reservas (GCRA): cada request consume un token y, si el
+    balance queda negativo, el llamador espera lo que tarda en reponerse.
+    Operaciones O(1).
+    """
+    
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+    
+    def __init__(self, rate_per_minute: float, burst: int = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(burst or max(int(rate_per_minute), 1))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+    
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def wait_time(self, now: float) -> float:
+        """Segundos hasta que haya un token libre, sin consumirlo"""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+    
+    def reserve(self, now: float) -> float:
+        """Consume un token y retorna los segundos a esperar para usarlo"""
+        self._refill(now)
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
 class RateLimiter:
-    """Control de rate limiting por API"""
+    """
+    Control de rate limiting por API
+    
+    Un token bucket por API (con ráfaga configurable), sub-límites opcionales
+    por endpoint y cuota diaria/mensual. La configuración se toma de
+    APIConfig/ENDPOINT_RATE_LIMITS la primera vez que se usa cada API.
+    """
     
     def __init__(self):
-        self._requests = {}
-        self._windows = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._endpoint_buckets: Dict[tuple, TokenBucket] = {}
+        self._endpoint_limits: Dict[str, Dict[str, int]] = {}
+        self._quotas: Dict[str, Dict[str, Any]] = {}
+        self._waited: Dict[str, float] = {}
+        # Sección crítica sin awaits: un lock de hilo también cubre el caso de
+        # un limiter compartido entre event loops de distintas sesiones
+        self._lock = threading.RLock()
     
-    async def wait_if_needed(self, api_name: str, limit: int = 100):
-        """Espera si es necesario para respetar rate limits"""
-        now = time.time()
-        window_start = now - 60  # ventana de 1 minuto
+    def configure(
+        self,
+        api_name: str,
+        rate_per_minute: int,
+        burst: int = None,
+        quota: int = None,
+        quota_period: str = 'month',
+        endpoint_limits: Dict[str, int] = None
+    ):
+        """Configura (o reconfigura) los límites de una API"""
+        with self._lock:
+            self._buckets[api_name] = TokenBucket(rate_per_minute, burst)
+            self._endpoint_limits[api_name] = dict(endpoint_limits or {})
+            for key in [k for k in self._endpoint_buckets if k[0] == api_name]:
+                del self._endpoint_buckets[key]
+            if quota:
+                self._quotas[api_name] = {'limit': quota, 'period': quota_period, 'key': None, 'used': 0}
+            else:
+                self._quotas.pop(api_name, None)
+    
+    def _ensure_configured(self, api_name: str, limit: int):
+        if api_name in self._buckets:
+            return
+        config = get_api_config(api_name)
+        if config:
+            self.configure(
+                api_name,
+                limit,
+                burst=config.burst,
+                quota=config.quota,
+                quota_period=config.quota_period,
+                endpoint_limits=ENDPOINT_RATE_LIMITS.get(api_name)
+            )
+        else:
+            self.configure(api_name, limit)
+    
+    @staticmethod
+    def _period_key(period: str) -> str:
+        now = datetime.now()
+        return now.strftime('%Y-%m-%d') if period == 'day' else now.strftime('%Y-%m')
+    
+    async def _consume_ledger_quota(self, api_name: str) -> bool:
+        """
+        Gasta la llamada del libro de cuotas compartido (cliente async y
+        conectores síncronos gastan del mismo presupuesto mensual)
+
+        Returns:
+            False si la API no está en el libro (se usa el contador en memoria)
+        """
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(None, _record_ledger_call, api_name)
+        if result is None:
+            return False
+        allowed, limit, used = result
+        with self._lock:
+            quota = self._quotas.get(api_name)
+            if quota is not None:
+                quota['limit'] = limit
+                quota['used'] = used
+        if not allowed:
+            raise QuotaExceededError(api_name, limit, 'month')
+        return True
+    
+    def _consume_quota(self, api_name: str):
+        quota = self._quotas.get(api_name)
+        if quota is None:
+            return
+        period_key = self._period_key(quota['period'])
+        if quota['key'] != period_key:
+            quota['key'] = period_key
+            quota['used'] = 0
+        if quota['used'] >= quota['limit']:
+            raise QuotaExceededError(api_name, quota['limit'], quota['period'])
+        quota['used'] += 1
+    
+    async def wait_if_needed(self, api_name: str, limit: int = 100, endpoint: str = None) -> float:
+        """
+        Espera si es necesario para respetar rate limits
         
-        if api_name not in self._requests:
-            self._requests[api_name] = []
+        Returns:
+            Segundos esperados
         
-        # Limpiar requests antiguos
-        self._requests[api_name] = [
-            req_time for req_time in self._requests[api_name] 
-            if req_time > window_start
-        ]
+        Raises:
+            QuotaExceededError si la cuota del periodo está agotada
+        """
+        with self._lock:
+            self._ensure_configured(api_name, limit)
+            quota = self._quotas.get(api_name)
+            monthly = quota is not None and quota['period'] == 'month'
+        
+        # El libro de cuotas escribe en SQLite: se espera fuera del lock
+        in_ledger = monthly and await self._consume_ledger_quota(api_name)
         
-        # Verificar si necesitamos esperar
-        if len(self._requests[api_name]) >= limit:
-            wait_time = self._requests[api_name][0] - window_start
+        with self._lock:
+            if not in_ledger:
+                self._consume_quota(api_name)
+            
+            now = time.monotonic()
+            wait_time = self._buckets[api_name].reserve(now)
+            
+            endpoint_limit = self._endpoint_limits[api_name].get(endpoint) if endpoint else None
+            if endpoint_limit:
+                bucket_key = (api_name, endpoint)
+                bucket = self._endpoint_buckets.get(bucket_key)
+                if bucket is None:
+                    bucket = self._endpoint_buckets[bucket_key] = TokenBucket(endpoint_limit)
+                wait_time = max(wait_time, bucket.reserve(now))
+            
             if wait_time > 0:
-                await asyncio.sleep(wait_time)
+                self._waited[api_name] = self._waited.get(api_name, 0.0) + wait_time
         
-        # Registrar nueva request
-        self._requests[api_name].append(now)
+        if wait_time > 0:
+            await asyncio.sleep(wait_time)
+        return wait_time
+    
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Tokens disponibles, espera acumulada y uso de cuota por API"""
+        with self._lock:
+            now = time.monotonic()
+            result = {}
+            for api_name, bucket in self._buckets.items():
+                bucket._refill(now)
+                quota = self._quotas.get(api_name)
+                result[api_name] = {
+                    'tokens_available': round(max(bucket.tokens, 0.0), 2),
+                    'capacity': bucket.capacity,
+                    'total_wait_seconds': round(self._waited.get(api_name, 0.0), 3),
+                    'quota_limit': quota['limit'] if quota else None,
+                    'quota_used': quota['used'] if quota else None,
+                    'quota_period': quota['period'] if quota else None
+                }
+            return result
 
 class APICache:
-    """Caché simple en memoria para responses"""
+    """
+    Caché LRU en memoria con TTL y límite de tamaño
+
+    Acota tanto el número de entradas como los bytes totales de payload.
+    Las entradas expiradas se purgan en un barrido amortizado (cada
+    `sweep_interval` segundos durante `set`) además de al leerlas.
+    Con `stale_grace` > 0 las entradas se conservan ese tiempo extra tras
+    expirar para servirlas como stale (stale-while-revalidate).
+    """
     
-    def __init__(self):
-        self._cache = {}
-        self._timestamps = {}
+    def __init__(
+        self,
+        max_entries: int = None,
+        max_bytes: int = None,
+        default_ttl: int = 300,
+        sweep_interval: float = None,
+        stale_grace: int = None
+    ):
+        self.max_entries = max_entries or CACHE_CONFIG.get('max_entries', 1024)
+        self.max_bytes = max_bytes or CACHE_CONFIG.get('max_bytes', 32 * 1024 * 1024)
+        self.default_ttl = default_ttl
+        self.sweep_interval = sweep_interval or CACHE_CONFIG.get('sweep_interval', 60)
+        self.stale_grace = stale_grace if stale_grace is not None else CACHE_CONFIG.get('stale_grace', 0)
+        
+        # key -> (data, guardado_en, ttl, bytes); el orden refleja el uso (LRU al inicio)
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self._total_bytes = 0
+        self._last_sweep = time.monotonic()
+        self._lock = threading.RLock()
+        
+        self._stats = {
+            'hits': 0,
+            'stale_hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0
+        }
     
     def _get_cache_key(self, endpoint: str, params: Dict = None) -> str:
         """Genera key única para caché"""
         key_data = f"{endpoint}:{json.dumps(params, sort_keys=True) if params else ''}"
         return hashlib.md5(key_data.encode()).hexdigest()
     
-    def get(self, endpoint: str, params: Dict = None, ttl: int = 300) -> Optional[Any]:
+    @staticmethod
+    def _estimate_size(data: Any) -> int:
+        """Estima el tamaño en bytes del payload serializado"""
+        try:
+            return len(json.dumps(data, separators=(',', ':'), default=str).encode())
+        except (TypeError, ValueError):
+            return len(repr(data).encode())
+    
+    def _remove(self, cache_key: str):
+        """Elimina una entrada y actualiza el conteo de bytes"""
+        entry = self._cache.pop(cache_key, None)
+        if entry is not None:
+            self._total_bytes -= entry[3]
+    
+    def get(self, endpoint: str, params: Dict = None, ttl: int = None) -> Optional[Any]:
         """Obtiene valor del caché si está vigente"""
-        cache_key = self._get_cache_key(endpoint, params)
+        entry = self.lookup(endpoint, params, ttl)
+        return entry[0] if entry else None
+    
+    def lookup(
+        self,
+        endpoint: str,
+        params: Dict = None,
+        ttl: int = None,
+        stale_grace: int = 0
+    ) -> Optional[Tuple[Any, bool]]:
+        """
+        Como `get`, pero dentro de `stale_grace` segundos tras expirar
+        retorna el dato marcado como stale
         
-        if cache_key in self._cache:
-            timestamp = self._timestamps.get(cache_key)
-            if timestamp and (datetime.now() - timestamp).seconds < ttl:
-                return self._cache[cache_key]
-            else:
-                # Expiró, limpiar
-                del self._cache[cache_key]
-                if cache_key in self._timestamps:
-                    del self._timestamps[cache_key]
+        Returns:
+            Tupla (data, stale) o None si no hay dato utilizable
+        """
+        cache_key = self._get_cache_key(endpoint, params)
         
-        return None
+        with self._lock:
+            entry = self._cache.get(cache_key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            
+            data, stored_at, entry_ttl, _ = entry
+            effective_ttl = entry_ttl if ttl is None else min(ttl, entry_ttl)
+            age = time.monotonic() - stored_at
+            
+            if age < effective_ttl:
+                self._cache.move_to_end(cache_key)
+                self._stats['hits'] += 1
+                return data, False
+            
+            if age < effective_ttl + stale_grace:
+                self._cache.move_to_end(cache_key)
+                self._stats['stale_hits'] += 1
+                return data, True
+            
+            # Expiró fuera de la ventana de gracia, limpiar
+            if age >= entry_ttl + self.stale_grace:
+                self._remove(cache_key)
+                self._stats['expirations'] += 1
+            self._stats['misses'] += 1
+            return None
     
-    def set(self, endpoint: str, data: Any, params: Dict = None):
+    def set(self, endpoint: str, data: Any, params: Dict = None, ttl: int = None, size: int = None):
         """Guarda valor en caché"""
         cache_key = self._get_cache_key(endpoint, params)
-        self._cache[cache_key] = data
-        self._timestamps[cache_key] = datetime.now()
+        size = size if size is not None else self._estimate_size(data)
+        
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_sweep >= self.sweep_interval:
+                self._sweep(now)
+            
+            # Payloads mayores al límite total no se cachean
+            if size > self.max_bytes:
+                self._remove(cache_key)
+                return
+            
+            self._remove(cache_key)
+            self._cache[cache_key] = (data, now, ttl or self.default_ttl, size)
+            self._total_bytes += size
+            
+            # Desalojo LRU hasta respetar ambos límites
+            while len(self._cache) > self.max_entries or self._total_bytes > self.max_bytes:
+                lru_key = next(iter(self._cache))
+                self._remove(lru_key)
+                self._stats['evictions'] += 1
+    
+    def _sweep(self, now: float = None):
+        """Purga todas las entradas cuyo TTL propio ya expiró"""
+        now = now if now is not None else time.monotonic()
+        expired = [
+            key for key, (_, stored_at, entry_ttl, _) in self._cache.items()
+            if now - stored_at >= entry_ttl + self.stale_grace
+        ]
+        for key in expired:
+            self._remove(key)
+        self._stats['expirations'] += len(expired)
+        self._last_sweep = now
+    
+    def purge_expired(self) -> int:
+        """Fuerza un barrido de entradas expiradas; retorna cuántas se eliminaron"""
+        with self._lock:
+            before = len(self._cache)
+            self._sweep()
+            return before - len(self._cache)
+    
+    def clear(self):
+        """Vacía el caché sin reiniciar los contadores"""
+        with self._lock:
+            self._cache.clear()
+            self._total_bytes = 0
+    
+    def __len__(self) -> int:
+        return len(self._cache)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Retorna contadores de hit/miss/desalojo y uso actual"""
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                **self._stats,
+                'hit_rate': round(self._stats['hits'] / lookups, 4) if lookups else 0.0,
+                'entries': len(self._cache),
+                'bytes': self._total_bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes
+            }
 
 class APIClient:
-    """Cliente unificado para todas las APIs"""
+    """
+    Cliente unificado para todas las APIs
     
-    def __init__(self):
+    Caché en dos niveles: L1 en memoria del proceso (`cache`) y L2
+    compartido entre procesos (`shared_cache`, Redis o SQLite según
+    CACHE_CONFIG['shared_backend']).
+    
+    Con `connection_pool` las conexiones HTTP salen del pool compartido del
+    proceso en lugar de una sesión propia.
+    """
+    
+    def __init__(
+        self,
+        shared_cache: Optional[CacheBackend] = None,
+        stale_grace: int = None,
+        connection_pool: Optional[ConnectionPool] = None
+    ):
         self.rate_limiter = RateLimiter()
-        self.cache = APICache()
+        self.cache = APICache(stale_grace=stale_grace)
+        self._owns_shared_cache = shared_cache is None
+        self.shared_cache = shared_cache if shared_cache is not None else create_shared_backend()
         self.session = None
+        self.connection_pool = connection_pool
+        
+        # Tabla de TTL resuelta una sola vez: api -> categoría -> endpoint
+        self._ttl_table = build_cache_ttl_table()
+        self._default_ttl = CACHE_CONFIG.get('default_ttl', 300)
+        
+        # Requests GET en curso (single-flight) y sus contadores
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._coalescing_stats = {'leaders': 0, 'coalesced': 0}
+        
+        # Revalidaciones en segundo plano (stale-while-revalidate)
+        self._revalidating: Dict[str, asyncio.Task] = {}
+        
+        # Política de reintentos y circuit breaker por API
+        self._retry_policies: Dict[str, RetryPolicy] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        
+        # Latencia, tamaño, status y caché por API/endpoint (registro del
+        # proceso, compartido con el transporte HTTP de los conectores)
+        self.metrics_registry = get_metrics_registry()
     
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession()
+        if self.connection_pool is None:
+            self.session = aiohttp.ClientSession()
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+    
+    async def close(self):
+        """Libera la sesión propia y el caché L2 (el pool compartido no se cierra aquí)"""
+        for task in list(self._revalidating.values()):
+            task.cancel()
         if self.session:
             await self.session.close()
+            self.session = None
+        if self.shared_cache is not None and self._owns_shared_cache:
+            self.shared_cache.close()
+            self.shared_cache = None
+    
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Sesión HTTP a usar: la del pool compartido o la propia del cliente"""
+        if self.connection_pool is not None:
+            return await self.connection_pool.get_session()
+        if self.session is None:
+            self.session = aiohttp.ClientSession()
+        return self.session
+    
+    def resolve_ttl(self, api_name: str, endpoint: str) -> int:
+        """TTL efectivo para un endpoint (override por endpoint o TTL de la categoría)"""
+        policy = self._ttl_table.get(api_name)
+        if policy is None:
+            return self._default_ttl
+        return policy['endpoints'].get(endpoint, policy['default_ttl'])
+    
+    def cache_policy(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Política de caché efectiva por API
+        
+        Returns:
+            Dict api_name -> categoría, TTL por defecto y TTL por endpoint
+        """
+        return {
+            api_name: {
+                'category': policy['category'],
+                'default_ttl': policy['default_ttl'],
+                'endpoints': dict(policy['endpoints'])
+            }
+            for api_name, policy in self._ttl_table.items()
+        }
+    
+    async def _get_shared(self, cache_name: str, params: Optional[Dict], ttl: int) -> Optional[Any]:
+        """Busca en el caché L2 y, si hay dato vigente, lo promueve a L1"""
+        cache_key = self.cache._get_cache_key(cache_name, params)
+        blob = await asyncio.to_thread(self.shared_cache.get, cache_key)
+        if blob is None:
+            return None
+        
+        try:
+            data, stored_at = deserialize_payload(blob)
+        except Exception:
+            return None
+        
+        remaining = ttl - (time.time() - stored_at)
+        if remaining <= 0:
+            return None
+        
+        self.cache.set(cache_name, data, params, ttl=remaining)
+        return data
+    
+    async def _set_shared(self, cache_name: str, data: Any, params: Optional[Dict], ttl: int):
+        """Publica una respuesta en el caché L2 (serialización fuera del event loop)"""
+        cache_key = self.cache._get_cache_key(cache_name, params)
+        
+        def _store():
+            self.shared_cache.set(cache_key, serialize_payload(data), ttl)
+        
+        await asyncio.to_thread(_store)
     
     async def request(
         self, 
@@ -130,6 +586,153 @@ class APIClient:
         Returns:
             APIResponse con resultado
         """
+        if method != 'GET':
+            return await self._execute_request(api_name, endpoint, method, params, headers, use_cache)
+        
+        # Single-flight: requests GET idénticos concurrentes comparten un solo fetch
+        flight_key = self.cache._get_cache_key(f"{api_name}:{endpoint}:{int(use_cache)}", params)
+        loop = asyncio.get_running_loop()
+        task = self._inflight.get(flight_key)
+        
+        if task is not None and task.get_loop() is loop:
+            self._coalescing_stats['coalesced'] += 1
+        else:
+            task = loop.create_task(
+                self._execute_request(api_name, endpoint, method, params, headers, use_cache)
+            )
+            self._inflight[flight_key] = task
+            self._coalescing_stats['leaders'] += 1
+            task.add_done_callback(lambda t, key=flight_key: self._release_inflight(key, t))
+        
+        # shield: cancelar a un llamador no cancela el fetch compartido
+        return await asyncio.shield(task)
+    
+    @staticmethod
+    def _as_spec(spec: Union[RequestSpec, Dict]) -> RequestSpec:
+        return spec if isinstance(spec, RequestSpec) else RequestSpec(**spec)
+    
+    async def request_many(
+        self,
+        specs: Iterable[Union[RequestSpec, Dict]],
+        concurrency: int = 8
+    ) -> List[APIResponse]:
+        """
+        Ejecuta varios requests concurrentemente (máximo `concurrency` a la vez)
+        
+        Cada request pasa por caché, single-flight y rate limiter igual que
+        `request`. Un refresco completo tarda lo que la fuente más lenta.
+        
+        Args:
+            specs: RequestSpec o dicts con los argumentos de `request`
+            concurrency: Requests simultáneos máximos
+        
+        Returns:
+            Lista de APIResponse en el mismo orden que `specs`
+        """
+        specs = [self._as_spec(spec) for spec in specs]
+        results: List[Optional[APIResponse]] = [None] * len(specs)
+        async for index, response in self.iter_many(specs, concurrency):
+            results[index] = response
+        return results
+    
+    async def iter_many(
+        self,
+        specs: Iterable[Union[RequestSpec, Dict]],
+        concurrency: int = 8
+    ) -> AsyncIterator[Tuple[int, APIResponse]]:
+        """
+        Como `request_many`, pero produce (índice, APIResponse) conforme
+        terminan los requests
+        """
+        specs = [self._as_spec(spec) for spec in specs]
+        semaphore = asyncio.Semaphore(max(concurrency, 1))
+        
+        async def _run(index: int, spec: RequestSpec) -> Tuple[int, APIResponse]:
+            async with semaphore:
+                response = await self.request(
+                    api_name=spec.api_name,
+                    endpoint=spec.endpoint,
+                    method=spec.method,
+                    params=spec.params,
+                    headers=spec.headers,
+                    use_cache=spec.use_cache
+                )
+            return index, response
+        
+        tasks = [asyncio.ensure_future(_run(i, spec)) for i, spec in enumerate(specs)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Si el consumidor abandona la iteración, no dejar requests huérfanos
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+    
+    def _release_inflight(self, flight_key: str, task: "asyncio.Task"):
+        """Quita el fetch terminado del registro de requests en curso"""
+        if self._inflight.get(flight_key) is task:
+            del self._inflight[flight_key]
+    
+    def coalescing_stats(self) -> Dict[str, int]:
+        """Contadores de deduplicación de requests en curso"""
+        return {
+            **self._coalescing_stats,
+            'inflight': len(self._inflight)
+        }
+    
+    def _schedule_revalidation(self, api_name: str, endpoint: str, params: Optional[Dict], headers: Optional[Dict]):
+        """Lanza (una sola vez por key) el refresco en segundo plano de una entrada stale"""
+        revalidation_key = self.cache._get_cache_key(f"{api_name}:{endpoint}", params)
+        if revalidation_key in self._revalidating:
+            return
+        
+        task = asyncio.get_running_loop().create_task(
+            self._execute_request(api_name, endpoint, 'GET', params, headers, True, read_cache=False)
+        )
+        self._revalidating[revalidation_key] = task
+        task.add_done_callback(lambda t, key=revalidation_key: self._revalidating.pop(key, None))
+    
+    async def _execute_request(
+        self,
+        api_name: str,
+        endpoint: str,
+        method: str,
+        params: Optional[Dict],
+        headers: Optional[Dict],
+        use_cache: bool,
+        read_cache: bool = True
+    ) -> APIResponse:
+        """
+        Ejecuta el request (caché, rate limit y HTTP) sin deduplicación
+        
+        `read_cache=False` salta la lectura de caché pero guarda el resultado;
+        lo usan las revalidaciones en segundo plano.
+        """
+        trace = RequestTrace()
+        started = time.perf_counter()
+        response = await self._perform_request(
+            api_name, endpoint, method, params, headers, use_cache, read_cache, trace
+        )
+        self.metrics_registry.record(
+            api_name, endpoint, trace,
+            latency_ms=(time.perf_counter() - started) * 1000,
+            success=response.success
+        )
+        return response
+    
+    async def _perform_request(
+        self,
+        api_name: str,
+        endpoint: str,
+        method: str,
+        params: Optional[Dict],
+        headers: Optional[Dict],
+        use_cache: bool,
+        read_cache: bool,
+        trace: RequestTrace
+    ) -> APIResponse:
+        """Cuerpo de `_execute_request`; anota en `trace` lo que ocurre"""
         try:
             # Obtener configuración de API
             config = get_api_config(api_name)
@@ -141,62 +744,135 @@ class APIClient:
                 )
             
             # Verificar caché primero
-            if use_cache and method == 'GET':
-                cached_data = self.cache.get(
+            cache_params = params
+            cache_ttl = self.resolve_ttl(api_name, endpoint)
+            if use_cache and method == 'GET' and read_cache:
+                entry = self.cache.lookup(
                     f"{api_name}:{endpoint}", 
-                    params,
-                    CACHE_CONFIG['cache_ttl'].get(api_name, 300)
+                    cache_params,
+                    cache_ttl,
+                    self.cache.stale_grace
                 )
-                if cached_data:
+                # L2 puede tener un dato fresco que otro proceso ya revalidó
+                if (entry is None or entry[1]) and self.shared_cache is not None:
+                    shared_data = await self._get_shared(
+                        f"{api_name}:{endpoint}", cache_params, cache_ttl
+                    )
+                    if shared_data is not None:
+                        entry = (shared_data, False)
+                        trace.cache = 'l2_hit'
+                if entry is not None:
+                    cached_data, stale = entry
+                    if trace.cache != 'l2_hit':
+                        trace.cache = 'stale' if stale else 'hit'
+                    if stale:
+                        self._schedule_revalidation(api_name, endpoint, params, headers)
                     return APIResponse(
                         success=True,
                         data=cached_data,
-                        cached=True
+                        cached=True,
+                        stale=stale
                     )
-            
-            # Rate limiting
-            await self.rate_limiter.wait_if_needed(api_name, config.rate_limit)
+                trace.cache = 'miss'
             
             # Preparar request
             url = f"{config.base_url}{endpoint}"
-            request_headers = headers or {}
+            request_headers = dict(headers or {})
             
             # Agregar autenticación
             if config.requires_auth and config.api_key:
                 if api_name == 'aviationstack':
-                    params = params or {}
+                    # Copia para no alterar la key de caché ni el dict del llamador
+                    params = dict(params or {})
                     params['access_key'] = config.api_key
                 elif api_name in ['openai', 'claude']:
                     request_headers['Authorization'] = f"Bearer {config.api_key}"
                 elif api_name == 'amadeus':
                     request_headers['Authorization'] = f"Bearer {config.api_key}"
             
-            # Ejecutar request
-            async with self.session.request(
-                method=method,
-                url=url,
-                params=params,
-                headers=request_headers
-            ) as response:
+            policy = self._get_retry_policy(api_name)
+            breaker = self._get_breaker(api_name)
+            attempt = 0
+            
+            while True:
+                # Circuit breaker: un upstream caído falla rápido sin timeout
+                breaker.before_request()
                 
-                if response.status == 200:
-                    data = await response.json()
-                    
-                    # Guardar en caché
-                    if use_cache and method == 'GET':
-                        self.cache.set(f"{api_name}:{endpoint}", data, params)
-                    
-                    return APIResponse(
-                        success=True,
-                        data=data
-                    )
-                else:
-                    error_text = await response.text()
-                    return APIResponse(
+                # Rate limiting
+                trace.rate_limit_wait += await self.rate_limiter.wait_if_needed(
+                    api_name, config.rate_limit, endpoint
+                )
+                
+                trace.attempts += 1
+                retry_after = None
+                try:
+                    # Ejecutar request
+                    session = await self._get_session()
+                    async with session.request(
+                        method=method,
+                        url=url,
+                        params=params,
+                        headers=request_headers
+                    ) as response:
+                        trace.status = response.status
+                        
+                        if response.status == 200:
+                            data = await response.json()
+                            body = await response.read()
+                            trace.size_bytes = len(body)
+                            breaker.record_success()
+                            
+                            # Guardar en caché
+                            if use_cache and method == 'GET':
+                                self.cache.set(
+                                    f"{api_name}:{endpoint}", data, cache_params,
+                                    ttl=cache_ttl, size=len(body)
+                                )
+                                if self.shared_cache is not None:
+                                    await self._set_shared(
+                                        f"{api_name}:{endpoint}", data, cache_params, cache_ttl
+                                    )
+                            
+                            return APIResponse(
+                                success=True,
+                                data=data
+                            )
+                        
+                        error_text = await response.text()
+                        result = APIResponse(
+                            success=False,
+                            data=None,
+                            error=f"HTTP {response.status}: {error_text}"
+                        )
+                        retryable = policy.is_retryable_status(response.status)
+                        if retryable:
+                            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                
+                except aiohttp.ContentTypeError as e:
+                    # El upstream respondió, pero no con JSON: reintentar no ayuda
+                    breaker.record_success()
+                    return APIResponse(success=False, data=None, error=str(e))
+                
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    result = APIResponse(
                         success=False,
                         data=None,
-                        error=f"HTTP {response.status}: {error_text}"
+                        error=str(e) or type(e).__name__
                     )
+                    retryable = True
+                
+                if not retryable:
+                    # Errores como 401/404 no indican que el upstream esté caído
+                    breaker.record_success()
+                    return result
+                
+                breaker.record_failure()
+                delay = policy.backoff(attempt, retry_after) if attempt < policy.max_retries else None
+                if delay is None:
+                    return result
+                
+                attempt += 1
+                await asyncio.sleep(delay)
         
         except Exception as e:
             return APIResponse(
@@ -204,6 +880,48 @@ class APIClient:
                 data=None,
                 error=str(e)
             )
+    
+    def _get_retry_policy(self, api_name: str) -> RetryPolicy:
+        policy = self._retry_policies.get(api_name)
+        if policy is None:
+            policy = self._retry_policies[api_name] = RetryPolicy.for_api(api_name)
+        return policy
+    
+    def _get_breaker(self, api_name: str) -> CircuitBreaker:
+        breaker = self._breakers.get(api_name)
+        if breaker is None:
+            policy = self._get_retry_policy(api_name)
+            breaker = self._breakers.setdefault(
+                api_name,
+                CircuitBreaker(api_name, policy.failure_threshold, policy.recovery_timeout)
+            )
+        return breaker
+    
+    def circuit_status(self) -> Dict[str, Dict[str, Any]]:
+        """Estado del circuit breaker de cada API usada"""
+        return {api_name: breaker.stats() for api_name, breaker in self._breakers.items()}
+    
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Snapshot de instrumentación del cliente
+        
+        Returns:
+            Dict con métricas por endpoint, caché L1/L2, rate limiter,
+            single-flight y circuit breakers
+        """
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'endpoints': self.metrics_registry.snapshot(),
+            'cache': self.cache.stats(),
+            'shared_cache': self.shared_cache.stats() if self.shared_cache is not None else None,
+            'rate_limiter': self.rate_limiter.stats(),
+            'coalescing': self.coalescing_stats(),
+            'circuits': self.circuit_status()
+        }
+    
+    def prometheus_metrics(self) -> str:
+        """Métricas por endpoint en formato de texto de Prometheus"""
+        return self.metrics_registry.to_prometheus()
 
 class AviationDataService:
     """Servicio específico para datos de aviación"""
@@ -333,25 +1051,44 @@ class AIService:
 
 # Factory para crear servicios
 class APIServiceFactory:
-    """Factory para crear servicios de API"""
+    """
+    Factory para crear servicios de API
+    
+    Todos los servicios comparten un único APIClient del proceso: mismo pool
+    de conexiones keep-alive, rate limiter y caché.
+    """
+    
+    _shared_client: Optional[APIClient] = None
+    _lock = threading.Lock()
+    
+    @classmethod
+    def get_shared_client(cls) -> APIClient:
+        """APIClient compartido del proceso (se crea la primera vez)"""
+        with cls._lock:
+            if cls._shared_client is None:
+                cls._shared_client = APIClient(connection_pool=get_connection_pool())
+            return cls._shared_client
     
     @staticmethod
     async def create_aviation_service() -> AviationDataService:
-        client = APIClient()
-        await client.__aenter__()
-        return AviationDataService(client)
+        return AviationDataService(APIServiceFactory.get_shared_client())
     
     @staticmethod
     async def create_pricing_service() -> PricingService:
-        client = APIClient()
-        await client.__aenter__()
-        return PricingService(client)
+        return PricingService(APIServiceFactory.get_shared_client())
     
     @staticmethod
     async def create_ai_service() -> AIService:
-        client = APIClient()
-        await client.__aenter__()
-        return AIService(client)
+        return AIService(APIServiceFactory.get_shared_client())
+    
+    @classmethod
+    async def shutdown(cls):
+        """Cierra la sesión del loop actual y libera el cliente compartido"""
+        with cls._lock:
+            client, cls._shared_client = cls._shared_client, None
+        if client is not None:
+            await client.close()
+        await get_connection_pool().close()
 
 # Ejemplo de uso
 async def example_usage():
@@ -0,0 +1,261 @@
+"""
+Backends de caché compartido (L2) para el cliente de APIs de AIFA Demo
+Permite que varios procesos de Streamlit reutilicen las mismas respuestas
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, Optional, Tuple
+
+from config.api_config import CACHE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# Prefijo de formato del payload serializado
+_RAW_JSON = b'j'
+_ZLIB_JSON = b'z'
+
+# Payloads menores a este tamaño no compensan la compresión
+_COMPRESS_THRESHOLD = 512
+
+
+def serialize_payload(data: Any, stored_at: float = None) -> bytes:
+    """
+    Serializa un payload como JSON compacto, comprimido con zlib si conviene
+
+    Args:
+        data: Payload JSON-serializable
+        stored_at: Epoch en que se obtuvo el dato (por defecto ahora)
+
+    Returns:
+        Bytes con prefijo de formato de 1 byte
+    """
+    envelope = {'t': stored_at if stored_at is not None else time.time(), 'd': data}
+    raw = json.dumps(envelope, separators=(',', ':'), ensure_ascii=False, default=str).encode('utf-8')
+    if len(raw) < _COMPRESS_THRESHOLD:
+        return _RAW_JSON + raw
+    return _ZLIB_JSON + zlib.compress(raw, 6)
+
+
+def deserialize_payload(blob: bytes) -> Tuple[Any, float]:
+    """
+    Inverso de `serialize_payload`
+
+    Returns:
+        Tupla (data, stored_at)
+    """
+    prefix, body = blob[:1], blob[1:]
+    if prefix == _ZLIB_JSON:
+        body = zlib.decompress(body)
+    elif prefix != _RAW_JSON:
+        raise ValueError(f"Formato de payload desconocido: {prefix!r}")
+    envelope = json.loads(body.decode('utf-8'))
+    return envelope['d'], envelope['t']
+
+
+class CacheBackend:
+    """
+    Interfaz mínima de un caché compartido de bytes con TTL
+
+    Las implementaciones nunca deben propagar errores de conexión: un fallo
+    del backend se trata como miss para no tumbar el dashboard.
+    """
+
+    name = 'base'
+
+    def __init__(self):
+        self._stats = {'hits': 0, 'misses': 0, 'sets': 0, 'errors': 0}
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, ttl: int):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def close(self):
+        """Libera conexiones del backend"""
+
+    def stats(self) -> Dict[str, Any]:
+        return {'backend': self.name, **self._stats}
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Backend L2 sobre cualquier servidor que hable el protocolo Redis
+
+    Tras un error de conexión el backend se suspende `retry_after` segundos
+    para que un Redis caído no le cueste un timeout a cada request.
+    """
+
+    name = 'redis'
+
+    def __init__(
+        self,
+        url: str = None,
+        prefix: str = 'aifa:api:',
+        socket_timeout: float = 0.5,
+        retry_after: float = 30.0
+    ):
+        super().__init__()
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError("RedisCacheBackend requiere el paquete 'redis' (pip install redis)") from e
+
+        self.url = url or CACHE_CONFIG['redis_url']
+        self.prefix = prefix
+        self.retry_after = retry_after
+        self._suspended_until = 0.0
+        self._client = redis.Redis.from_url(
+            self.url,
+            socket_timeout=socket_timeout,
+            socket_connect_timeout=socket_timeout
+        )
+
+    def _available(self) -> bool:
+        return time.monotonic() >= self._suspended_until
+
+    def _on_error(self, op: str, error: Exception):
+        self._stats['errors'] += 1
+        self._suspended_until = time.monotonic() + self.retry_after
+        logger.warning(f"Redis L2 no disponible ({op}): {error} - suspendido {self.retry_after:.0f}s")
+
+    def get(self, key: str) -> Optional[bytes]:
+        if not self._available():
+            self._stats['misses'] += 1
+            return None
+        try:
+            value = self._client.get(self.prefix + key)
+        except Exception as e:
+            self._on_error('get', e)
+            self._stats['misses'] += 1
+            return None
+        self._stats['hits' if value is not None else 'misses'] += 1
+        return value
+
+    def set(self, key: str, value: bytes, ttl: int):
+        if not self._available():
+            return
+        try:
+            self._client.set(self.prefix + key, value, ex=max(int(ttl), 1))
+            self._stats['sets'] += 1
+        except Exception as e:
+            self._on_error('set', e)
+
+    def delete(self, key: str):
+        if not self._available():
+            return
+        try:
+            self._client.delete(self.prefix + key)
+        except Exception as e:
+            self._on_error('delete', e)
+
+    def close(self):
+        try:
+            self._client.close()
+        except Exception:
+            pass
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    Backend L2 en un archivo SQLite local
+
+    Sirve como caché compartido entre procesos del mismo host y como
+    sustituto de Redis en pruebas. Usa modo WAL para lecturas concurrentes.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path: str = None, sweep_interval: float = 300.0):
+        super().__init__()
+        self.path = path or CACHE_CONFIG['sqlite_path']
+        self.sweep_interval = sweep_interval
+        self._last_sweep = 0.0
+        self._lock = threading.Lock()
+
+        if self.path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        self._conn = sqlite3.connect(self.path, timeout=2.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS api_cache ('
+            ' key TEXT PRIMARY KEY,'
+            ' value BLOB NOT NULL,'
+            ' expires_at REAL NOT NULL)'
+        )
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    'SELECT value FROM api_cache WHERE key = ? AND expires_at > ?',
+                    (key, time.time())
+                ).fetchone()
+        except sqlite3.Error as e:
+            self._stats['errors'] += 1
+            logger.warning(f"SQLite L2 error (get): {e}")
+            row = None
+        self._stats['hits' if row else 'misses'] += 1
+        return bytes(row[0]) if row else None
+
+    def set(self, key: str, value: bytes, ttl: int):
+        now = time.time()
+        try:
+            with self._lock:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO api_cache (key, value, expires_at) VALUES (?, ?, ?)',
+                    (key, sqlite3.Binary(value), now + ttl)
+                )
+                if now - self._last_sweep >= self.sweep_interval:
+                    self._conn.execute('DELETE FROM api_cache WHERE expires_at <= ?', (now,))
+                    self._last_sweep = now
+            self._stats['sets'] += 1
+        except sqlite3.Error as e:
+            self._stats['errors'] += 1
+            logger.warning(f"SQLite L2 error (set): {e}")
+
+    def delete(self, key: str):
+        try:
+            with self._lock:
+                self._conn.execute('DELETE FROM api_cache WHERE key = ?', (key,))
+        except sqlite3.Error as e:
+            self._stats['errors'] += 1
+            logger.warning(f"SQLite L2 error (delete): {e}")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def create_shared_backend(kind: str = None) -> Optional[CacheBackend]:
+    """
+    Crea el backend L2 configurado en CACHE_CONFIG['shared_backend']
+
+    Args:
+        kind: 'redis', 'sqlite' o 'none' (por defecto el de la configuración)
+
+    Returns:
+        CacheBackend o None si no hay caché compartido
+    """
+    kind = (kind or CACHE_CONFIG.get('shared_backend', 'none')).lower()
+
+    try:
+        if kind == 'redis':
+            return RedisCacheBackend()
+        if kind == 'sqlite':
+            return SQLiteCacheBackend()
+    except Exception as e:
+        logger.warning(f"No se pudo inicializar caché compartido '{kind}': {e} - solo L1")
+
+    return None
@@ -0,0 +1,118 @@
+"""
+Pool de conexiones HTTP compartido para los servicios de AIFA Demo
+Una sola sesión aiohttp (keep-alive, caché DNS) por event loop del proceso
+"""
+
+import asyncio
+import threading
+from typing import Dict, Optional
+
+import aiohttp
+
+from config.api_config import HTTP_POOL_CONFIG
+
+
+class ConnectionPool:
+    """
+    Administra la `aiohttp.ClientSession` compartida del proceso
+
+    Una ClientSession solo puede usarse desde el event loop que la creó, así
+    que se mantiene una sesión por loop. Cada sesión tiene una tarea
+    guardiana que la cierra cuando el loop termina: `asyncio.run` cancela
+    las tareas pendientes antes de cerrar el loop, y al cancelarse la
+    guardiana cierra la sesión y su TCPConnector. El keep-alive dura lo
+    que dura el loop.
+    """
+
+    def __init__(
+        self,
+        limit: int = None,
+        limit_per_host: int = None,
+        ttl_dns_cache: int = None,
+        keepalive_timeout: float = None,
+        connect_timeout: float = None,
+        total_timeout: float = None
+    ):
+        self.limit = limit or HTTP_POOL_CONFIG['limit']
+        self.limit_per_host = limit_per_host or HTTP_POOL_CONFIG['limit_per_host']
+        self.ttl_dns_cache = ttl_dns_cache or HTTP_POOL_CONFIG['ttl_dns_cache']
+        self.keepalive_timeout = keepalive_timeout or HTTP_POOL_CONFIG['keepalive_timeout']
+        self.connect_timeout = connect_timeout or HTTP_POOL_CONFIG['connect_timeout']
+        self.total_timeout = total_timeout or HTTP_POOL_CONFIG['total_timeout']
+
+        self._sessions: Dict[asyncio.AbstractEventLoop, aiohttp.ClientSession] = {}
+        self._guards: Dict[asyncio.AbstractEventLoop, asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self.sessions_created = 0
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            ttl_dns_cache=self.ttl_dns_cache,
+            use_dns_cache=True,
+            keepalive_timeout=self.keepalive_timeout
+        )
+        timeout = aiohttp.ClientTimeout(total=self.total_timeout, connect=self.connect_timeout)
+        self.sessions_created += 1
+        return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Sesión compartida del event loop actual (se crea la primera vez)"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            # Loops cerrados sin cancelar sus tareas (run_until_complete manual)
+            for stale_loop in [l for l in self._sessions if l.is_closed()]:
+                del self._sessions[stale_loop]
+                self._guards.pop(stale_loop, None)
+
+            session = self._sessions.get(loop)
+            if session is None or session.closed:
+                session = self._sessions[loop] = self._create_session()
+                self._guards[loop] = loop.create_task(self._close_on_loop_shutdown(loop, session))
+            return session
+
+    async def _close_on_loop_shutdown(self, loop: asyncio.AbstractEventLoop, session: aiohttp.ClientSession):
+        """Espera hasta que el loop cancele sus tareas y entonces cierra la sesión"""
+        try:
+            await loop.create_future()
+        finally:
+            with self._lock:
+                if self._sessions.get(loop) is session:
+                    del self._sessions[loop]
+                    self._guards.pop(loop, None)
+            if not session.closed:
+                await session.close()
+
+    async def close(self):
+        """Cierra la sesión del event loop actual"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            session = self._sessions.pop(loop, None)
+            guard = self._guards.pop(loop, None)
+        if guard is not None and guard is not asyncio.current_task():
+            guard.cancel()
+        if session is not None and not session.closed:
+            await session.close()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'active_sessions': sum(1 for s in self._sessions.values() if not s.closed),
+                'sessions_created': self.sessions_created,
+                'limit': self.limit,
+                'limit_per_host': self.limit_per_host
+            }
+
+
+_default_pool: Optional[ConnectionPool] = None
+_default_pool_lock = threading.Lock()
+
+
+def get_connection_pool() -> ConnectionPool:
+    """Pool de conexiones único del proceso"""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = ConnectionPool()
+        return _default_pool
@@ -0,0 +1,215 @@
+"""
+Instrumentación de requests del cliente de APIs de AIFA Demo
+Latencia, tamaño, status HTTP, caché y espera de rate limit por API/endpoint;
+un registro por proceso compartido por APIClient y el transporte HTTP
+síncrono de los conectores (scripts/http_transport.py)
+"""
+
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+# Límites superiores de los buckets de los histogramas
+LATENCY_BUCKETS_MS = (10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+SIZE_BUCKETS_BYTES = (1024, 10 * 1024, 100 * 1024, 512 * 1024, 1024 * 1024, 5 * 1024 * 1024)
+
+CACHE_OUTCOMES = ('hit', 'stale', 'l2_hit', 'miss', 'bypass')
+
+# Resultados servidos desde caché (sin respuesta HTTP propia)
+CACHE_SERVED = ('hit', 'stale', 'l2_hit')
+
+
+@dataclass
+class RequestTrace:
+    """Datos de un request que `APIClient` va llenando mientras lo ejecuta"""
+    cache: str = 'bypass'          # uno de CACHE_OUTCOMES
+    status: Optional[int] = None   # status HTTP del último intento
+    size_bytes: int = 0
+    rate_limit_wait: float = 0.0   # segundos
+    attempts: int = 0
+
+
+class Histogram:
+    """Histograma de buckets fijos (acumulado estilo Prometheus al exportar)"""
+
+    __slots__ = ('bounds', 'counts', 'total', 'count', 'max')
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # último = +Inf
+        self.total = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        index = len(self.bounds)
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.total += value
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Estimación del cuantil `q` (límite superior de su bucket, acotado al máximo)"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        running = 0
+        for i, bucket_count in enumerate(self.counts):
+            running += bucket_count
+            if running >= target:
+                return min(float(self.bounds[i]), self.max) if i < len(self.bounds) else self.max
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'sum': round(self.total, 3),
+            'avg': round(self.total / self.count, 3) if self.count else 0.0,
+            'p50': self.quantile(0.50),
+            'p95': self.quantile(0.95),
+            'max': round(self.max, 3),
+            'buckets': dict(zip([str(b) for b in self.bounds] + ['+Inf'], self.counts))
+        }
+
+
+class EndpointMetrics:
+    """Acumulados de un par (api_name, endpoint)"""
+
+    __slots__ = ('requests', 'errors', 'retries', 'status_codes', 'cache', 'latency_ms', 'size_bytes', 'rate_limit_wait')
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.status_codes: Dict[str, int] = {}
+        self.cache = dict.fromkeys(CACHE_OUTCOMES, 0)
+        self.latency_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.size_bytes = Histogram(SIZE_BUCKETS_BYTES)
+        self.rate_limit_wait = 0.0
+
+
+class MetricsRegistry:
+    """Registro de métricas por API y endpoint, seguro entre hilos"""
+
+    def __init__(self, namespace: str = 'aifa_api'):
+        self.namespace = namespace
+        self._endpoints: Dict[Tuple[str, str], EndpointMetrics] = {}
+        self._lock = threading.Lock()
+
+    def record(self, api_name: str, endpoint: str, trace: RequestTrace, latency_ms: float, success: bool):
+        """Registra el resultado de un request"""
+        with self._lock:
+            metrics = self._endpoints.get((api_name, endpoint))
+            if metrics is None:
+                metrics = self._endpoints[(api_name, endpoint)] = EndpointMetrics()
+
+            metrics.requests += 1
+            if not success:
+                metrics.errors += 1
+            metrics.retries += max(trace.attempts - 1, 0)
+            if trace.status is not None:
+                status_key = str(trace.status)
+            else:
+                # Sin status HTTP: o se sirvió de caché, o el request no llegó a
+                # tener respuesta (error de conexión, cuota, circuito abierto)
+                status_key = 'cache' if success and trace.cache in CACHE_SERVED else 'error'
+            metrics.status_codes[status_key] = metrics.status_codes.get(status_key, 0) + 1
+            metrics.cache[trace.cache] = metrics.cache.get(trace.cache, 0) + 1
+            metrics.latency_ms.observe(latency_ms)
+            if trace.size_bytes:
+                metrics.size_bytes.observe(trace.size_bytes)
+            metrics.rate_limit_wait += trace.rate_limit_wait
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Copia de las métricas, con llave 'api_name:endpoint'"""
+        with self._lock:
+            return {
+                f"{api_name}:{endpoint}": {
+                    'api_name': api_name,
+                    'endpoint': endpoint,
+                    'requests': m.requests,
+                    'errors': m.errors,
+                    'retries': m.retries,
+                    'status_codes': dict(m.status_codes),
+                    'cache': dict(m.cache),
+                    'latency_ms': m.latency_ms.snapshot(),
+                    'size_bytes': m.size_bytes.snapshot(),
+                    'rate_limit_wait_s': round(m.rate_limit_wait, 3)
+                }
+                for (api_name, endpoint), m in self._endpoints.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+    def to_prometheus(self) -> str:
+        """Exporta las métricas en formato de texto de Prometheus"""
+        ns = self.namespace
+        lines = []
+
+        def _labels(api_name: str, endpoint: str, **extra) -> str:
+            pairs = {'api': api_name, 'endpoint': endpoint, **extra}
+            return ','.join(f'{k}="{_escape(v)}"' for k, v in pairs.items())
+
+        def _histogram(name: str, help_text: str, attr: str):
+            lines.append(f"# HELP {ns}_{name} {help_text}")
+            lines.append(f"# TYPE {ns}_{name} histogram")
+            for (api_name, endpoint), m in self._endpoints.items():
+                hist = getattr(m, attr)
+                cumulative = 0
+                for bound, bucket_count in zip(list(hist.bounds) + ['+Inf'], hist.counts):
+                    cumulative += bucket_count
+                    lines.append(f"{ns}_{name}_bucket{{{_labels(api_name, endpoint, le=bound)}}} {cumulative}")
+                lines.append(f"{ns}_{name}_sum{{{_labels(api_name, endpoint)}}} {hist.total}")
+                lines.append(f"{ns}_{name}_count{{{_labels(api_name, endpoint)}}} {hist.count}")
+
+        with self._lock:
+            lines.append(f"# HELP {ns}_requests_total Requests por API, endpoint y status")
+            lines.append(f"# TYPE {ns}_requests_total counter")
+            for (api_name, endpoint), m in self._endpoints.items():
+                for status, count in m.status_codes.items():
+                    lines.append(f"{ns}_requests_total{{{_labels(api_name, endpoint, status=status)}}} {count}")
+
+            lines.append(f"# HELP {ns}_cache_total Resultado de caché por request")
+            lines.append(f"# TYPE {ns}_cache_total counter")
+            for (api_name, endpoint), m in self._endpoints.items():
+                for outcome, count in m.cache.items():
+                    lines.append(f"{ns}_cache_total{{{_labels(api_name, endpoint, result=outcome)}}} {count}")
+
+            lines.append(f"# HELP {ns}_retries_total Reintentos por transitorios")
+            lines.append(f"# TYPE {ns}_retries_total counter")
+            for (api_name, endpoint), m in self._endpoints.items():
+                lines.append(f"{ns}_retries_total{{{_labels(api_name, endpoint)}}} {m.retries}")
+
+            lines.append(f"# HELP {ns}_rate_limit_wait_seconds_total Espera acumulada por rate limit")
+            lines.append(f"# TYPE {ns}_rate_limit_wait_seconds_total counter")
+            for (api_name, endpoint), m in self._endpoints.items():
+                lines.append(f"{ns}_rate_limit_wait_seconds_total{{{_labels(api_name, endpoint)}}} {m.rate_limit_wait}")
+
+            _histogram('latency_ms', 'Latencia por request en milisegundos', 'latency_ms')
+            _histogram('response_bytes', 'Tamaño de respuesta en bytes', 'size_bytes')
+
+        return '\n'.join(lines) + '\n'
+
+
+_process_registry: Optional[MetricsRegistry] = None
+_process_registry_lock = threading.Lock()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """Registro de métricas único del proceso"""
+    global _process_registry
+    with _process_registry_lock:
+        if _process_registry is None:
+            _process_registry = MetricsRegistry()
+        return _process_registry
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
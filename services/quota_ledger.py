@@ -0,0 +1,272 @@
+"""
+Libro de cuotas de APIs externas para AIFA
+Cuenta las llamadas por API en SQLite (compartido entre procesos y
+reinicios), reparte el presupuesto restante sobre el resto del periodo de
+facturación y guarda el último resultado para servirlo sin gastar cuota
+"""
+
+import calendar
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Any, Optional, Tuple
+
+from config.api_config import get_all_api_configs
+
+DEFAULT_LEDGER_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'api_quota.sqlite')
+
+# Ráfaga por API: llamadas que un refresco puede gastar seguidas
+REFRESH_BURST: Dict[str, int] = {
+    'aviationstack': 4
+}
+
+
+def _quotas_from_config() -> Dict[str, Dict[str, int]]:
+    """Cuotas mensuales declaradas en config/api_config.py (única fuente del límite)"""
+    return {
+        name: {
+            'limit': config.quota,
+            'billing_day': config.quota_reset_day,
+            'burst': REFRESH_BURST.get(name, 1)
+        }
+        for name, config in get_all_api_configs().items()
+        if config.quota and config.quota_period == 'month'
+    }
+
+
+# Presupuesto mensual por API: requests por periodo, día de corte y ráfaga
+API_QUOTAS: Dict[str, Dict[str, int]] = _quotas_from_config()
+
+
+class QuotaExhaustedError(RuntimeError):
+    """El libro de cuotas no autorizó la llamada (cuota o ráfaga agotada)"""
+
+    def __init__(self, api: str):
+        super().__init__(f"Cuota de {api} agotada para este intervalo")
+        self.api = api
+
+
+def billing_period(now: datetime, billing_day: int = 1) -> Tuple[datetime, datetime]:
+    """Inicio y fin del periodo de facturación mensual que contiene `now`"""
+    def cutoff(year: int, month: int) -> datetime:
+        day = min(billing_day, calendar.monthrange(year, month)[1])
+        return datetime(year, month, day)
+
+    def shift(year: int, month: int, months: int) -> Tuple[int, int]:
+        index = year * 12 + month - 1 + months
+        return index // 12, index % 12 + 1
+
+    start = cutoff(now.year, now.month)
+    if now < start:
+        start = cutoff(*shift(now.year, now.month, -1))
+    return start, cutoff(*shift(start.year, start.month, 1))
+
+
+class QuotaLedger:
+    """
+    Cuota por API persistida en SQLite
+
+    Cada llamada registrada adelanta `next_allowed_at` en un intervalo de
+    (segundos que faltan del periodo / llamadas restantes), así que el
+    presupuesto se gasta parejo a lo largo del periodo en vez de agotarse
+    en los primeros días. Un refresco procede si queda cuota y
+    `next_allowed_at` no está más de `burst - 1` intervalos en el futuro
+    (un refresco gasta varias llamadas seguidas); si no, el conector sirve
+    el último resultado guardado.
+    """
+
+    def __init__(self, path: Optional[str] = DEFAULT_LEDGER_PATH, quotas: Dict[str, Dict[str, int]] = None):
+        self.path = os.path.abspath(path) if path and path != ':memory:' else ':memory:'
+        self.quotas = {api: dict(config) for api, config in (quotas or API_QUOTAS).items()}
+        self._lock = threading.Lock()
+
+        if self.path != ':memory:':
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self._conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS quota_usage ('
+            ' api TEXT PRIMARY KEY,'
+            ' period TEXT NOT NULL,'
+            ' used INTEGER NOT NULL,'
+            ' next_allowed_at REAL NOT NULL)'
+        )
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS quota_results ('
+            ' api TEXT NOT NULL,'
+            ' key TEXT NOT NULL,'
+            ' payload TEXT NOT NULL,'
+            ' fetched_at REAL NOT NULL,'
+            ' PRIMARY KEY (api, key))'
+        )
+
+    def _period(self, api: str, now: float) -> Tuple[str, float]:
+        """Llave del periodo actual y segundos que le faltan"""
+        start, end = billing_period(datetime.fromtimestamp(now), self.quotas[api].get('billing_day', 1))
+        return start.strftime('%Y-%m-%d'), max(end.timestamp() - now, 1.0)
+
+    def _interval(self, api: str, used: int, seconds_left: float) -> float:
+        return seconds_left / max(self.quotas[api]['limit'] - used, 1)
+
+    def _usage(self, api: str, now: float) -> Tuple[int, float]:
+        """(usadas, next_allowed_at) del periodo actual; un periodo nuevo empieza en cero"""
+        period, _ = self._period(api, now)
+        row = self._conn.execute(
+            'SELECT period, used, next_allowed_at FROM quota_usage WHERE api = ?', (api,)
+        ).fetchone()
+        if row is None or row[0] != period:
+            return 0, 0.0
+        return row[1], row[2]
+
+    def _allows(self, api: str, used: int, next_allowed_at: float, now: float,
+                seconds_left: float, calls: int = 1, paced: bool = True) -> bool:
+        """True si `calls` llamadas caben en la cuota (y, con `paced`, en la ráfaga)"""
+        if used + calls > self.quotas[api]['limit']:
+            return False
+        if not paced:
+            return True
+        tolerance = self._interval(api, used, seconds_left) * (self.quotas[api].get('burst', 1) - 1)
+        return next_allowed_at - now <= tolerance
+
+    def _record(self, api: str, calls: int, enforce: bool, paced: bool) -> bool:
+        if api not in self.quotas or calls <= 0:
+            return True
+        now = time.time()
+        period, seconds_left = self._period(api, now)
+        try:
+            with self._lock:
+                self._conn.execute('BEGIN IMMEDIATE')
+                try:
+                    used, next_allowed_at = self._usage(api, now)
+                    if enforce and not self._allows(api, used, next_allowed_at, now, seconds_left, calls, paced):
+                        self._conn.execute('ROLLBACK')
+                        return False
+                    used += calls
+                    next_allowed_at = max(next_allowed_at, now) + self._interval(api, used, seconds_left) * calls
+                    self._conn.execute(
+                        'INSERT OR REPLACE INTO quota_usage (api, period, used, next_allowed_at) VALUES (?, ?, ?, ?)',
+                        (api, period, used, next_allowed_at)
+                    )
+                    self._conn.execute('COMMIT')
+                except Exception:
+                    self._conn.execute('ROLLBACK')
+                    raise
+        except sqlite3.Error as e:
+            logging.warning(f"No se pudo registrar cuota de {api}: {e}")
+        return True
+
+    def record(self, api: str, calls: int = 1):
+        """Registra llamadas ya hechas al API y recalcula el siguiente refresco permitido"""
+        self._record(api, calls, enforce=False, paced=False)
+
+    def try_record(self, api: str, calls: int = 1, paced: bool = True) -> bool:
+        """
+        Verifica y registra llamadas en una sola transacción, antes de hacerlas
+
+        Args:
+            api: Nombre del API
+            calls: Llamadas a registrar
+            paced: Además del límite del periodo, exige que quepan en la
+                ráfaga; con False solo se verifica el límite
+
+        Returns:
+            True si se registraron (el llamador puede hacerlas)
+        """
+        return self._record(api, calls, enforce=True, paced=paced)
+
+    def can_refresh(self, api: str) -> bool:
+        """True si queda cuota y el gasto reciente cabe en la ráfaga permitida"""
+        if api not in self.quotas:
+            return True
+        now = time.time()
+        _, seconds_left = self._period(api, now)
+        try:
+            with self._lock:
+                used, next_allowed_at = self._usage(api, now)
+        except sqlite3.Error as e:
+            logging.warning(f"No se pudo leer cuota de {api}: {e}")
+            return True
+        return self._allows(api, used, next_allowed_at, now, seconds_left)
+
+    def available_calls(self, api: str) -> int:
+        """Llamadas que se pueden hacer seguidas ahora sin exceder cuota ni ráfaga"""
+        if api not in self.quotas:
+            return sys.maxsize
+        now = time.time()
+        _, seconds_left = self._period(api, now)
+        try:
+            with self._lock:
+                used, next_allowed_at = self._usage(api, now)
+        except sqlite3.Error as e:
+            logging.warning(f"No se pudo leer cuota de {api}: {e}")
+            return 0
+        interval = self._interval(api, used, seconds_left)
+        tolerance = interval * (self.quotas[api].get('burst', 1) - 1)
+        backlog = max(next_allowed_at - now, 0.0)
+        if backlog > tolerance:
+            return 0
+        paced = int((tolerance - backlog) / interval + 1e-9) + 1
+        return max(min(paced, self.quotas[api]['limit'] - used), 0)
+
+    def status(self, api: str) -> Dict[str, Any]:
+        now = time.time()
+        period, seconds_left = self._period(api, now)
+        with self._lock:
+            used, next_allowed_at = self._usage(api, now)
+        limit = self.quotas[api]['limit']
+        interval = self._interval(api, used, seconds_left)
+        next_refresh = max(next_allowed_at - interval * (self.quotas[api].get('burst', 1) - 1), now)
+        return {
+            'api': api,
+            'periodo': period,
+            'limite': limit,
+            'usadas': used,
+            'restantes': max(limit - used, 0),
+            'intervalo_minimo_s': round(interval, 1),
+            'siguiente_refresco': datetime.fromtimestamp(next_refresh).isoformat()
+        }
+
+    # Últimos resultados
+    def save_result(self, api: str, key: str, payload: Dict[str, Any]):
+        try:
+            with self._lock:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO quota_results (api, key, payload, fetched_at) VALUES (?, ?, ?, ?)',
+                    (api, key, json.dumps(payload, ensure_ascii=False, default=str), time.time())
+                )
+        except sqlite3.Error as e:
+            logging.warning(f"No se pudo guardar resultado de {api}: {e}")
+
+    def cached_result(self, api: str, key: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """Último resultado guardado y su timestamp, o None"""
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    'SELECT payload, fetched_at FROM quota_results WHERE api = ? AND key = ?', (api, key)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logging.warning(f"No se pudo leer resultado de {api}: {e}")
+            return None
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_default_ledger: Optional[QuotaLedger] = None
+_default_ledger_lock = threading.Lock()
+
+
+def get_quota_ledger() -> QuotaLedger:
+    """Libro de cuotas único del proceso"""
+    global _default_ledger
+    with _default_ledger_lock:
+        if _default_ledger is None:
+            _default_ledger = QuotaLedger()
+        return _default_ledger
@@ -0,0 +1,142 @@
+"""
+Políticas de resiliencia para el cliente de APIs de AIFA Demo
+Reintentos con backoff exponencial + jitter y circuit breaker por API
+"""
+
+import random
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, FrozenSet, Optional
+
+from config.api_config import RESILIENCE_CONFIG
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Política de reintentos y de circuit breaker de una API"""
+    max_retries: int = 2
+    base_delay: float = 0.5         # segundos
+    max_delay: float = 8.0          # tope del backoff y del Retry-After aceptado
+    retry_statuses: FrozenSet[int] = frozenset({429, 500, 502, 503, 504})
+    failure_threshold: int = 5      # fallos consecutivos para abrir el circuito
+    recovery_timeout: float = 60.0  # segundos abierto antes de probar de nuevo
+
+    @classmethod
+    def for_api(cls, api_name: str) -> 'RetryPolicy':
+        """Política de RESILIENCE_CONFIG ('default' + overrides de la API)"""
+        settings = {**RESILIENCE_CONFIG.get('default', {}), **RESILIENCE_CONFIG.get(api_name, {})}
+        if 'retry_statuses' in settings:
+            settings['retry_statuses'] = frozenset(settings['retry_statuses'])
+        return cls(**settings)
+
+    def is_retryable_status(self, status: int) -> bool:
+        return status in self.retry_statuses
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> Optional[float]:
+        """
+        Segundos a esperar antes del reintento `attempt` (0 = primer reintento)
+
+        Usa backoff exponencial con full jitter. Si el servidor envió
+        Retry-After se respeta, salvo que supere `max_delay`: en ese caso
+        retorna None para no bloquear el render.
+        """
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_delay else None
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Interpreta un header Retry-After (segundos o fecha HTTP)"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max((retry_at - datetime.now(retry_at.tzinfo)).total_seconds(), 0.0)
+
+
+class CircuitOpenError(Exception):
+    """El circuit breaker de la API está abierto"""
+
+    def __init__(self, api_name: str, retry_in: float):
+        super().__init__(f"Circuito abierto para {api_name}: reintento en {retry_in:.0f}s")
+        self.api_name = api_name
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker clásico: CLOSED → OPEN tras `failure_threshold` fallos
+    consecutivos; tras `recovery_timeout` pasa a HALF_OPEN y deja pasar un
+    request de prueba que lo cierra (éxito) o lo reabre (fallo).
+    """
+
+    CLOSED = 'CLOSED'
+    OPEN = 'OPEN'
+    HALF_OPEN = 'HALF_OPEN'
+
+    def __init__(self, api_name: str, failure_threshold: int = 5, recovery_timeout: float = 60.0):
+        self.api_name = api_name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_request(self):
+        """
+        Verifica si el request puede salir
+
+        Raises:
+            CircuitOpenError si el circuito está abierto
+        """
+        with self._lock:
+            if self.state == self.OPEN:
+                elapsed = time.monotonic() - self.opened_at
+                if elapsed < self.recovery_timeout:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.api_name, self.recovery_timeout - elapsed)
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+
+            if self.state == self.HALF_OPEN:
+                if self._probe_in_flight:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.api_name, 0.0)
+                self._probe_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'times_opened': self.times_opened,
+                'rejected': self.rejected
+            }
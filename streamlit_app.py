@@ -1378,6 +1378,17 @@ with tabs[7]:
         st.metric("🌍 **Conectividad internacional**", "28%", "+5% vs año anterior")
     
     st.info("**Nota**: Estos KPIs se actualizan cada 15 minutos con datos de sistemas operativos, APIs gubernamentales y fuentes externas de aviación.")
+    
+    # Telemetría del cliente de APIs compartido (latencia, caché, rate limit)
+    with st.expander("📡 TELEMETRÍA DE APIs"):
+        try:
+            from services.api_client import APIServiceFactory
+            from api_metrics_panel import render_api_metrics_panel
+            
+            api_client = APIServiceFactory.get_shared_client()
+            render_api_metrics_panel(api_client.metrics(), api_client.prometheus_metrics())
+        except ImportError as e:
+            st.caption(f"Cliente de APIs no disponible en este entorno: {e}")
 
 # Footer
 st.markdown("---")
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Prueba del caché de APIs (sin red)
+Desalojo LRU por entradas y por bytes, expiración por TTL, barrido de
+entradas vencidas, caché L2 compartido entre clientes, TTL por
+categoría/endpoint y stale-while-revalidate
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'scripts'))
+
+import asyncio
+import json
+import time
+
+from services.api_client import APICache, APIClient
+from services.cache_backends import SQLiteCacheBackend
+from services.metrics import MetricsRegistry
+from config.api_config import CACHE_CONFIG
+
+INDICADOR = '/country/MX/indicator/IS.AIR.PSGR'
+
+
+class FakeResponse:
+    def __init__(self, status, payload, delay=0.0):
+        self.status = status
+        self.payload = payload
+        self.delay = delay
+        self.headers = {}
+
+    async def __aenter__(self):
+        await asyncio.sleep(self.delay)
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def json(self):
+        return self.payload
+
+    async def read(self):
+        return json.dumps(self.payload).encode()
+
+    async def text(self):
+        return json.dumps(self.payload)
+
+
+class FakeSession:
+    """Sesión aiohttp falsa: cada request responde 200 con su número de llamada"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+
+    def request(self, method, url, params=None, headers=None):
+        self.calls.append((method, url, dict(params or {})))
+        return FakeResponse(200, {'llamada': len(self.calls)}, self.delay)
+
+    async def close(self):
+        pass
+
+
+def _client(shared_cache=None, stale_grace=None):
+    """Cliente sin red ni L2 del entorno, con registro de métricas propio"""
+    client = APIClient(shared_cache=shared_cache, stale_grace=stale_grace)
+    if shared_cache is None:
+        client.shared_cache = None
+    client.session = FakeSession()
+    client.metrics_registry = MetricsRegistry()
+    return client
+
+
+def test_desalojo_lru():
+    """Se desaloja la entrada menos usada al pasar el límite de entradas o de bytes"""
+    print("1️⃣ Desalojo LRU")
+    cache = APICache(max_entries=3, max_bytes=1000)
+    for name in ('a', 'b', 'c'):
+        cache.set(f'/{name}', {'valor': name})
+    assert cache.get('/a') == {'valor': 'a'}  # /a pasa a ser la más reciente
+    cache.set('/d', {'valor': 'd'})
+    assert cache.get('/b') is None
+    assert cache.get('/a') is not None and cache.get('/d') is not None
+
+    by_bytes = APICache(max_entries=100, max_bytes=250)
+    for i in range(3):
+        by_bytes.set('/bloque', ['x'], params={'i': i}, size=100)
+    stats = by_bytes.stats()
+    assert stats['entries'] == 2 and stats['bytes'] == 200 and stats['evictions'] == 1
+    assert by_bytes.get('/bloque', params={'i': 0}) is None
+
+    # Un payload mayor al límite total no se guarda
+    by_bytes.set('/enorme', ['x'], size=500)
+    assert by_bytes.get('/enorme') is None
+    print(f"   ✅ {cache.stats()['evictions'] + stats['evictions']} desalojos, límites respetados")
+    return True
+
+
+def test_expiracion_por_ttl():
+    """Cada entrada vence con su propio TTL; el TTL del llamador puede acortarlo"""
+    print("2️⃣ Expiración por TTL")
+    cache = APICache(max_entries=10, default_ttl=300, stale_grace=0)
+    cache.set('/corto', {'ok': True}, ttl=0.05)
+    cache.set('/largo', {'ok': True})
+    assert cache.get('/corto') == {'ok': True}
+    time.sleep(0.08)
+    assert cache.get('/corto') is None
+    assert cache.get('/largo') == {'ok': True}
+    assert cache.get('/largo', ttl=0.01) is None  # consulta con TTL menor
+
+    stats = cache.stats()
+    assert stats['expirations'] == 1
+    assert stats['hits'] == 2 and stats['misses'] == 2
+    assert stats['hit_rate'] == 0.5
+    print(f"   ✅ hit_rate={stats['hit_rate']}")
+    return True
+
+
+def test_barrido_de_expiradas():
+    """purge_expired elimina las vencidas y el barrido corre solo durante set"""
+    print("3️⃣ Barrido de expiradas")
+    cache = APICache(max_entries=10, sweep_interval=0.05, stale_grace=0)
+    for i in range(4):
+        cache.set('/vuelos', [i], params={'i': i}, ttl=0.02)
+    cache.set('/aeropuerto', {'iata': 'NLU'}, ttl=60)
+    time.sleep(0.06)
+    assert cache.purge_expired() == 4
+    assert len(cache) == 1
+
+    for i in range(3):
+        cache.set('/vuelos', [i], params={'i': i}, ttl=0.02)
+    time.sleep(0.06)
+    cache.set('/otro', [], ttl=60)  # dispara el barrido amortizado
+    assert len(cache) == 2
+    assert cache.stats()['expirations'] == 7
+    print("   ✅ Sin entradas vencidas retenidas")
+    return True
+
+
+def test_cache_l2_compartido():
+    """Un segundo cliente con L1 vacío toma del L2 lo que guardó el primero"""
+    print("4️⃣ Caché L2 compartido")
+    shared = SQLiteCacheBackend(':memory:')
+    first, second = _client(shared), _client(shared)
+
+    async def _run():
+        fetched = await first.request('world_bank', INDICADOR, params={'format': 'json'})
+        from_l2 = await second.request('world_bank', INDICADOR, params={'format': 'json'})
+        from_l1 = await second.request('world_bank', INDICADOR, params={'format': 'json'})
+        return fetched, from_l2, from_l1
+
+    fetched, from_l2, from_l1 = asyncio.run(_run())
+    assert fetched.success and not fetched.cached
+    assert from_l2.cached and from_l2.data == fetched.data == {'llamada': 1}
+    assert from_l1.cached and from_l1.data == fetched.data
+    assert len(first.session.calls) == 1 and second.session.calls == []
+
+    cache = second.metrics_registry.snapshot()[f'world_bank:{INDICADOR}']['cache']
+    assert cache['l2_hit'] == 1 and cache['hit'] == 1 and cache['miss'] == 0
+    assert shared.stats()['sets'] == 1
+    shared.close()
+    print("   ✅ 1 llamada HTTP para 2 clientes (l2_hit, luego hit en L1)")
+    return True
+
+
+def test_ttl_por_endpoint():
+    """El TTL sale del override del endpoint, luego de la categoría de la API"""
+    print("5️⃣ TTL por categoría y endpoint")
+    client = _client()
+    ttls = CACHE_CONFIG['cache_ttl']
+    assert client.resolve_ttl('flightaware', '/airports') == 86400
+    assert client.resolve_ttl('flightaware', '/flights/NLU') == ttls['flight_data']
+    assert client.resolve_ttl('aviationstack', '/routes') == 21600
+    assert client.resolve_ttl('world_bank', INDICADOR) == ttls['economic_data']
+    assert client.resolve_ttl('api_desconocida', '/x') == CACHE_CONFIG['default_ttl']
+
+    policy = client.cache_policy()
+    assert policy['openai']['category'] == 'predictions'
+    assert policy['flightaware']['endpoints'] == {'/airports': 86400}
+
+    # La respuesta se guarda en L1 con el TTL resuelto
+    asyncio.run(client.request('world_bank', INDICADOR))
+    (_, _, entry_ttl, _), = client.cache._cache.values()
+    assert entry_ttl == ttls['economic_data']
+    print(f"   ✅ /airports 86400s, world_bank {entry_ttl}s, desconocida {CACHE_CONFIG['default_ttl']}s")
+    return True
+
+
+def test_stale_while_revalidate():
+    """Un dato expirado se sirve como stale y se refresca una sola vez en segundo plano"""
+    print("6️⃣ Stale-while-revalidate")
+    client = _client(stale_grace=60)
+    client._ttl_table['world_bank']['default_ttl'] = 0.2
+
+    async def _run():
+        fresh = await client.request('world_bank', INDICADOR)
+        await asyncio.sleep(0.25)
+        client.session.delay = 0.05  # revalidación lenta: sigue en curso en la segunda lectura
+        stale = await client.request('world_bank', INDICADOR)
+        again = await client.request('world_bank', INDICADOR)
+        await asyncio.sleep(0.08)
+        refreshed = await client.request('world_bank', INDICADOR)
+        return fresh, stale, again, refreshed
+
+    fresh, stale, again, refreshed = asyncio.run(_run())
+    assert not fresh.cached and not fresh.stale
+    assert stale.stale and stale.cached and stale.data == fresh.data == {'llamada': 1}
+    assert again.stale
+    assert len(client.session.calls) == 2  # una sola revalidación para dos lecturas stale
+    assert refreshed.cached and not refreshed.stale and refreshed.data == {'llamada': 2}
+    assert client._revalidating == {}
+
+    cache = client.metrics_registry.snapshot()[f'world_bank:{INDICADOR}']['cache']
+    assert cache['stale'] == 2 and cache['hit'] == 1
+    print("   ✅ 2 respuestas stale, 1 revalidación, luego dato fresco")
+    return True
+
+
+if __name__ == "__main__":
+    print("🗄️ PRUEBA DEL CACHÉ DE APIs")
+    print("=" * 50)
+    tests = [
+        test_desalojo_lru,
+        test_expiracion_por_ttl,
+        test_barrido_de_expiradas,
+        test_cache_l2_compartido,
+        test_ttl_por_endpoint,
+        test_stale_while_revalidate
+    ]
+    passed = sum(1 for test in tests if test())
+    print("=" * 50)
+    print(f"📊 {passed}/{len(tests)} pruebas exitosas")
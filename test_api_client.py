@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Prueba del cliente de APIs (sin red)
+Deduplicación de requests GET concurrentes (single-flight), requests
+en paralelo con límite de concurrencia, reintentos, circuit breaker y
+sesión keep-alive compartida por los servicios
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'scripts'))
+
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+from services.api_client import APIClient, APIServiceFactory, RequestSpec
+from services.http_pool import ConnectionPool, get_connection_pool
+from services.metrics import MetricsRegistry
+from services.resilience import RetryPolicy, CircuitBreaker, CircuitOpenError, parse_retry_after
+
+INDICADOR = '/country/MX/indicator/IS.AIR.PSGR'
+
+
+class FakeResponse:
+    def __init__(self, session, status, payload, delay=0.0, headers=None):
+        self.session = session
+        self.status = status
+        self.payload = payload
+        self.delay = delay
+        self.headers = headers or {}
+
+    async def __aenter__(self):
+        self.session.active += 1
+        self.session.max_active = max(self.session.max_active, self.session.active)
+        await asyncio.sleep(self.delay)
+        return self
+
+    async def __aexit__(self, *exc):
+        self.session.active -= 1
+        return False
+
+    async def json(self):
+        return self.payload
+
+    async def read(self):
+        return json.dumps(self.payload).encode()
+
+    async def text(self):
+        return json.dumps(self.payload)
+
+
+class FakeSession:
+    """
+    Sesión aiohttp falsa: responde tras `delay` segundos (o `params['espera']`)
+    con los status de `script` en orden y después 200
+    """
+
+    def __init__(self, delay=0.0, script=()):
+        self.delay = delay
+        self.script = list(script)  # status o (status, headers)
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+
+    def request(self, method, url, params=None, headers=None):
+        params = dict(params or {})
+        self.calls.append((method, url, params))
+        status = self.script.pop(0) if self.script else 200
+        status, response_headers = status if isinstance(status, tuple) else (status, None)
+        payload = {'llamada': len(self.calls), 'params': params}
+        return FakeResponse(self, status, payload, params.get('espera', self.delay), response_headers)
+
+    async def close(self):
+        pass
+
+
+def _client(session):
+    """Cliente sin red ni L2 del entorno, con registro de métricas propio"""
+    client = APIClient()
+    client.shared_cache = None
+    client.session = session
+    client.metrics_registry = MetricsRegistry()
+    return client
+
+
+def test_single_flight():
+    """GETs idénticos concurrentes comparten un solo request HTTP"""
+    print("1️⃣ Single-flight")
+    session = FakeSession(delay=0.05)
+    client = _client(session)
+
+    async def _run():
+        same = [client.request('world_bank', INDICADOR, params={'format': 'json'}, use_cache=False) for _ in range(5)]
+        other = client.request('world_bank', INDICADOR, params={'format': 'xml'}, use_cache=False)
+        return await asyncio.gather(*same, other)
+
+    *same, other = asyncio.run(_run())
+    assert len(session.calls) == 2
+    assert all(response.success and response.data == same[0].data for response in same)
+    assert other.data != same[0].data
+    assert client.coalescing_stats() == {'leaders': 2, 'coalesced': 4, 'inflight': 0}
+    print(f"   ✅ 6 llamadores, {len(session.calls)} requests HTTP")
+    return True
+
+
+def test_cancelar_un_llamador():
+    """Cancelar a uno de los llamadores no cancela el fetch compartido"""
+    print("2️⃣ Cancelación de un llamador")
+    session = FakeSession(delay=0.05)
+    client = _client(session)
+
+    async def _run():
+        tasks = [asyncio.ensure_future(client.request('world_bank', INDICADOR, use_cache=False)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        tasks[0].cancel()
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    cancelled, *rest = asyncio.run(_run())
+    assert isinstance(cancelled, asyncio.CancelledError)
+    assert all(response.success for response in rest)
+    assert len(session.calls) == 1
+    print("   ✅ Los demás llamadores reciben la respuesta")
+    return True
+
+
+def test_request_many():
+    """Resultados en el orden de entrada, con `concurrency` requests a la vez"""
+    print("3️⃣ Requests en paralelo")
+    session = FakeSession()
+    client = _client(session)
+    # Los primeros tardan más: terminan en orden inverso
+    specs = [
+        RequestSpec('world_bank', INDICADOR, params={'i': i, 'espera': 0.01 * (6 - i)})
+        for i in range(5)
+    ]
+    specs.append({'api_name': 'world_bank', 'endpoint': INDICADOR, 'params': {'i': 5, 'espera': 0.0}})
+
+    ordered = asyncio.run(client.request_many(specs, concurrency=2))
+    assert [response.data['params']['i'] for response in ordered] == list(range(6))
+    assert session.max_active == 2
+
+    async def _completion_order():
+        return [index async for index, _ in client.iter_many(specs, concurrency=6)]
+
+    session.max_active = 0
+    client.cache.clear()
+    completed = asyncio.run(_completion_order())
+    assert session.max_active == 6 and len(session.calls) == 12
+    assert completed[0] == 5 and sorted(completed) == list(range(6))
+    print(f"   ✅ Orden preservado; iter_many terminó en orden {completed}")
+    return True
+
+
+def _resilient_client(script, **policy):
+    client = _client(FakeSession(script=script))
+    client._retry_policies['world_bank'] = RetryPolicy(base_delay=0.0, **policy)
+    return client
+
+
+def test_reintentos():
+    """429/5xx se reintentan (respetando Retry-After); 4xx no"""
+    print("4️⃣ Reintentos")
+    client = _resilient_client([503, 502], max_retries=2)
+    response = asyncio.run(client.request('world_bank', INDICADOR, use_cache=False))
+    assert response.success and len(client.session.calls) == 3
+    metrics = client.metrics_registry.snapshot()[f'world_bank:{INDICADOR}']
+    assert metrics['retries'] == 2 and metrics['status_codes'] == {'200': 1}
+
+    client = _resilient_client([503, 503, 503], max_retries=2)
+    response = asyncio.run(client.request('world_bank', INDICADOR, use_cache=False))
+    assert not response.success and response.error.startswith('HTTP 503')
+    assert len(client.session.calls) == 3
+
+    client = _resilient_client([404], max_retries=2)
+    response = asyncio.run(client.request('world_bank', INDICADOR, use_cache=False))
+    assert not response.success and len(client.session.calls) == 1
+    assert client.circuit_status()['world_bank']['consecutive_failures'] == 0
+
+    # Retry-After corto se respeta; uno mayor a max_delay no bloquea el render
+    client = _resilient_client([(429, {'Retry-After': '0'})], max_retries=1)
+    assert asyncio.run(client.request('world_bank', INDICADOR, use_cache=False)).success
+    client = _resilient_client([(429, {'Retry-After': '120'})], max_retries=1)
+    assert not asyncio.run(client.request('world_bank', INDICADOR, use_cache=False)).success
+    assert len(client.session.calls) == 1
+    print("   ✅ 2 reintentos hasta 200; 404 y Retry-After largo sin reintento")
+    return True
+
+
+def test_circuit_breaker():
+    """Tras `failure_threshold` fallos el circuito abre y falla rápido hasta la prueba"""
+    print("5️⃣ Circuit breaker")
+    client = _resilient_client([500, 500], max_retries=0, failure_threshold=2, recovery_timeout=0.05)
+
+    async def _run():
+        failures = [await client.request('world_bank', INDICADOR, use_cache=False) for _ in range(2)]
+        rejected = await client.request('world_bank', INDICADOR, use_cache=False)
+        opened = client.circuit_status()['world_bank']
+        await asyncio.sleep(0.06)
+        probe = await client.request('world_bank', INDICADOR, use_cache=False)
+        return failures, rejected, opened, probe
+
+    failures, rejected, opened, probe = asyncio.run(_run())
+    assert not any(response.success for response in failures)
+    assert not rejected.success and 'Circuito abierto' in rejected.error
+    assert opened['state'] == CircuitBreaker.OPEN and opened['rejected'] == 1
+    assert probe.success and len(client.session.calls) == 3
+    assert client.circuit_status()['world_bank']['state'] == CircuitBreaker.CLOSED
+
+    # En HALF_OPEN solo sale un request de prueba; si falla, reabre
+    breaker = CircuitBreaker('api_prueba', failure_threshold=1, recovery_timeout=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    breaker.before_request()
+    try:
+        breaker.before_request()
+        assert False, "segundo request en HALF_OPEN"
+    except CircuitOpenError:
+        pass
+    breaker.record_failure()
+    assert breaker.stats()['state'] == CircuitBreaker.OPEN and breaker.times_opened == 2
+    print(f"   ✅ Abierto tras 2 fallos, {opened['rejected']} rechazo sin HTTP, cerrado tras la prueba")
+    return True
+
+
+def test_retry_after():
+    """Retry-After en segundos o como fecha HTTP"""
+    print("6️⃣ Retry-After")
+    assert parse_retry_after('5') == 5.0
+    assert parse_retry_after(None) is None and parse_retry_after('pronto') is None
+    retry_at = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    assert 28 <= parse_retry_after(retry_at) <= 30
+    assert parse_retry_after(format_datetime(datetime(2000, 1, 1, tzinfo=timezone.utc), usegmt=True)) == 0.0
+    print("   ✅ Segundos y fechas HTTP")
+    return True
+
+
+def test_pool_de_conexiones():
+    """Una sesión por event loop, cerrada al terminar el loop; un cliente para todos los servicios"""
+    print("7️⃣ Pool de conexiones compartido")
+    pool = ConnectionPool(limit=20, limit_per_host=4)
+
+    async def _sessions():
+        first, second = await pool.get_session(), await pool.get_session()
+        assert first is second and not first.closed
+        assert first.connector.limit == 20 and first.connector.limit_per_host == 4
+        return first
+
+    session_a = asyncio.run(_sessions())
+    session_b = asyncio.run(_sessions())
+    assert session_a is not session_b
+    assert session_a.closed and session_b.closed  # la guardiana cierra al terminar asyncio.run
+    assert pool.stats()['sessions_created'] == 2 and pool.stats()['active_sessions'] == 0
+
+    async def _services():
+        aviation = await APIServiceFactory.create_aviation_service()
+        pricing = await APIServiceFactory.create_pricing_service()
+        ai = await APIServiceFactory.create_ai_service()
+        shared = aviation.client is pricing.client is ai.client
+        session = await aviation.client._get_session()
+        await APIServiceFactory.shutdown()
+        return shared, aviation.client, session
+
+    shared, client, session = asyncio.run(_services())
+    assert shared and client.connection_pool is get_connection_pool()
+    assert client.session is None  # sin sesión propia: usa la del pool
+    assert session.closed and APIServiceFactory._shared_client is None
+    print(f"   ✅ {pool.stats()['sessions_created']} sesiones (una por loop), 1 cliente para 3 servicios")
+    return True
+
+
+if __name__ == "__main__":
+    print("🔌 PRUEBA DEL CLIENTE DE APIs")
+    print("=" * 50)
+    tests = [
+        test_single_flight,
+        test_cancelar_un_llamador,
+        test_request_many,
+        test_reintentos,
+        test_circuit_breaker,
+        test_retry_after,
+        test_pool_de_conexiones
+    ]
+    passed = sum(1 for test in tests if test())
+    print("=" * 50)
+    print(f"📊 {passed}/{len(tests)} pruebas exitosas")
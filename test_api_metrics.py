@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Prueba de la instrumentación de APIs (sin red)
+Snapshot del registro de métricas, exportación a texto de Prometheus y
+registro de los requests del transporte HTTP de los conectores
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'scripts'))
+
+import requests
+
+from services.metrics import MetricsRegistry, RequestTrace, get_metrics_registry
+from http_transport import HTTPTransport, record_cache_hit
+
+
+def _registry():
+    registry = MetricsRegistry()
+    registry.record('world_bank', '/pais', RequestTrace(cache='miss', status=200, size_bytes=2048, attempts=1), 40, True)
+    registry.record('world_bank', '/pais', RequestTrace(cache='miss', status=503, attempts=3, rate_limit_wait=0.25), 300, False)
+    registry.record('world_bank', '/pais', RequestTrace(cache='hit'), 0.5, True)
+    registry.record('world_bank', '/pais', RequestTrace(cache='miss', attempts=1), 12, False)  # sin respuesta
+    return registry
+
+
+class FakeSession:
+    """requests.Session falsa: responde con `status` o lanza `error`"""
+
+    def __init__(self, status=200, body=b'{"data": []}', error=None):
+        self.status = status
+        self.body = body
+        self.error = error
+        self.timeouts = []
+
+    def request(self, method, url, timeout=None, **kwargs):
+        self.timeouts.append(timeout)
+        if self.error is not None:
+            raise self.error
+        response = requests.Response()
+        response.status_code = self.status
+        response._content = self.body
+        return response
+
+
+def test_snapshot():
+    """Conteos, status, caché y percentiles por API/endpoint"""
+    print("1️⃣ Snapshot del registro")
+    metrics = _registry().snapshot()['world_bank:/pais']
+    assert metrics['requests'] == 4 and metrics['errors'] == 2 and metrics['retries'] == 2
+    assert metrics['status_codes'] == {'200': 1, '503': 1, 'cache': 1, 'error': 1}
+    assert metrics['cache']['miss'] == 3 and metrics['cache']['hit'] == 1
+    assert metrics['rate_limit_wait_s'] == 0.25
+
+    latency = metrics['latency_ms']
+    assert latency['count'] == 4 and latency['max'] == 300
+    assert latency['p50'] == 50.0 and latency['p95'] == 300.0  # límite del bucket, acotado al máximo
+    assert latency['buckets']['10'] == 1 and latency['buckets']['500'] == 1
+    assert metrics['size_bytes']['count'] == 1 and metrics['size_bytes']['sum'] == 2048
+    print(f"   ✅ p50={latency['p50']} p95={latency['p95']} status={metrics['status_codes']}")
+    return True
+
+
+def test_texto_prometheus():
+    """Contadores e histogramas acumulados en formato de texto"""
+    print("2️⃣ Texto de Prometheus")
+    registry = _registry()
+    registry.record('api_prueba', '/ruta "rara"', RequestTrace(status=200), 1, True)
+    text = registry.to_prometheus()
+    lines = text.splitlines()
+
+    assert '# TYPE aifa_api_requests_total counter' in lines
+    assert 'aifa_api_requests_total{api="world_bank",endpoint="/pais",status="503"} 1' in lines
+    assert 'aifa_api_cache_total{api="world_bank",endpoint="/pais",result="hit"} 1' in lines
+    assert 'aifa_api_retries_total{api="world_bank",endpoint="/pais"} 2' in lines
+    assert 'aifa_api_rate_limit_wait_seconds_total{api="world_bank",endpoint="/pais"} 0.25' in lines
+    assert 'aifa_api_requests_total{api="api_prueba",endpoint="/ruta \\"rara\\"",status="200"} 1' in lines
+
+    buckets = [int(line.rsplit(' ', 1)[1]) for line in lines
+               if line.startswith('aifa_api_latency_ms_bucket{api="world_bank"')]
+    assert buckets == sorted(buckets) and buckets[-1] == 4
+    assert 'aifa_api_latency_ms_count{api="world_bank",endpoint="/pais"} 4' in lines
+    assert '# TYPE aifa_api_response_bytes histogram' in lines
+    assert text.endswith('\n')
+    print(f"   ✅ {len(lines)} líneas, buckets acumulados {buckets}")
+    return True
+
+
+def test_transporte_registra_requests():
+    """El transporte HTTP de los conectores registra status, bytes y errores"""
+    print("3️⃣ Métricas del transporte HTTP")
+    registry = MetricsRegistry()
+    transport = HTTPTransport(metrics_registry=registry)
+
+    transport._local.session = FakeSession(status=200)
+    transport.get('https://api.aviationstack.com/v1/flights', params={'dep_iata': 'NLU'})
+    transport._local.session = FakeSession(status=500)
+    transport.get('https://api.aviationstack.com/v1/flights')
+    transport._local.session = FakeSession(error=requests.ConnectionError('sin red'))
+    try:
+        transport.get('https://api.aviationstack.com/v1/flights')
+        assert False, "el error de conexión debe propagarse"
+    except requests.ConnectionError:
+        pass
+
+    metrics = registry.snapshot()['aviationstack:/v1/flights']
+    assert metrics['requests'] == 3 and metrics['errors'] == 2
+    assert metrics['status_codes'] == {'200': 1, '500': 1, 'error': 1}
+    assert metrics['cache']['bypass'] == 3
+    assert metrics['size_bytes']['sum'] == 2 * len(b'{"data": []}')
+    assert transport.stats()['requests_by_host'] == {'api.aviationstack.com': 3}
+
+    # Lo que un conector sirve de su caché se registra sin request
+    before = get_metrics_registry().snapshot().get('flightradar24:/zona', {}).get('requests', 0)
+    record_cache_hit('flightradar24', '/zona')
+    after = get_metrics_registry().snapshot()['flightradar24:/zona']
+    assert after['requests'] == before + 1 and after['status_codes']['cache'] >= 1
+    print(f"   ✅ {metrics['requests']} requests registrados con host → API")
+    return True
+
+
+if __name__ == "__main__":
+    print("📏 PRUEBA DE MÉTRICAS DE APIs")
+    print("=" * 50)
+    tests = [
+        test_snapshot,
+        test_texto_prometheus,
+        test_transporte_registra_requests
+    ]
+    passed = sum(1 for test in tests if test())
+    print("=" * 50)
+    print(f"📊 {passed}/{len(tests)} pruebas exitosas")
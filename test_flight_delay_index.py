@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Prueba del índice incremental de delays de FlightAware (sin red)
+Agregados por upsert, ventana, índice compartido por el proceso, datos
+stale cuando el poll falla, fallback de KPI_007 cuando no hay /delays e
+intervalo mínimo entre polls
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'scripts'))
+
+from datetime import datetime, timedelta, timezone
+
+import flightaware_connector
+from flightaware_connector import FlightDelayIndex, FlightAwareConnector
+from flight_records import from_flightaware
+from real_data_connector import FlightAwareConnector as KPIFlightAwareConnector
+
+
+def _iso(moment):
+    return moment.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def _flight(flight_id, minutes_ago, delay_minutes, direction='departures', cancelled=False):
+    event = _iso(datetime.now(timezone.utc) - timedelta(minutes=minutes_ago))
+    event_field = 'actual_off' if direction == 'departures' else 'actual_on'
+    delay_field = 'departure_delay' if direction == 'departures' else 'arrival_delay'
+    return {
+        'fa_flight_id': flight_id,
+        'ident': flight_id.split('-')[0],
+        'origin': {'code_iata': 'NLU'},
+        'destination': {'code_iata': 'CUN'},
+        event_field: event,
+        delay_field: delay_minutes * 60,
+        'cancelled': cancelled
+    }
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200):
+        self.payload = payload
+        self.status_code = status_code
+        self.text = str(payload)
+
+    def json(self):
+        return self.payload
+
+
+class FakeHTTP:
+    """AeroAPI falso: /delays no incluido en el plan; vuelos por dirección"""
+
+    def __init__(self, departures=(), arrivals=()):
+        self.flights = {'departures': list(departures), 'arrivals': list(arrivals)}
+        self.fail = False
+        self.calls = []
+
+    def get(self, url, headers=None, params=None, timeout=None):
+        self.calls.append(url)
+        if url.endswith('/delays'):
+            return FakeResponse({'title': 'Not in plan'}, status_code=404)
+        if self.fail:
+            return FakeResponse({'title': 'Server error'}, status_code=503)
+        direction = url.rsplit('/', 1)[1]
+        return FakeResponse({direction: self.flights[direction]})
+
+
+def _reset_process_index(min_poll_interval_s=0):
+    flightaware_connector._delay_indexes.clear()
+    flightaware_connector._delay_cursors.clear()
+    flightaware_connector._delay_polled_at.clear()
+    flightaware_connector._delays_endpoint_errors.clear()
+    flightaware_connector.MIN_POLL_INTERVAL_S = min_poll_interval_s
+
+
+def test_upsert_incremental():
+    """Actualizar un vuelo reemplaza su aporte; repetirlo no cambia nada"""
+    print("1️⃣ Upsert incremental")
+    index = FlightDelayIndex()
+    flights = [_flight('VIV1-1', 30, 5), _flight('VIV2-2', 40, 30), _flight('VOI3-3', 50, 0, cancelled=True)]
+    assert index.upsert(from_flightaware(flights, 'departures'), 'departures') == 3
+    assert index.upsert(from_flightaware(flights, 'departures'), 'departures') == 0
+
+    stats = index.stats()
+    assert stats['total_flights'] == 2
+    assert stats['delayed_flights'] == 1
+    assert stats['cancelled_flights'] == 1
+    assert stats['on_time_percentage'] == 50.0
+
+    # VIV2 se recupera: el agregado se corrige sin recalcular todo
+    assert index.upsert(from_flightaware([_flight('VIV2-2', 40, 10)], 'departures'), 'departures') == 1
+    stats = index.stats()
+    assert stats['delayed_flights'] == 0
+    assert stats['average_delay_minutes'] == 7.5
+    print("   ✅ Agregados correctos")
+    return True
+
+
+def test_ventana():
+    """Los vuelos fuera de la ventana restan su aporte"""
+    print("2️⃣ Ventana de vuelos")
+    index = FlightDelayIndex(window_hours=1)
+    index.upsert(from_flightaware([_flight('A-1', 30, 20, 'arrivals'), _flight('B-2', 120, 20, 'arrivals')], 'arrivals'), 'arrivals')
+    assert index.prune(datetime.now(timezone.utc)) == 1
+    assert index.stats()['total_flights'] == 1
+    print("   ✅ Vuelo viejo descartado")
+    return True
+
+
+def test_indice_compartido_y_stale():
+    """El índice es del proceso; si el poll falla se regresan sus datos stale"""
+    print("3️⃣ Índice del proceso y datos stale")
+    _reset_process_index()
+    http = FakeHTTP(departures=[_flight('VIV1-1', 30, 40)], arrivals=[_flight('VOI2-2', 20, 0, 'arrivals')])
+
+    first = FlightAwareConnector('test-key')
+    first.http = http
+    fresh = first.get_airport_delay_stats('NLU')
+    assert fresh['total_flights_analyzed'] == 2
+    assert fresh['stale'] is False
+
+    # Otro conector del proceso continúa desde el mismo cursor
+    second = FlightAwareConnector('test-key')
+    second.http = http
+    again = second.get_airport_delay_stats('NLU')
+    assert again['incremental'] is True
+    assert again['flights_changed'] == 0
+
+    http.fail = True
+    stale = second.get_airport_delay_stats('NLU')
+    assert stale['stale'] is True
+    assert stale['total_flights_analyzed'] == 2
+    assert stale['delay_stats']['on_time_percentage'] == 50.0
+    print("   ✅ Datos del índice marcados como stale")
+    return True
+
+
+def test_fallback_kpi():
+    """Sin /delays en el plan, KPI_007 usa el índice de vuelos"""
+    print("4️⃣ Fallback de get_delay_statistics")
+    _reset_process_index()
+    http = FakeHTTP(departures=[_flight('VIV1-1', 30, 40), _flight('VIV3-3', 35, 2)])
+    connector = KPIFlightAwareConnector('test-key')
+    connector.http = http
+    connector.flights.http = http
+
+    delays = connector.get_delay_statistics('NLU')
+    assert delays['success'] is True
+    assert delays['on_time_percentage'] == 50.0
+    assert delays['delay_minutes'] == 21.0
+    assert delays['status_color'] == 'red'
+
+    # Sin vuelos reales se conserva el error del endpoint
+    _reset_process_index()
+    empty = FakeHTTP()
+    connector.http = empty
+    connector.flights.http = empty
+    error = connector.get_delay_statistics('NLU')
+    assert error['success'] is False
+    assert error['error_code'] == 404
+    print("   ✅ Delays calculados desde vuelos")
+    return True
+
+
+def test_intervalo_minimo_de_poll():
+    """Renders seguidos: /delays se prueba una vez y los vuelos una vez por intervalo"""
+    print("5️⃣ Intervalo mínimo de poll")
+    _reset_process_index(min_poll_interval_s=300)
+    http = FakeHTTP(departures=[_flight('VIV1-1', 30, 40), _flight('VIV3-3', 35, 2)])
+    connector = KPIFlightAwareConnector('test-key')
+    connector.http = http
+    connector.flights.http = http
+
+    results = [connector.get_delay_statistics('NLU') for _ in range(5)]
+    assert len(http.calls) == 3
+    assert sum(url.endswith('/delays') for url in http.calls) == 1
+    assert all(result['on_time_percentage'] == 50.0 for result in results)
+    assert not any(result['stale'] for result in results)
+
+    # Pasado el intervalo se vuelve a pedir solo el índice de vuelos
+    flightaware_connector._delay_polled_at['NLU'] -= 300
+    connector.get_delay_statistics('NLU')
+    assert len(http.calls) == 5
+    assert not any(url.endswith('/delays') for url in http.calls[3:])
+
+    # Un 5xx de /delays no se recuerda
+    _reset_process_index(min_poll_interval_s=300)
+    flightaware_connector.remember_delays_endpoint_error('MEX', 503, 'Service Unavailable')
+    assert flightaware_connector.delays_endpoint_error('MEX') is None
+    print(f"   ✅ {len(http.calls)} llamadas en 6 renders")
+    _reset_process_index()
+    return True
+
+
+if __name__ == "__main__":
+    print("⏱️ PRUEBA DEL ÍNDICE DE DELAYS")
+    print("=" * 50)
+    tests = [
+        test_upsert_incremental,
+        test_ventana,
+        test_indice_compartido_y_stale,
+        test_fallback_kpi,
+        test_intervalo_minimo_de_poll
+    ]
+    passed = sum(1 for test in tests if test())
+    print("=" * 50)
+    print(f"📊 {passed}/{len(tests)} pruebas exitosas")
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Prueba de los normalizadores de vuelos (sin red)
+OpenSky, FlightRadar24, AviationStack y FlightAware al esquema común,
+unidades, distancia a AIFA y salida JSON del zone feed
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'scripts'))
+
+import json
+
+import numpy as np
+
+from flight_records import (
+    FLIGHT_COLUMNS, distance_to_aifa_km, from_opensky_states, from_fr24_zone,
+    from_aviationstack, from_flightaware, to_records, to_fr24_records
+)
+from flightradar_zone_connector import FlightRadar24ZoneConnector
+
+
+# Fila del zone feed: 1 callsign, 2 lat, 3 lon, 4 rumbo, 5 ft, 6 kt, 8 tipo, 11-13 ruta/aerolínea
+FR24_ROWS = {
+    'abc1': ['0D0A01', 'VIV1234', 19.74, -99.01, 90, 10000, 250, '', 'A320', '', 0, 'NLU', 'CUN', 'VB'],
+    'abc2': ['0D0A02', 'AMX500', 21.0, -101.0, 180, 35000, 450, '', 'B738', '', 0, 'MEX', 'GDL', 'AM'],
+    'corta': ['0D0A03', 'XX1', 19.0]
+}
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200):
+        self.payload = payload
+        self.status_code = status_code
+        self.text = str(payload)
+
+    def json(self):
+        return self.payload
+
+
+class FakeHTTP:
+    def get(self, url, headers=None, params=None, timeout=None):
+        return FakeResponse({'full_count': 2, 'version': 4, 'aircraft': FR24_ROWS})
+
+
+def test_distancia_aifa():
+    """Haversine vectorizado; coordenadas faltantes o en 0 dan NaN"""
+    print("1️⃣ Distancia a AIFA")
+    distance = distance_to_aifa_km([19.7365, 19.4326, None, 0], [-99.0149, -99.1332, -99.0, -99.0])
+    assert distance[0] == 0
+    assert 30 < distance[1] < 40
+    assert np.isnan(distance[2]) and np.isnan(distance[3])
+    print(f"   ✅ AIFA-CDMX {distance[1]:.1f} km")
+    return True
+
+
+def test_opensky():
+    """Solo vectores con callsign; unidades de OpenSky sin conversión"""
+    print("2️⃣ OpenSky")
+    states = [
+        ['0d0a01', 'VIV1234 ', 'Mexico', None, None, -99.0, 19.8, 1500.0, False, 80.0, 45.0],
+        ['0d0a02', '', 'Mexico', None, None, -99.1, 19.5, 3000.0, False, 120.0, 90.0]
+    ]
+    flights = from_opensky_states(states, 1760000000)
+    assert tuple(flights.columns) == FLIGHT_COLUMNS
+    assert len(flights) == 1
+    assert flights['callsign'][0] == 'VIV1234'
+    assert flights['altitude'][0] == 1500.0 and flights['velocity'][0] == 80.0
+    assert flights['distance_to_aifa_km'][0] < 10
+    assert len(from_opensky_states(None)) == 0
+    print("   ✅ 1 vuelo con callsign")
+    return True
+
+
+def test_fr24_unidades():
+    """FlightRadar24 convierte ft → m y kt → m/s e ignora filas cortas"""
+    print("3️⃣ FlightRadar24")
+    flights = from_fr24_zone(FR24_ROWS)
+    assert list(flights['flight_id']) == ['abc1', 'abc2']
+    assert round(flights['altitude'][0], 1) == 3048.0
+    assert round(flights['velocity'][0], 1) == 128.6
+    assert flights['origin'][0] == 'NLU' and flights['airline'][1] == 'AM'
+
+    records = to_fr24_records(flights)
+    assert records[0]['altitude'] == 10000 and records[0]['speed'] == 250
+    assert round(records[0]['altitude_m'], 1) == 3048.0
+    print("   ✅ Unidades convertidas y campos anteriores conservados")
+    return True
+
+
+def test_aviationstack():
+    """AviationStack: campos anidados, km/h → m/s y cancelados"""
+    print("4️⃣ AviationStack")
+    flights = from_aviationstack([
+        {
+            'flight_status': 'active',
+            'flight': {'iata': 'VB1234', 'icao': 'VIV1234'},
+            'airline': {'name': 'VivaAerobus'},
+            'departure': {'iata': 'NLU', 'scheduled': '2025-08-06T10:00:00+00:00', 'delay': 15},
+            'arrival': {'iata': 'CUN'},
+            'live': {'latitude': 19.8, 'longitude': -99.0, 'speed_horizontal': 720}
+        },
+        {'flight_status': 'cancelled', 'flight': {'icao': 'VOI10'}, 'departure': {'iata': 'NLU'}}
+    ])
+    assert list(flights['flight_id']) == ['VB1234', 'VOI10']
+    assert flights['velocity'][0] == 200.0
+    assert flights['delay_minutes'][0] == 15
+    assert list(flights['cancelled']) == [False, True]
+    assert str(flights['timestamp'][0]) == '2025-08-06 10:00:00+00:00'
+    print("   ✅ 2 vuelos normalizados")
+    return True
+
+
+def test_flightaware():
+    """FlightAware: hora del evento por dirección y delay en minutos"""
+    print("5️⃣ FlightAware")
+    raw = [{
+        'fa_flight_id': 'VIV1234-1', 'ident': 'VIV1234',
+        'origin': {'code_iata': 'NLU'}, 'destination': {'code': 'MMUN'},
+        'scheduled_out': '2025-08-06T10:00:00Z', 'actual_off': '2025-08-06T10:20:00Z',
+        'scheduled_in': '2025-08-06T12:00:00Z',
+        'departure_delay': 1200, 'arrival_delay': 600
+    }]
+    departures = from_flightaware(raw, 'departures')
+    arrivals = from_flightaware(raw, 'arrivals')
+    assert departures['delay_minutes'][0] == 20 and arrivals['delay_minutes'][0] == 10
+    assert str(departures['timestamp'][0]) == '2025-08-06 10:20:00+00:00'
+    assert str(arrivals['timestamp'][0]) == '2025-08-06 12:00:00+00:00'
+    assert departures['destination'][0] == 'MMUN'
+    assert bool(departures['cancelled'][0]) is False
+    print("   ✅ Salidas y llegadas")
+    return True
+
+
+def test_json_zone_feed():
+    """get_flights_in_area y get_aifa_summary regresan datos serializables"""
+    print("6️⃣ Salida JSON del zone feed")
+    records = to_records(from_fr24_zone(FR24_ROWS))
+    assert records[0]['latitude'] == 19.74 and records[0]['icao24'] is None
+
+    connector = FlightRadar24ZoneConnector()
+    connector.http = FakeHTTP()
+    area = connector.get_flights_in_area('aifa_area')
+    assert area['success'] and area['total_aircraft'] == 2 and area['aifa_related'] == 1
+    assert area['aifa_flights'][0]['callsign'] == 'VIV1234'
+    json.dumps(area)
+
+    summary = connector.get_aifa_summary()
+    assert summary['summary']['departures'] == 1
+    assert summary['departure_flights'][0]['speed'] == 250
+    assert summary['departure_flights'][0]['altitude'] == 10000
+    json.dumps(summary)
+    print("   ✅ Sin DataFrames en la respuesta pública")
+    return True
+
+
+def test_resumen_columnar():
+    """get_aifa_summary(columnar=True) entrega el DataFrame del esquema, sin registros"""
+    print("7️⃣ Resumen columnar del zone feed")
+    connector = FlightRadar24ZoneConnector()
+    connector.http = FakeHTTP()
+    summary = connector.get_aifa_summary(columnar=True)
+    assert summary['summary']['departures'] == 1
+    assert 'departure_flights' not in summary
+
+    flights = summary['aifa_flights']
+    assert list(flights.columns[:len(FLIGHT_COLUMNS)]) == list(FLIGHT_COLUMNS)
+    assert list(flights['movimiento']) == ['salida']
+    assert round(flights['altitude'][0], 1) == 3048.0  # metros, como el esquema
+    print("   ✅ Vuelos AIFA en columnas con su movimiento")
+    return True
+
+
+if __name__ == "__main__":
+    print("✈️ PRUEBA DE NORMALIZADORES DE VUELOS")
+    print("=" * 50)
+    tests = [
+        test_distancia_aifa,
+        test_opensky,
+        test_fr24_unidades,
+        test_aviationstack,
+        test_flightaware,
+        test_json_zone_feed,
+        test_resumen_columnar
+    ]
+    passed = sum(1 for test in tests if test())
+    print("=" * 50)
+    print(f"📊 {passed}/{len(tests)} pruebas exitosas")
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Prueba del transporte HTTP compartido de los conectores (sin red)
+Timeouts por host, timeouts que llegan desde los conectores y sesiones por
+hilo sobre un mismo pool de conexiones
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'scripts'))
+
+import threading
+
+import requests
+
+from services.metrics import MetricsRegistry
+from services.quota_ledger import QuotaLedger
+from http_transport import HTTPTransport, HOST_TIMEOUTS, DEFAULT_TIMEOUT, PROBE_TIMEOUT, get_http_transport
+from flightaware_connector import FlightAwareConnector
+from real_data_connector import AviationStackConnector
+
+
+class FakeSession:
+    """requests.Session falsa: registra (url, timeout) y responde 200"""
+
+    def __init__(self):
+        self.calls = []
+
+    def request(self, method, url, timeout=None, **kwargs):
+        self.calls.append((url, timeout))
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b'{"data": [], "pagination": {"total": 0}}'
+        return response
+
+
+def _transport():
+    transport = HTTPTransport(metrics_registry=MetricsRegistry())
+    transport._local.session = FakeSession()
+    return transport
+
+
+def test_timeout_por_host():
+    """Sin timeout el del host; un número es la lectura; una tupla pasa tal cual"""
+    print("1️⃣ Timeout por host")
+    transport = HTTPTransport(metrics_registry=MetricsRegistry())
+    flights = 'https://aeroapi.flightaware.com/aeroapi/airports/NLU/flights'
+
+    assert transport.timeout_for(flights) == HOST_TIMEOUTS['aeroapi.flightaware.com'] == (3.05, 15.0)
+    assert transport.timeout_for('https://api.aviationstack.com/v1/flights') == (3.05, 10.0)
+    assert transport.timeout_for('https://ejemplo.com/x') == DEFAULT_TIMEOUT
+    assert transport.timeout_for(flights, PROBE_TIMEOUT) == PROBE_TIMEOUT
+    assert transport.timeout_for(flights, 30) == (3.05, 30)
+    assert transport.timeout_for(flights, 2) == (2, 2)  # conexión nunca mayor que el total
+
+    custom = HTTPTransport(host_timeouts={'api.local': (1.0, 2.0)}, metrics_registry=MetricsRegistry())
+    assert custom.timeout_for('http://api.local/ping') == (1.0, 2.0)
+    assert custom.timeout_for(flights) == DEFAULT_TIMEOUT
+    print(f"   ✅ FlightAware {transport.timeout_for(flights)}, sonda {PROBE_TIMEOUT}")
+    return True
+
+
+def test_timeouts_desde_conectores():
+    """Los requests de datos usan el timeout del host; las sondas, PROBE_TIMEOUT"""
+    print("2️⃣ Timeouts desde los conectores")
+    flightaware = FlightAwareConnector('test-key')
+    flightaware.http = _transport()
+    flightaware.test_connection()
+    flightaware.get_airport_flights('NLU')
+    (_, probe_timeout), (_, data_timeout) = flightaware.http._local.session.calls
+    assert probe_timeout == PROBE_TIMEOUT
+    assert data_timeout == HOST_TIMEOUTS['aeroapi.flightaware.com']
+
+    ledger = QuotaLedger(':memory:', {'aviationstack': {'limit': 100, 'billing_day': 1, 'burst': 4}})
+    aviationstack = AviationStackConnector('test-key', quota_ledger=ledger)
+    aviationstack.http = _transport()
+    assert aviationstack.get_real_flights('NLU')['success'] is True
+    (_, timeout), = aviationstack.http._local.session.calls
+    assert timeout == HOST_TIMEOUTS['api.aviationstack.com']
+    print("   ✅ Sin timeouts numéricos en las llamadas de datos")
+    return True
+
+
+def test_sesion_por_hilo():
+    """Cada hilo tiene su sesión; todas montan el mismo adaptador (pool)"""
+    print("3️⃣ Sesión por hilo sobre un pool compartido")
+    transport = HTTPTransport(metrics_registry=MetricsRegistry())
+    sessions = []
+
+    def _use():
+        sessions.append(transport._session())
+        sessions.append(transport._session())
+
+    threads = [threading.Thread(target=_use) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(session) for session in sessions}) == 3
+    assert transport.stats()['sessions_created'] == 3
+    assert all(session.get_adapter('https://api.aviationstack.com') is transport._adapter for session in sessions)
+    assert get_http_transport() is get_http_transport()
+    print(f"   ✅ {transport.sessions_created} sesiones, 1 pool")
+    return True
+
+
+if __name__ == "__main__":
+    print("🌐 PRUEBA DEL TRANSPORTE HTTP")
+    print("=" * 50)
+    tests = [
+        test_timeout_por_host,
+        test_timeouts_desde_conectores,
+        test_sesion_por_hilo
+    ]
+    passed = sum(1 for test in tests if test())
+    print("=" * 50)
+    print(f"📊 {passed}/{len(tests)} pruebas exitosas")
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Prueba de la evaluación en lote de KPIs (sin red)
+El escenario base coincide con los KPIs escalares del calculador; overrides
+por escenario, aeropuertos pares y ranking vectorizado
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'scripts'))
+
+import numpy as np
+import pandas as pd
+
+from kpi_batch import airport_baselines, evaluate_scenarios
+from kpi_calculator import AIFAKPICalculator
+from kpi_history import KPIHistoryStore
+
+
+def _calculator():
+    return AIFAKPICalculator(history_store=KPIHistoryStore(None, min_interval=0))
+
+
+def test_base_igual_a_calculador():
+    """El escenario sin overrides reproduce los KPIs 1-5 y económicos del calculador"""
+    print("1️⃣ Escenario base vs calculador")
+    calculator = _calculator()
+    snapshot = calculator.take_snapshot(include_live=False)
+    strategic = calculator.calculate_strategic_kpis(snapshot)
+    operational = calculator.calculate_operational_kpis(snapshot)
+    economic = calculator.calculate_economic_impact_kpis(snapshot)
+    row = calculator.evaluate_scenarios(pd.DataFrame({'escenario': ['base']})).iloc[0]
+
+    kpi_1 = strategic['kpi_1_participacion_nacional']
+    assert round(row['participacion_pct'], 1) == kpi_1['valor_actual']
+    assert row['estado_participacion'] == kpi_1['estado']
+    assert row['ranking'] == strategic['kpi_3_posicionamiento']['posicion_actual']
+    assert row['utilizacion_gates_pct'] == operational['kpi_4_utilizacion_infraestructura']['porcentaje_utilizacion']
+    assert row['estado_utilizacion'] == operational['kpi_4_utilizacion_infraestructura']['estado']
+    assert row['pasajeros_por_gate'] == operational['kpi_5_productividad_gates']['pasajeros_por_gate']
+    assert row['eficiencia_vs_aicm'] == operational['kpi_5_productividad_gates']['eficiencia_relativa']
+    assert row['derrama_total_mdp'] == economic['kpi_7_derrama_economica']['derrama_total_mdp']
+    assert row['costo_inversion_por_pasajero'] == economic['kpi_8_roi_inversion_publica']['costo_por_pasajero_anual']
+    print(f"   ✅ participación {row['participacion_pct']}%, ranking {row['ranking']}, gates {row['utilizacion_gates_pct']}%")
+    return True
+
+
+def test_overrides_y_aeropuertos():
+    """Cada fila toma sus overrides; sin aeropuerto se evalúa NLU"""
+    print("2️⃣ Overrides y aeropuertos pares")
+    result = _calculator().evaluate_scenarios(pd.DataFrame([
+        {'escenario': 'base'},
+        {'escenario': 'aicm', 'aeropuerto': 'mex'},
+        {'escenario': 'toluca_8m', 'aeropuerto': 'TLC', 'pasajeros': 8_000_000},
+        {'escenario': 'objetivo_1_5', 'participacion_objetivo': 1.5, 'gates_activos': 30}
+    ])).set_index('escenario')
+
+    assert list(result['aeropuerto']) == ['NLU', 'MEX', 'TLC', 'NLU']
+    assert result.loc['aicm', 'ranking'] == 1
+    assert result.loc['toluca_8m', 'ranking'] == 8  # supera a Culiacán (7.0M)
+    # Sin gates conocidos para TLC no hay utilización
+    assert np.isnan(result.loc['toluca_8m', 'utilizacion_gates_pct'])
+    assert result.loc['toluca_8m', 'estado_utilizacion'] == 'SIN_DATOS'
+
+    objetivo = result.loc['objetivo_1_5']
+    assert round(objetivo['brecha_participacion'], 1) == 0.1
+    assert objetivo['utilizacion_gates_pct'] == 85.7 and objetivo['estado_utilizacion'] == 'SATURACION'
+    assert objetivo['ranking'] == result.loc['base', 'ranking']
+    print(f"   ✅ {len(result)} escenarios en una pasada")
+    return True
+
+
+def test_ranking_vectorizado():
+    """El ranking en lote coincide con contar uno por uno; aeropuertos desconocidos fallan"""
+    print("3️⃣ Ranking vectorizado")
+    calculator = _calculator()
+    baselines = airport_baselines(calculator.data_connector)
+    rng = np.random.default_rng(7)
+    scenarios = pd.DataFrame({
+        'aeropuerto': rng.choice(baselines.index.to_numpy(), size=500),
+        'pasajeros': rng.uniform(1e6, 6e7, size=500).round()
+    })
+    result = evaluate_scenarios(scenarios, baselines, calculator.kpi_config, total_pasajeros_nacional=4.5e8)
+
+    expected = [
+        1 + sum(peer_pax > pax for code, peer_pax in baselines['pasajeros'].items() if code != airport)
+        for airport, pax in zip(scenarios['aeropuerto'], scenarios['pasajeros'])
+    ]
+    assert list(result['ranking']) == expected
+
+    try:
+        evaluate_scenarios(pd.DataFrame({'aeropuerto': ['XXX']}), baselines, calculator.kpi_config, 4.5e8)
+        assert False, "aeropuerto sin baseline"
+    except ValueError as e:
+        assert 'XXX' in str(e)
+    print(f"   ✅ {len(result)} escenarios, rankings correctos")
+    return True
+
+
+if __name__ == "__main__":
+    print("🧮 PRUEBA DE KPIs EN LOTE")
+    print("=" * 50)
+    tests = [
+        test_base_igual_a_calculador,
+        test_overrides_y_aeropuertos,
+        test_ranking_vectorizado
+    ]
+    passed = sum(1 for test in tests if test())
+    print("=" * 50)
+    print(f"📊 {passed}/{len(tests)} pruebas exitosas")
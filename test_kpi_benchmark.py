@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Prueba del benchmark del calculador de KPIs (sin red)
+Stubs deterministas por semilla, forma del resultado JSON y comparación
+contra una corrida previa
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'scripts'))
+
+import json
+import tempfile
+from collections import Counter
+
+from benchmark_kpi_calculator import PROFILES, StubUpstream, UpstreamProfile, run_benchmark, compare, main
+
+
+def test_stubs_deterministas():
+    """La misma semilla produce la misma secuencia de fallas"""
+    print("1️⃣ Stubs deterministas")
+    profile = UpstreamProfile(latency_ms=0, jitter_ms=0, failure_rate=0.5)
+
+    def outcomes(seed):
+        calls = Counter()
+        upstream = StubUpstream('flightaware', profile, seed, calls)
+        return [upstream.call('delays') for _ in range(20)], calls
+
+    first, calls = outcomes(42)
+    assert first == outcomes(42)[0] and first != outcomes(7)[0]
+    assert 0 < first.count(False) < 20 and calls == {'flightaware.delays': 20}
+
+    broken = StubUpstream('weather', UpstreamProfile(0, 0, exception_rate=1.0), 1, Counter())
+    try:
+        broken.call('current_weather')
+        assert False, "exception_rate=1 siempre lanza"
+    except ConnectionError:
+        pass
+    print(f"   ✅ {first.count(False)}/20 fallas con semilla 42")
+    return True
+
+
+def test_resultado_del_benchmark():
+    """El resultado trae latencia, asignaciones, llamadas y estado del grafo"""
+    print("2️⃣ Resultado del benchmark")
+    result = run_benchmark(profile='fast', iterations=4, warmup=1, seed=3)
+    assert set(result) >= {'config', 'latency_ms', 'allocations_kib', 'upstream_calls', 'graph'}
+    assert result['config']['profile'] == 'fast' and result['config']['iterations'] == 4
+    latency = result['latency_ms']
+    assert latency['min'] <= latency['p50'] <= latency['p90'] <= latency['max']
+    assert result['upstream_calls']['per_render'] == result['upstream_calls']['total'] / 4
+    assert sum(result['graph']['kpi_origins'].values()) > 0
+    json.dumps(result)  # serializable
+
+    delta = compare(result, result)
+    assert delta['latency_ms']['p50'] == 0.0 and delta['upstream_calls_per_render'] == 0.0
+    print(f"   ✅ p50={latency['p50']} ms, {result['upstream_calls']['per_render']} llamadas/render")
+    return True
+
+
+def test_cli_guarda_y_compara():
+    """La CLI escribe el JSON y compara contra una corrida previa"""
+    print("3️⃣ CLI")
+    assert set(PROFILES) == {'fast', 'typical', 'degraded', 'outage'}
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline = os.path.join(tmp, 'base.json')
+        current = os.path.join(tmp, 'actual.json')
+        assert main(['--profile', 'fast', '--iterations', '3', '--warmup', '0', '--output', baseline]) == 0
+        assert main(['--profile', 'fast', '--iterations', '3', '--warmup', '0', '--sequential',
+                     '--compare', baseline, '--output', current]) == 0
+        with open(current, 'r', encoding='utf-8') as f:
+            result = json.load(f)
+    assert result['config']['parallel'] is False
+    assert set(result['comparison']['latency_ms']) == {'p50', 'p90', 'p99', 'mean'}
+    print("   ✅ JSON guardado con comparación")
+    return True
+
+
+if __name__ == "__main__":
+    print("⏱️ PRUEBA DEL BENCHMARK DE KPIs")
+    print("=" * 50)
+    tests = [
+        test_stubs_deterministas,
+        test_resultado_del_benchmark,
+        test_cli_guarda_y_compara
+    ]
+    passed = sum(1 for test in tests if test())
+    print("=" * 50)
+    print(f"📊 {passed}/{len(tests)} pruebas exitosas")
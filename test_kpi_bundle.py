@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Prueba del bundle de KPIs gubernamentales (sin red)
+Dict propio en cada llamada, bundle precompilado por versión de los datos
+verificados y reconstrucción cuando el archivo no corresponde
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'scripts'))
+
+import copy
+import json
+import tempfile
+
+import real_data_connector
+from real_data_connector import GobMXRealDataConnector, KPI_BUNDLE_FORMAT, DEFAULT_KPI_BUNDLE_PATH
+
+
+def _fresh_connector(bundle_path):
+    """Conector que no reutiliza los bundles ya construidos en el proceso"""
+    real_data_connector._kpi_bundles.clear()
+    return GobMXRealDataConnector(bundle_path=bundle_path)
+
+
+def test_dict_propio_por_llamada():
+    """Cada llamada recibe un dict modificable que no afecta a las siguientes"""
+    print("1️⃣ Dict propio por llamada")
+    connector = GobMXRealDataConnector(bundle_path=None)
+    kpis = connector.get_aifa_real_kpis()
+    assert type(kpis) is dict and kpis == connector._build_aifa_real_kpis()
+
+    kpis['posicionamiento_nacional']['participacion_pasajeros']['valor'] = 99.9
+    kpis.pop('crecimiento_historico')
+    again = connector.get_aifa_real_kpis()
+    assert again['posicionamiento_nacional']['participacion_pasajeros']['valor'] == 1.4
+    assert 'crecimiento_historico' in again
+    assert copy.deepcopy(again) == json.loads(json.dumps(again))
+    print(f"   ✅ {len(again)} secciones, independientes entre llamadas")
+    return True
+
+
+def test_bundle_precompilado():
+    """El archivo compilado se usa solo si su formato y versión coinciden"""
+    print("2️⃣ Bundle precompilado")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bundle.json')
+        connector = _fresh_connector(path)
+        assert connector.compile_kpi_bundle() == path
+        with open(path, 'r', encoding='utf-8') as f:
+            compiled = json.load(f)
+        assert compiled['format'] == KPI_BUNDLE_FORMAT and compiled['version'] == connector.kpi_bundle_version
+
+        # Se carga del archivo (marca agregada a mano), sin reconstruir
+        compiled['kpis']['marca_prueba'] = True
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(compiled, f)
+        assert _fresh_connector(path).get_aifa_real_kpis()['marca_prueba'] is True
+
+        # Otra versión o un archivo ilegible se reconstruyen
+        compiled['version'] = '2020-01-01-0000000000'
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(compiled, f)
+        assert 'marca_prueba' not in _fresh_connector(path).get_aifa_real_kpis()
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('{no es json')
+        assert 'marca_prueba' not in _fresh_connector(path).get_aifa_real_kpis()
+    real_data_connector._kpi_bundles.clear()
+
+    # La versión cambia con los datos verificados
+    connector = GobMXRealDataConnector(bundle_path=None)
+    version = connector.kpi_bundle_version
+    connector.verified_aifa_data['pasajeros_2024'] += 1
+    assert connector._kpi_bundle_version() != version
+    print(f"   ✅ Versión {version}")
+    return True
+
+
+def test_bundle_del_repo_vigente():
+    """data/aifa_kpi_bundle.json corresponde a los datos verificados actuales"""
+    print("3️⃣ Bundle del repositorio vigente")
+    connector = GobMXRealDataConnector(bundle_path=DEFAULT_KPI_BUNDLE_PATH)
+    compiled = connector._read_compiled_bundle()
+    assert compiled is not None, "recompilar con compile_kpi_bundle()"
+    assert compiled == connector._build_aifa_real_kpis()
+    print(f"   ✅ {connector.kpi_bundle_version}")
+    return True
+
+
+if __name__ == "__main__":
+    print("📦 PRUEBA DEL BUNDLE DE KPIs")
+    print("=" * 50)
+    tests = [
+        test_dict_propio_por_llamada,
+        test_bundle_precompilado,
+        test_bundle_del_repo_vigente
+    ]
+    passed = sum(1 for test in tests if test())
+    print("=" * 50)
+    print(f"📊 {passed}/{len(tests)} pruebas exitosas")
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Prueba del grafo de KPIs con recálculo incremental (sin red)
+Memo por hash de entradas, llaves volátiles (y su refresco), copias y
+nodos pendientes
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'scripts'))
+
+from datetime import datetime
+from types import MappingProxyType
+
+from kpi_graph import KPIGraph, KPINode
+from kpi_snapshot import SourceSnapshot
+
+GOV_KPIS = MappingProxyType({
+    'posicionamiento_nacional': {'ranking': 8},
+    'crecimiento_historico': {'pasajeros_2024': 6300000},
+    'eficiencia_operacional': {'puntualidad': 85.0},
+    'impacto_economico': {'empleos': 4000}
+})
+
+
+def _snapshot(temperature=22.0, timestamp='2025-08-06T10:00:00', timed_out=frozenset()):
+    return SourceSnapshot(
+        taken_at=datetime.now(),
+        gov_kpis=GOV_KPIS,
+        weather={'temperature': temperature, 'timestamp': timestamp, 'data_freshness': 'live'},
+        timed_out=timed_out
+    )
+
+
+def _graph(calls):
+    def weather(snapshot, deps):
+        calls.append('weather')
+        return {'temperatura': snapshot.weather['temperature'], 'alertas': [], 'timestamp': snapshot.weather['timestamp']}
+
+    def resumen(snapshot, deps):
+        calls.append('resumen')
+        return {'clima': deps['weather']['temperatura'], 'ranking': snapshot.gov_kpis['posicionamiento_nacional']['ranking']}
+
+    return KPIGraph([
+        KPINode('weather', weather, sources=('weather',),
+                stamp=lambda snapshot: {'timestamp': snapshot.weather['timestamp']}),
+        KPINode('resumen', resumen, sources=('gov.posicionamiento_nacional',), depends_on=('weather',))
+    ])
+
+
+def test_memo_ignora_llaves_volatiles():
+    """Solo cambia el timestamp de la fuente: ningún nodo se recalcula"""
+    print("1️⃣ Memo con llaves volátiles")
+    calls = []
+    graph = _graph(calls)
+    graph.evaluate(_snapshot(timestamp='2025-08-06T10:00:00'))
+    graph.evaluate(_snapshot(timestamp='2025-08-06T10:05:00'))
+
+    run = graph.last_run()
+    print(f"   recalculados={run['recomputed']} reutilizados={run['reused']}")
+    assert calls == ['weather', 'resumen']
+    assert sorted(run['reused']) == ['resumen', 'weather']
+    print("   ✅ Memo reutilizado")
+    return True
+
+
+def test_cambio_se_propaga_rio_abajo():
+    """Un cambio real en la fuente recalcula el nodo y sus dependientes"""
+    print("2️⃣ Propagación de cambios")
+    calls = []
+    graph = _graph(calls)
+    graph.evaluate(_snapshot(temperature=22.0))
+    results = graph.evaluate(_snapshot(temperature=25.0))
+
+    assert calls == ['weather', 'resumen', 'weather', 'resumen']
+    assert results['resumen']['clima'] == 25.0
+    print("   ✅ Nodo y dependientes recalculados")
+    return True
+
+
+def test_resultados_son_copias():
+    """Modificar el resultado no corrompe el memo"""
+    print("3️⃣ Resultados independientes del memo")
+    graph = _graph([])
+    first = graph.evaluate(_snapshot())
+    first['weather']['alertas'].append('tormenta')
+    first['resumen']['clima'] = None
+
+    second = graph.evaluate(_snapshot())
+    assert graph.last_run()['reused']
+    assert second['weather']['alertas'] == []
+    assert second['resumen']['clima'] == 22.0
+    print("   ✅ Memo intacto")
+    return True
+
+
+def test_nodo_pendiente_usa_memo():
+    """Una fuente que excede su tiempo conserva el último valor memoizado"""
+    print("4️⃣ Nodos pendientes")
+    calls = []
+    graph = _graph(calls)
+
+    # Sin memo: se calcula el fallback, pero no se memoiza
+    fallback = graph.evaluate(_snapshot(temperature=None, timed_out=frozenset({'weather'})))
+    assert fallback['weather']['temperatura'] is None
+    assert 'weather' in graph.last_run()['pending']
+
+    graph.evaluate(_snapshot(temperature=22.0))
+    calls.clear()
+    results = graph.evaluate(_snapshot(temperature=None, timed_out=frozenset({'weather'})))
+    assert results['weather']['temperatura'] == 22.0
+    assert 'weather' not in calls
+    print("   ✅ Último valor memoizado conservado")
+    return True
+
+
+def test_stamp_refresca_volatiles():
+    """El valor reutilizado lleva la hora de obtención del snapshot actual"""
+    print("5️⃣ Campos volátiles refrescados")
+    calls = []
+    graph = _graph(calls)
+    graph.evaluate(_snapshot(timestamp='2025-08-06T10:00:00'))
+    results = graph.evaluate(_snapshot(timestamp='2025-08-06T10:05:00'))
+
+    assert calls == ['weather', 'resumen']
+    assert results['weather']['timestamp'] == '2025-08-06T10:05:00'
+
+    # Un nodo pendiente conserva la hora de su último valor
+    pending = graph.evaluate(_snapshot(temperature=None, timestamp='2025-08-06T10:10:00',
+                                       timed_out=frozenset({'weather'})))
+    assert pending['weather']['timestamp'] == '2025-08-06T10:00:00'
+    print("   ✅ Timestamp actualizado sin recalcular")
+    return True
+
+
+if __name__ == "__main__":
+    print("🧮 PRUEBA DEL GRAFO DE KPIs")
+    print("=" * 50)
+    tests = [
+        test_memo_ignora_llaves_volatiles,
+        test_cambio_se_propaga_rio_abajo,
+        test_resultados_son_copias,
+        test_nodo_pendiente_usa_memo,
+        test_stamp_refresca_volatiles
+    ]
+    passed = sum(1 for test in tests if test())
+    print("=" * 50)
+    print(f"📊 {passed}/{len(tests)} pruebas exitosas")
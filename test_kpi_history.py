@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Prueba del historial de KPIs (sin red)
+Agregado y consultas, tendencias y proyección vs objetivo, orden por
+timestamp con varios procesos escribiendo al mismo archivo y tendencia de
+KPI_001 calculada del historial
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'scripts'))
+
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+from kpi_history import KPIHistoryStore, SECONDS_PER_DAY
+from kpi_calculator import AIFAKPICalculator, TENDENCIA_PARTICIPACION_OFICIAL, CRECIMIENTO_OFICIAL_2024
+
+DAY = SECONDS_PER_DAY
+
+
+def _store(path=None):
+    return KPIHistoryStore(path, min_interval=0)
+
+
+def test_agregar_y_consultar():
+    """Registros con series faltantes, min_interval y consultas por fecha"""
+    print("1️⃣ Agregar y consultar")
+    base = time.time() - 3 * DAY
+    store = KPIHistoryStore(None, min_interval=60)
+    assert store.append({'participacion_nacional': 1.0, 'ranking_nacional': 10}, timestamp=base)
+    assert not store.append({'participacion_nacional': 9.9}, timestamp=base + 30)  # dentro de min_interval
+    assert store.append({'participacion_nacional': 1.2}, timestamp=base + DAY)
+    assert store.append({'participacion_nacional': 1.4, 'ranking_nacional': 9}, timestamp=base + 2 * DAY)
+
+    assert len(store) == 3
+    frame = store.frame()
+    assert list(frame['participacion_nacional']) == [1.0, 1.2, 1.4]
+    assert np.isnan(frame['ranking_nacional'].iloc[1])
+    assert store.latest('ranking_nacional') == 9.0
+    assert store.latest('puntualidad') is None
+    assert store.deltas()['participacion_nacional'] == 1.4 - 1.2
+
+    pct, since = store.change('participacion_nacional')
+    assert round(pct, 1) == 40.0 and since == base
+    print(f"   ✅ {len(store)} registros, cambio {pct:+.1f}%")
+    return True
+
+
+def test_tendencia_y_proyeccion():
+    """Pendiente por día y fecha proyectada para alcanzar el objetivo"""
+    print("2️⃣ Tendencia y proyección")
+    store = _store()
+    base = time.time() - 10 * DAY
+    for day in range(5):
+        store.append({'participacion_nacional': 1.0 + 0.1 * day}, timestamp=base + day * DAY)
+
+    assert round(store.trends()['participacion_nacional'], 4) == 0.1
+    item = store.summary(targets={'participacion_nacional': 1.8})['participacion_nacional']
+    print(f"   pendiente={item['pendiente_dia']} brecha={item['brecha']} días={item['dias_a_objetivo']}")
+    assert item['ultimo'] == 1.4 and item['registros'] == 5
+    assert item['dias_a_objetivo'] == 4.0 and 'fecha_proyectada' in item
+
+    # Una tendencia a la baja no converge a un objetivo más alto
+    store.append({'participacion_nacional': 0.5}, timestamp=base + 9 * DAY)
+    assert store.summary(targets={'participacion_nacional': 1.8}, window_days=None)['participacion_nacional']['dias_a_objetivo'] is None
+    print("   ✅ Proyección solo cuando la tendencia converge")
+    return True
+
+
+def test_orden_con_varios_procesos():
+    """Dos procesos agregan al mismo archivo en desorden: las consultas ven todo ordenado"""
+    print("3️⃣ Varios procesos sobre el mismo archivo")
+    base = time.time() - 5 * DAY
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'kpi_history.f64')
+        proceso_a, proceso_b = _store(path), _store(path)
+        proceso_a.append({'participacion_nacional': 1.0}, timestamp=base)
+        proceso_a.append({'participacion_nacional': 1.3}, timestamp=base + 3 * DAY)
+        proceso_b.append({'participacion_nacional': 1.1}, timestamp=base + DAY)
+        proceso_b.append({'participacion_nacional': 1.2}, timestamp=base + 2 * DAY)
+
+        for store in (proceso_a, proceso_b, _store(path)):
+            frame = store.frame()
+            assert len(frame) == 4 and frame.index.is_monotonic_increasing
+            assert list(frame['participacion_nacional']) == [1.0, 1.1, 1.2, 1.3]
+            assert store.latest('participacion_nacional') == 1.3
+
+        # `since` sobre filas que llegaron en desorden
+        recientes = proceso_a.frame(since=datetime.fromtimestamp(base + 1.5 * DAY))
+        assert list(recientes['participacion_nacional']) == [1.2, 1.3]
+    print("   ✅ Registros de ambos procesos, en orden")
+    return True
+
+
+def test_tendencia_kpi_001():
+    """KPI_001 usa el historial para su tendencia; sin historial, la cifra oficial"""
+    print("4️⃣ Tendencia de KPI_001")
+    store = _store()
+    calculator = AIFAKPICalculator(history_store=store)
+    assert calculator._tendencia_participacion() == TENDENCIA_PARTICIPACION_OFICIAL
+    assert calculator.kpi_graph.evaluate(calculator.take_snapshot(include_live=False), ('kpi_1_participacion_nacional',))[
+        'kpi_1_participacion_nacional']['tendencia'] == TENDENCIA_PARTICIPACION_OFICIAL
+    assert calculator._calcular_probabilidad_ranking() == 85.0  # crecimiento oficial 141.3% vs 15.2% requerido
+
+    base = time.time() - 30 * DAY
+    store.append({'participacion_nacional': 1.5, 'crecimiento_anual': CRECIMIENTO_OFICIAL_2024}, timestamp=base)
+    store.append({'participacion_nacional': 1.65, 'crecimiento_anual': 20.0}, timestamp=base + 29 * DAY)
+
+    # El nodo gubernamental se reutiliza del memo, pero su tendencia se refresca
+    kpi = calculator.kpi_graph.evaluate(calculator.take_snapshot(include_live=False), ('kpi_1_participacion_nacional',))[
+        'kpi_1_participacion_nacional']
+    print(f"   tendencia={kpi['tendencia']}")
+    assert kpi['tendencia'].startswith('+10.0% vs ')
+    assert calculator._calcular_probabilidad_ranking() == 70.0
+    print("   ✅ Tendencia y crecimiento tomados del historial")
+    return True
+
+
+if __name__ == "__main__":
+    print("📈 PRUEBA DEL HISTORIAL DE KPIs")
+    print("=" * 50)
+    tests = [
+        test_agregar_y_consultar,
+        test_tendencia_y_proyeccion,
+        test_orden_con_varios_procesos,
+        test_tendencia_kpi_001
+    ]
+    passed = sum(1 for test in tests if test())
+    print("=" * 50)
+    print(f"📊 {passed}/{len(tests)} pruebas exitosas")
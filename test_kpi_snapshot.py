@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Prueba del snapshot de fuentes del calculador de KPIs (sin red)
+Una consulta por fuente y por render, consultas en vivo en paralelo con
+tiempo límite compartido y estado de conexión en caché en vez de
+test_connection() por llamada, con los conectores stub del benchmark
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'scripts'))
+
+import time
+from collections import Counter
+from dataclasses import FrozenInstanceError
+
+from benchmark_kpi_calculator import build_calculator
+from connection_health import ConnectionHealthRegistry
+
+
+def _calculator(profile='fast', parallel=False, calls=None):
+    """Calculador con stubs; FlightAware ya conocido como activo en su registro de salud"""
+    calculator = build_calculator(profile, 1, parallel, calls if calls is not None else Counter())
+    calculator.health_registry.report('flightaware', {'status': 'CONECTADO', 'api_activa': True})
+    return calculator
+
+
+def test_una_consulta_por_render():
+    """Cada fuente se consulta una vez por render y el snapshot es inmutable"""
+    print("1️⃣ Una consulta por fuente y por render")
+    calls = Counter()
+    calculator = _calculator(calls=calls)
+    dashboard = calculator.generate_executive_dashboard()
+
+    assert calls['weather.current_weather'] == 1
+    assert calls['flightradar.zone_feed'] == 1
+    assert calls['flightaware.delays'] == 1
+    assert calls['aviation.flights'] == 2  # un resumen: salidas + llegadas
+    assert not any(method.endswith('test_connection') for method in calls)
+    assert dashboard['estado_calculo']['pendientes'] == []
+
+    snapshot = calculator.take_snapshot(include_live=False)
+    try:
+        snapshot.weather = {}
+        assert False, "el snapshot debe ser inmutable"
+    except FrozenInstanceError:
+        pass
+    try:
+        snapshot.gov_kpis['aifa_pasajeros'] = 0
+        assert False, "gov_kpis es de solo lectura"
+    except TypeError:
+        pass
+    print(f"   ✅ {sum(calls.values())} llamadas a upstream en el render")
+    return True
+
+
+def test_consultas_en_paralelo():
+    """En paralelo el snapshot tarda lo que la fuente más lenta, no la suma"""
+    print("2️⃣ Consultas en vivo en paralelo")
+    calculator = _calculator('typical')
+    started = time.perf_counter()
+    sequential = calculator.take_snapshot()
+    sequential_s = time.perf_counter() - started
+
+    calculator.parallel_live = True
+    started = time.perf_counter()
+    parallel = calculator.take_snapshot()
+    parallel_s = time.perf_counter() - started
+
+    live = ('aviation', 'flightaware', 'weather', 'flightradar')
+    assert all(parallel.timing(section) is not None for section in live)
+    assert not parallel.timed_out and not parallel.errors
+    assert parallel_s < 0.7 * sequential_s
+    assert sequential_s * 1000 >= sum(sequential.timing(section) for section in live)
+    print(f"   ✅ secuencial {sequential_s * 1000:.0f} ms, paralelo {parallel_s * 1000:.0f} ms")
+    return True
+
+
+def test_tiempo_limite_compartido():
+    """Las fuentes colgadas quedan en timed_out y el siguiente render no encola otra consulta"""
+    print("3️⃣ Tiempo límite compartido")
+    calls = Counter()
+    calculator = _calculator('outage', parallel=True, calls=calls)  # clima y FR24 tardan 3 s
+    started = time.perf_counter()
+    snapshot = calculator.take_snapshot(section_timeout=1.2)
+    elapsed_s = time.perf_counter() - started
+
+    assert {'weather', 'flightradar'} <= snapshot.timed_out
+    assert 'aviation' not in snapshot.timed_out and snapshot.aviation_flights is not None
+    assert snapshot.weather is None and snapshot.flightradar_summary is None
+    assert elapsed_s < 1.6
+
+    again = calculator.take_snapshot(section_timeout=0.2)
+    assert {'weather', 'flightradar'} <= again.timed_out
+    assert calls['weather.current_weather'] == 1 and calls['flightradar.zone_feed'] == 1
+    print(f"   ✅ Render en {elapsed_s * 1000:.0f} ms con 2 fuentes colgadas")
+    return True
+
+
+def test_registro_de_salud():
+    """El estado se lee sin bloquear; la prueba activa corre una vez, en segundo plano"""
+    print("4️⃣ Registro de salud de conexiones")
+    registry = ConnectionHealthRegistry(ttl=0.3)
+    probes = []
+
+    def probe():
+        probes.append(time.monotonic())
+        time.sleep(0.05)
+        return {'status': 'CONECTADO', 'api_activa': True, 'plan': 'AeroAPI'}
+
+    assert registry.status('flightaware', probe) == {'status': 'DESCONOCIDO', 'api_activa': True}
+    registry.status('flightaware', probe)  # la prueba sigue en curso: no se lanza otra
+    time.sleep(0.1)
+    assert len(probes) == 1 and registry.status('flightaware')['plan'] == 'AeroAPI'
+
+    # Las llamadas reales actualizan el estado; el éxito limpia el error
+    registry.record_failure('flightaware', 'HTTP 503', error_code=503)
+    assert registry.status('flightaware')['api_activa'] is False
+    registry.record_success('flightaware')
+    state = registry.status('flightaware')
+    assert state['status'] == 'CONECTADO' and 'error_code' not in state and state['plan'] == 'AeroAPI'
+
+    # Al vencer el TTL se vuelve a probar; una prueba que falla deja ERROR_CONEXION
+    time.sleep(0.35)
+    registry.status('flightaware', probe)
+    registry.status('openweather', lambda: 1 / 0)
+    time.sleep(0.1)
+    assert len(probes) == 2
+    assert registry.status('openweather')['status'] == 'ERROR_CONEXION'
+    assert registry.stats()['probes'] == 3
+
+    # Los renders no hacen test_connection() antes de cada llamada
+    calls = Counter()
+    calculator = build_calculator('fast', 1, False, calls)
+    for _ in range(3):
+        calculator.generate_executive_dashboard()
+    time.sleep(0.05)
+    assert calls['flightaware.test_connection'] <= 1 and calls['aviation.test_connection'] == 0
+    assert calculator.health_registry.is_fresh('flightaware')
+    print(f"   ✅ {len(probes)} pruebas activas; {calls['flightaware.test_connection']} test_connection en 3 renders")
+    return True
+
+
+if __name__ == "__main__":
+    print("📸 PRUEBA DEL SNAPSHOT DE FUENTES")
+    print("=" * 50)
+    tests = [
+        test_una_consulta_por_render,
+        test_consultas_en_paralelo,
+        test_tiempo_limite_compartido,
+        test_registro_de_salud
+    ]
+    passed = sum(1 for test in tests if test())
+    print("=" * 50)
+    print(f"📊 {passed}/{len(tests)} pruebas exitosas")
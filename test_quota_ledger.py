@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Prueba del libro de cuotas y del pacing de AviationStack (sin red)
+Ráfaga, límite del periodo, paginación acotada por presupuesto,
+resultado guardado cuando la cuota se agota, paginación hasta
+`pagination.total` y salidas/llegadas consultadas en paralelo
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'scripts'))
+
+import threading
+from datetime import datetime
+
+from services.quota_ledger import QuotaLedger, API_QUOTAS, billing_period
+from real_data_connector import AviationStackConnector
+from config.api_config import AVIATION_APIS
+
+
+def _ledger(limit=100, burst=4):
+    return QuotaLedger(':memory:', {'aviationstack': {'limit': limit, 'billing_day': 1, 'burst': burst}})
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200):
+        self.payload = payload
+        self.status_code = status_code
+        self.text = str(payload)
+
+    def json(self):
+        return self.payload
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeHTTP:
+    """Transporte falso: /flights paginado con `total` vuelos por dirección"""
+
+    def __init__(self, total=250, fail_offset=None):
+        self.total = total
+        self.fail_offset = fail_offset
+        self.calls = []
+
+    def get(self, url, params=None, timeout=None):
+        self.calls.append((url, dict(params or {})))
+        offset, limit = params.get('offset', 0), params['limit']
+        if offset == self.fail_offset:
+            return FakeResponse({'error': 'upstream'}, status_code=500)
+        count = max(min(limit, self.total - offset), 0)
+        flights = [
+            {
+                'departure': {'iata': 'NLU'},
+                'arrival': {'iata': 'CUN' if i % 2 else 'GDL'},
+                'airline': {'name': 'VivaAerobus' if i % 3 else 'Volaris'},
+                'flight': {'iata': f'VB{offset + i}'}
+            }
+            for i in range(count)
+        ]
+        return FakeResponse({'data': flights, 'pagination': {'total': self.total}})
+
+
+def _connector(ledger, http, max_pages=3):
+    connector = AviationStackConnector('test-key', page_size=100, max_pages=max_pages, quota_ledger=ledger)
+    connector.http = http
+    return connector
+
+
+def test_limite_desde_config():
+    """El límite mensual sale de config/api_config.py"""
+    print("1️⃣ Una sola fuente del límite")
+    assert API_QUOTAS['aviationstack']['limit'] == AVIATION_APIS['aviationstack'].quota
+    assert API_QUOTAS['aviationstack']['billing_day'] == AVIATION_APIS['aviationstack'].quota_reset_day
+    print(f"   ✅ {API_QUOTAS['aviationstack']['limit']} requests/mes")
+    return True
+
+
+def test_rafaga_y_limite():
+    """try_record respeta la ráfaga; sin pacing solo el límite del periodo"""
+    print("2️⃣ Ráfaga y límite")
+    ledger = _ledger(limit=100, burst=4)
+    allowed = [ledger.try_record('aviationstack') for _ in range(6)]
+    assert allowed == [True] * 4 + [False] * 2
+    assert not ledger.can_refresh('aviationstack')
+
+    small = _ledger(limit=3, burst=10)
+    assert [small.try_record('aviationstack', paced=False) for _ in range(4)] == [True, True, True, False]
+    assert small.status('aviationstack')['restantes'] == 0
+    print("   ✅ 4 llamadas seguidas, luego espera; límite respetado")
+    return True
+
+
+def test_llamadas_disponibles():
+    """available_calls anticipa cuántas llamadas autorizará try_record"""
+    print("3️⃣ Llamadas disponibles")
+    ledger = _ledger(limit=100, burst=4)
+    for expected in (4, 3, 2, 1, 0):
+        assert ledger.available_calls('aviationstack') == expected
+        ledger.try_record('aviationstack')
+    assert _ledger(limit=2, burst=4).available_calls('aviationstack') == 2
+    print("   ✅ Presupuesto inmediato correcto")
+    return True
+
+
+def test_paginas_acotadas_por_presupuesto():
+    """Un resumen no gasta más llamadas que las que el libro autoriza"""
+    print("4️⃣ Paginación acotada por presupuesto")
+    ledger = _ledger(limit=100, burst=4)
+    http = FakeHTTP(total=250)
+    summary = _connector(ledger, http, max_pages=3).get_flights_summary('NLU')
+
+    # 4 llamadas disponibles → 2 páginas por dirección, de 3 necesarias
+    assert len(http.calls) == 4
+    assert summary['precision'] == 'REAL'
+    assert summary['salidas_reales'] == 200
+    assert summary['conteo_completo'] is False
+    assert ledger.status('aviationstack')['usadas'] == 4
+    print(f"   ✅ {len(http.calls)} llamadas, {summary['total_operaciones_dia']} vuelos")
+    return True
+
+
+def test_cuota_agotada_sirve_guardado():
+    """Sin presupuesto no hay llamadas: se regresa el último resumen guardado"""
+    print("5️⃣ Resultado guardado con cuota agotada")
+    ledger = _ledger(limit=100, burst=2)
+    connector = _connector(ledger, FakeHTTP(total=50), max_pages=1)
+    first = connector.get_flights_summary('NLU')
+    assert first['precision'] == 'REAL'
+
+    http = FakeHTTP(total=50)
+    connector.http = http
+    cached = connector.get_flights_summary('NLU')
+    assert http.calls == []
+    assert cached['cache_cuota'] is True
+    assert cached['salidas_reales'] == first['salidas_reales']
+
+    # Sin nada guardado cae a la estimación
+    empty = _connector(_ledger(limit=1), FakeHTTP(), max_pages=1).get_flights_summary('NLU')
+    assert empty['precision'] == 'ESTIMADA'
+    print("   ✅ Sin llamadas al API")
+    return True
+
+
+def test_corte_a_media_paginacion():
+    """Si la cuota se agota entre páginas queda el conteo parcial"""
+    print("6️⃣ Corte a media paginación")
+    ledger = _ledger(limit=100, burst=2)
+    http = FakeHTTP(total=500)
+    result = _connector(ledger, http, max_pages=5)._aggregate_flights('NLU', 'departure', pages=5)
+
+    assert result['success'] is True
+    assert result['total'] == 200
+    assert result['completo'] is False
+    assert len(http.calls) == 2
+    print("   ✅ Conteo parcial de 2 páginas")
+    return True
+
+
+def test_periodo_de_facturacion():
+    """El periodo corta en el día de facturación (acotado al fin de mes)"""
+    print("7️⃣ Periodo de facturación")
+    assert billing_period(datetime(2025, 3, 10), 15) == (datetime(2025, 2, 15), datetime(2025, 3, 15))
+    assert billing_period(datetime(2025, 2, 28, 12), 31) == (datetime(2025, 2, 28), datetime(2025, 3, 31))
+    print("   ✅ Cortes correctos")
+    return True
+
+
+class BarrierHTTP(FakeHTTP):
+    """La primera página de cada dirección espera a la otra: solo pasa si van en paralelo"""
+
+    def __init__(self, total=50):
+        super().__init__(total)
+        self.barrier = threading.Barrier(2, timeout=2)
+        self.threads = set()
+
+    def get(self, url, params=None, timeout=None):
+        self.threads.add(threading.current_thread().name)
+        if not params.get('offset'):
+            self.barrier.wait()
+        return super().get(url, params, timeout)
+
+
+def test_paginacion_hasta_total():
+    """Se pagina con offset hasta `pagination.total`, sin una página vacía extra"""
+    print("8️⃣ Paginación hasta el total")
+    http = FakeHTTP(total=250)
+    summary = _connector(_ledger(limit=100, burst=10), http, max_pages=5).get_flights_summary('NLU')
+    offsets = sorted(params.get('offset', 0) for _, params in http.calls if 'dep_iata' in params)
+    assert offsets == [0, 100, 200]
+    assert len(http.calls) == 6
+    assert summary['salidas_reales'] == summary['llegadas_reales'] == 250
+    assert summary['conteo_completo'] is True
+    assert set(summary['principales_destinos']) == {'CUN', 'GDL'}
+    assert summary['aerolineas_activas'][0] == 'VivaAerobus'
+
+    exact = FakeHTTP(total=200)
+    result = _connector(_ledger(limit=100, burst=10), exact, max_pages=5)._aggregate_flights('NLU', 'arrival', pages=5)
+    assert result['total'] == 200 and result['completo'] is True and len(exact.calls) == 2
+
+    # Una página intermedia fallida deja el conteo parcial
+    failing = FakeHTTP(total=250, fail_offset=100)
+    result = _connector(_ledger(limit=100, burst=10), failing, max_pages=5)._aggregate_flights('NLU', 'departure', pages=5)
+    assert result['success'] is True and result['total'] == 100 and result['completo'] is False
+    print(f"   ✅ offsets {offsets} por dirección, {summary['total_operaciones_dia']} vuelos")
+    return True
+
+
+def test_direcciones_en_paralelo():
+    """Salidas y llegadas se piden al mismo tiempo en el executor de AviationStack"""
+    print("9️⃣ Salidas y llegadas en paralelo")
+    http = BarrierHTTP(total=50)
+    summary = _connector(_ledger(limit=100, burst=10), http, max_pages=1).get_flights_summary('NLU')
+    assert summary['precision'] == 'REAL'
+    assert summary['salidas_reales'] == summary['llegadas_reales'] == 50
+    assert len(http.threads) == 2 and all(name.startswith('aviationstack') for name in http.threads)
+    print(f"   ✅ Ambas direcciones en vuelo a la vez ({len(http.threads)} hilos)")
+    return True
+
+
+if __name__ == "__main__":
+    print("📒 PRUEBA DEL LIBRO DE CUOTAS")
+    print("=" * 50)
+    tests = [
+        test_limite_desde_config,
+        test_rafaga_y_limite,
+        test_llamadas_disponibles,
+        test_paginas_acotadas_por_presupuesto,
+        test_cuota_agotada_sirve_guardado,
+        test_corte_a_media_paginacion,
+        test_periodo_de_facturacion,
+        test_paginacion_hasta_total,
+        test_direcciones_en_paralelo
+    ]
+    passed = sum(1 for test in tests if test())
+    print("=" * 50)
+    print(f"📊 {passed}/{len(tests)} pruebas exitosas")
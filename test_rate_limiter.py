@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Prueba del rate limiter del cliente de APIs (sin red)
+Reservas del token bucket (GCRA), sub-límites por endpoint, cuota diaria
+en memoria y cuota mensual tomada del libro de cuotas
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'scripts'))
+
+import asyncio
+
+from services import api_client
+from services.api_client import TokenBucket, RateLimiter, QuotaExceededError
+from services.quota_ledger import QuotaLedger
+
+
+def test_reservas_gcra():
+    """Tras la ráfaga cada reserva espera 1/rate más que la anterior"""
+    print("1️⃣ Reservas del token bucket")
+    bucket = TokenBucket(rate_per_minute=60, burst=2)  # 1 token por segundo
+    now = bucket.updated
+    waits = [bucket.reserve(now) for _ in range(4)]
+    assert waits == [0.0, 0.0, 1.0, 2.0]
+
+    # Medio segundo después la deuda baja medio token
+    assert bucket.wait_time(now + 0.5) == 2.5
+    # A los 3 s la deuda ya se pagó y queda un token
+    assert bucket.reserve(now + 3.0) == 0.0
+    # El bucket no acumula más que su capacidad
+    assert bucket.wait_time(now + 60) == 0.0 and bucket.tokens == 2.0
+    print(f"   ✅ Esperas {waits}")
+    return True
+
+
+def test_espera_y_sublimite_por_endpoint():
+    """El limiter espera lo reservado y aplica el sub-límite del endpoint"""
+    print("2️⃣ Espera y sub-límite por endpoint")
+    limiter = RateLimiter()
+    limiter.configure('api_prueba', rate_per_minute=600, burst=2, endpoint_limits={'/vuelos': 600})
+
+    async def _run():
+        waits = [await limiter.wait_if_needed('api_prueba', endpoint='/otro') for _ in range(3)]
+        limiter.configure('api_prueba', rate_per_minute=6000, burst=100, endpoint_limits={'/vuelos': 600})
+        await limiter.wait_if_needed('api_prueba', endpoint='/vuelos')
+        limiter._endpoint_buckets[('api_prueba', '/vuelos')].tokens = 0  # sub-límite agotado
+        waits.append(await limiter.wait_if_needed('api_prueba', endpoint='/vuelos'))
+        waits.append(await limiter.wait_if_needed('api_prueba', endpoint='/otro'))
+        return waits
+
+    waits = asyncio.run(_run())
+    assert waits[:2] == [0.0, 0.0]
+    assert 0.09 < waits[2] <= 0.1      # 600/min → un token cada 0.1 s
+    assert 0.09 < waits[3] <= 0.1      # solo /vuelos espera
+    assert waits[4] == 0.0
+    assert limiter.stats()['api_prueba']['total_wait_seconds'] > 0
+    print(f"   ✅ Esperas {[round(w, 2) for w in waits]}")
+    return True
+
+
+def test_cuota_diaria_en_memoria():
+    """La cuota diaria se agota y se reinicia al cambiar de periodo"""
+    print("3️⃣ Cuota diaria en memoria")
+    limiter = RateLimiter()
+    limiter.configure('api_prueba', rate_per_minute=600, quota=2, quota_period='day')
+
+    async def _run():
+        await limiter.wait_if_needed('api_prueba')
+        await limiter.wait_if_needed('api_prueba')
+        try:
+            await limiter.wait_if_needed('api_prueba')
+        except QuotaExceededError as e:
+            error = e
+        else:
+            error = None
+        stats = limiter.stats()['api_prueba']
+        limiter._quotas['api_prueba']['key'] = '2000-01-01'  # periodo anterior
+        await limiter.wait_if_needed('api_prueba')
+        return error, stats
+
+    error, stats = asyncio.run(_run())
+    assert error is not None and error.period == 'day' and error.quota == 2
+    assert stats['quota_used'] == 2 and stats['quota_limit'] == 2
+    assert limiter.stats()['api_prueba']['quota_used'] == 1
+    print(f"   ✅ {error}")
+    return True
+
+
+def test_cuota_mensual_del_libro():
+    """La cuota mensual se gasta del libro compartido con los conectores"""
+    print("4️⃣ Cuota mensual del libro de cuotas")
+    ledger = QuotaLedger(':memory:', {'aviationstack': {'limit': 2, 'billing_day': 1, 'burst': 10}})
+    previous, api_client._ledger = api_client._ledger, ledger
+    try:
+        limiter = RateLimiter()
+
+        async def _run():
+            await limiter.wait_if_needed('aviationstack', 600)
+            await limiter.wait_if_needed('aviationstack', 600)
+            try:
+                await limiter.wait_if_needed('aviationstack', 600)
+            except QuotaExceededError as e:
+                return e
+            return None
+
+        error = asyncio.run(_run())
+    finally:
+        api_client._ledger = previous
+
+    assert error is not None and error.period == 'month' and error.quota == 2
+    stats = limiter.stats()['aviationstack']
+    assert stats['quota_limit'] == 2 and stats['quota_used'] == 2
+    assert ledger.status('aviationstack')['usadas'] == 2
+    print(f"   ✅ {ledger.status('aviationstack')['usadas']} llamadas registradas en el libro")
+    return True
+
+
+if __name__ == "__main__":
+    print("🚦 PRUEBA DEL RATE LIMITER")
+    print("=" * 50)
+    tests = [
+        test_reservas_gcra,
+        test_espera_y_sublimite_por_endpoint,
+        test_cuota_diaria_en_memoria,
+        test_cuota_mensual_del_libro
+    ]
+    passed = sum(1 for test in tests if test())
+    print("=" * 50)
+    print(f"📊 {passed}/{len(tests)} pruebas exitosas")